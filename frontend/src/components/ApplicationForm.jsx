@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate, useParams } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
-import { createApplication, getProtectedResource, updateApplication } from '../utils/api';
+import { createApplication, getBootstrap, getProtectedResource, updateApplication } from '../utils/api';
 import Modal from './Modal';
 
 const ApplicationForm = ({ mode }) => {
@@ -141,12 +141,7 @@ const ApplicationForm = ({ mode }) => {
                     return;
                 }
 
-                const [locs, objs, stats, brigs] = await Promise.all([
-                    getProtectedResource('/locations/'),
-                    getProtectedResource('/objects/'),
-                    getProtectedResource('/statuses/'),
-                    getProtectedResource('/brigades/'),
-                ]);
+                const { locations: locs, objects: objs, statuses: stats, brigades: brigs } = await getBootstrap();
 
                 setLocations(locs);
                 setObjects(objs);
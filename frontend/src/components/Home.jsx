@@ -1,13 +1,14 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
-import { getProtectedResource, deleteApplication } from '../utils/api';
+import { getBootstrap, getProtectedResource, deleteApplication, subscribeApplicationEvents } from '../utils/api';
 import Modal from './Modal';
 
 const Home = () => {
     const { user, token, logout } = useAuth();
-    const [allApplications, setAllApplications] = useState([]);
-    const [filteredApplications, setFilteredApplications] = useState([]);
+    const [applications, setApplications] = useState([]);
+    const [nextPageUrl, setNextPageUrl] = useState(null);
+    const [prevPageUrl, setPrevPageUrl] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
     const navigate = useNavigate();
@@ -239,7 +240,7 @@ const Home = () => {
         }
     };
 
-    const fetchApplicationsAndStatuses = useCallback(async () => {
+    const fetchApplications = useCallback(async (pageUrl = null) => {
         if (!token) {
             setLoading(false);
             openModal('Ошибка доступа', 'Необходимо аутентифицироваться для просмотра заявок.', () => {
@@ -250,15 +251,17 @@ const Home = () => {
             return;
         }
         try {
-            setLoading(true);
-            const [applicationsData, statusesData] = await Promise.all([
-                getProtectedResource('/applications/'),
-                getProtectedResource('/statuses/')
-            ]);
-
-            setAllApplications(applicationsData);
-            setFilteredApplications(applicationsData);
-            setStatusesForFilter(statusesData);
+            const params = { page_size: itemsPerPage };
+            if (searchTerm) params.search = searchTerm;
+            if (filterStatus) params.status = filterStatus;
+            // Ссылки next/previous уже содержат курсор и параметры фильтрации
+            const data = pageUrl
+                ? await getProtectedResource(pageUrl)
+                : await getProtectedResource('/applications/', params);
+
+            setApplications(data.results);
+            setNextPageUrl(data.next);
+            setPrevPageUrl(data.previous);
             setError(null);
         } catch (err) {
             console.error('Ошибка при получении данных:', err);
@@ -274,49 +277,57 @@ const Home = () => {
         } finally {
             setLoading(false);
         }
-    }, [token, logout, navigate]);
+    }, [token, logout, navigate, itemsPerPage, searchTerm, filterStatus]);
 
     useEffect(() => {
-        fetchApplicationsAndStatuses();
-    }, [fetchApplicationsAndStatuses]);
+        if (!token) return;
+        getBootstrap()
+            .then(data => setStatusesForFilter(data.statuses))
+            .catch(err => console.error('Ошибка при получении статусов:', err));
+    }, [token]);
 
     useEffect(() => {
-        let currentApplications = [...allApplications];
-
-        if (searchTerm) {
-            const lowerSearchTerm = searchTerm.toLowerCase();
-            currentApplications = currentApplications.filter(app =>
-                app.identifier.toLowerCase().includes(lowerSearchTerm) ||
-                app.location_name.toLowerCase().includes(lowerSearchTerm) ||
-                app.object_name.toLowerCase().includes(lowerSearchTerm)
-            );
-        }
-
-        if (filterStatus) {
-            currentApplications = currentApplications.filter(app =>
-                app.status_name.toLowerCase() === filterStatus.toLowerCase()
-            );
-        }
-
-        setFilteredApplications(currentApplications);
-        setCurrentPage(1);
-    }, [searchTerm, filterStatus, allApplications]);
-
-    const indexOfLastItem = currentPage * itemsPerPage;
-    const indexOfFirstItem = indexOfLastItem - itemsPerPage;
-    const currentItems = filteredApplications.slice(indexOfFirstItem, indexOfLastItem);
+        // Небольшая задержка, чтобы не отправлять запрос на каждое нажатие клавиши
+        const timeoutId = setTimeout(() => {
+            setCurrentPage(1);
+            fetchApplications();
+        }, 300);
+        return () => clearTimeout(timeoutId);
+    }, [fetchApplications]);
+
+    // Подписка живёт, пока не сменится токен: актуальные страница и функция
+    // загрузки берутся из ref, иначе поток переоткрывался бы на каждый ввод в поиске
+    const fetchApplicationsRef = useRef(fetchApplications);
+    const currentPageRef = useRef(currentPage);
+    useEffect(() => {
+        fetchApplicationsRef.current = fetchApplications;
+        currentPageRef.current = currentPage;
+    }, [fetchApplications, currentPage]);
 
-    const totalPages = Math.ceil(filteredApplications.length / itemsPerPage);
+    useEffect(() => {
+        if (!token) return;
+        return subscribeApplicationEvents((type, data) => {
+            if (type === 'application.deleted') {
+                setApplications(prev => prev.filter(app => app.id !== data.id));
+            } else if (type === 'application.updated') {
+                setApplications(prev => prev.map(app => (app.id === data.id ? data : app)));
+            } else if (currentPageRef.current === 1) {
+                fetchApplicationsRef.current();
+            }
+        });
+    }, [token]);
 
     const handleNextPage = () => {
-        if (currentPage < totalPages) {
+        if (nextPageUrl) {
             setCurrentPage(prev => prev + 1);
+            fetchApplications(nextPageUrl);
         }
     };
 
     const handlePrevPage = () => {
-        if (currentPage > 1) {
+        if (prevPageUrl) {
             setCurrentPage(prev => prev - 1);
+            fetchApplications(prevPageUrl);
         }
     };
 
@@ -329,7 +340,7 @@ const Home = () => {
                 try {
                     await deleteApplication(appId);
                     // Обновляем состояние, чтобы удалить заявку без перезагрузки
-                    setAllApplications(prevApplications => prevApplications.filter(app => app.id !== appId));
+                    setApplications(prevApplications => prevApplications.filter(app => app.id !== appId));
                     openModal('Успех', 'Заявка успешно удалена!', () => {
                         closeModal();
                     });
@@ -393,14 +404,14 @@ const Home = () => {
                     >
                         <option value="">Все статусы</option>
                         {statusesForFilter.map(stat => (
-                            <option key={stat.id} value={stat.status}>
+                            <option key={stat.id} value={stat.id}>
                                 {stat.status}
                             </option>
                         ))}
                     </select>
                 </div>
 
-                {filteredApplications.length > 0 ? (
+                {applications.length > 0 ? (
                     <>
                         <div style={{ overflowX: 'auto', width: '100%' }}>
                             <table style={applicationsTableStyle}>
@@ -418,7 +429,7 @@ const Home = () => {
                                     </tr>
                                 </thead>
                                 <tbody>
-                                    {currentItems.map(app => (
+                                    {applications.map(app => (
                                         <tr key={app.id} style={tableRowStyle}>
                                             <td style={tableCellStyle}>{app.id}</td>
                                             <td style={tableCellStyle}>{app.identifier}</td>
@@ -443,22 +454,22 @@ const Home = () => {
                         </div>
 
                         {/* Блок пагинации */}
-                        {totalPages > 1 && (
+                        {(nextPageUrl || prevPageUrl) && (
                             <div style={paginationContainerStyle}>
                                 <button
                                     onClick={handlePrevPage}
-                                    disabled={currentPage === 1}
-                                    style={currentPage === 1 ? paginationButtonDisabledStyle : paginationButtonStyle}
+                                    disabled={!prevPageUrl}
+                                    style={!prevPageUrl ? paginationButtonDisabledStyle : paginationButtonStyle}
                                 >
                                     Предыдущая
                                 </button>
                                 <span style={paginationCurrentPageStyle}>
-                                    Страница {currentPage} из {totalPages}
+                                    Страница {currentPage}
                                 </span>
                                 <button
                                     onClick={handleNextPage}
-                                    disabled={currentPage === totalPages}
-                                    style={currentPage === totalPages ? paginationButtonDisabledStyle : paginationButtonStyle}
+                                    disabled={!nextPageUrl}
+                                    style={!nextPageUrl ? paginationButtonDisabledStyle : paginationButtonStyle}
                                 >
                                     Следующая
                                 </button>
@@ -1,6 +1,8 @@
 import axios from 'axios';
 
 const API_BASE_URL = 'http://127.0.0.1:8000/api';
+const BOOTSTRAP_STORAGE_KEY = 'bootstrap_cache';
+const BOOTSTRAP_TABLES = ['brigades', 'locations', 'objects', 'statuses'];
 
 const api = axios.create({
     baseURL: API_BASE_URL,
@@ -146,21 +148,91 @@ export const logoutUser = async () => {
     try {
         await api.post('/logout/');
         localStorage.removeItem('access_token');
+        localStorage.removeItem(BOOTSTRAP_STORAGE_KEY);
     } catch (error) {
         localStorage.removeItem('access_token');
+        localStorage.removeItem(BOOTSTRAP_STORAGE_KEY);
         throw handleApiError(error);
     }
 };
 
-export const getProtectedResource = async (path) => {
+export const getProtectedResource = async (path, params = undefined) => {
     try {
-        const response = await api.get(path);
+        const response = await api.get(path, { params });
         return response.data;
     } catch (error) {
         throw handleApiError(error);
     }
 };
 
+// Справочники и текущий пользователь одним запросом. Клиент отправляет версии
+// сохранённых таблиц, а сервер возвращает только изменившиеся.
+export const getBootstrap = async () => {
+    let cached = {};
+    try {
+        cached = JSON.parse(localStorage.getItem(BOOTSTRAP_STORAGE_KEY)) || {};
+    } catch (e) {
+        cached = {};
+    }
+    const versions = cached.versions || {};
+    try {
+        const response = await api.get('/bootstrap/', { params: versions });
+        const data = { ...cached, versions: response.data.versions, user: response.data.user };
+        BOOTSTRAP_TABLES.forEach(table => {
+            if (response.data[table] !== undefined) {
+                data[table] = response.data[table];
+            }
+        });
+        localStorage.setItem(BOOTSTRAP_STORAGE_KEY, JSON.stringify(data));
+        return data;
+    } catch (error) {
+        throw handleApiError(error);
+    }
+};
+
+// Поток событий о заявках (Server-Sent Events). EventSource не умеет передавать
+// заголовки, поэтому перед каждым подключением запрашивается одноразовый билет,
+// и в адрес попадает только он. Если поток на сервере выключен (ответ 404),
+// подписка не создаётся.
+const EVENTS_RECONNECT_MS = 5000;
+
+export const subscribeApplicationEvents = (onEvent) => {
+    let source = null;
+    let timeoutId = null;
+    let closed = false;
+
+    const connect = async () => {
+        let ticket;
+        try {
+            ticket = (await api.post('/events/ticket/')).data.ticket;
+        } catch (error) {
+            if (!closed && error.response?.status !== 404) {
+                timeoutId = setTimeout(connect, EVENTS_RECONNECT_MS);
+            }
+            return;
+        }
+        if (closed) return;
+        source = new EventSource(`${API_BASE_URL}/events/applications/?ticket=${encodeURIComponent(ticket)}`);
+        ['application.created', 'application.updated', 'application.deleted'].forEach(type => {
+            source.addEventListener(type, event => onEvent(type, JSON.parse(event.data)));
+        });
+        // Билет одноразовый: вместо автоматического переподключения EventSource берётся новый
+        source.onerror = () => {
+            source.close();
+            if (!closed) {
+                timeoutId = setTimeout(connect, EVENTS_RECONNECT_MS);
+            }
+        };
+    };
+
+    connect();
+    return () => {
+        closed = true;
+        clearTimeout(timeoutId);
+        if (source) source.close();
+    };
+};
+
 export const createApplication = async (applicationData) => {
     try {
         const response = await api.post('/applications/', applicationData);
@@ -0,0 +1,146 @@
+import hashlib
+import math
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, FloatField, Func, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .cache import reference_cache, get_table_version
+from .models import Brigade, Location, Object, Status, Application, ArchivedApplication
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Архив входит в статистику: перенос закрытых заявок не должен менять сводку
+APPLICATION_MODELS = (Application, ArchivedApplication)
+
+GROUPINGS = {
+    'by_status': ('status_id', Status, 'status'),
+    'by_brigade': ('brigade_id', Brigade, 'brigade'),
+    'by_location': ('location_id', Location, 'location'),
+    'by_object': ('object_instance_id', Object, 'object'),
+}
+
+
+class DurationSeconds(Func):
+    """Длительность end - start в секундах (float) средствами СУБД."""
+
+    arg_joiner = ' - '
+    template = 'EXTRACT(EPOCH FROM (%(expressions)s))::double precision'
+    output_field = FloatField()
+
+    def __init__(self, end, start, **extra):
+        super().__init__(end, start, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='((julianday(%(expressions)s)) * 86400.0)', arg_joiner=') - julianday(', **extra_context
+        )
+
+
+def application_querysets(**filters):
+    return [model.objects.filter(**filters).order_by() for model in APPLICATION_MODELS]
+
+
+def grouped_counts(querysets, column, model, field):
+    names = {pk: getattr(instance, field) for pk, instance in reference_cache(model).instances().items()}
+    counts = {}
+    for queryset in querysets:
+        for row in queryset.values(column).annotate(count=Count('id')):
+            counts[row[column]] = counts.get(row[column], 0) + row['count']
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0] is not None, item[0] or 0))
+    return [{'id': pk, 'name': names.get(pk), 'count': count} for pk, count in ordered]
+
+
+def time_to_close(querysets):
+    closed = [
+        queryset.filter(end_time__isnull=False).annotate(duration=DurationSeconds(F('end_time'), F('start_time')))
+        for queryset in querysets
+    ]
+    count, total_seconds = 0, 0.0
+    for queryset in closed:
+        summary = queryset.aggregate(count=Count('id'), mean=Avg('duration'))
+        if summary['count']:
+            count += summary['count']
+            total_seconds += summary['mean'] * summary['count']
+    result = {'count': count, 'mean_seconds': total_seconds / count if count else None}
+    for percentile in PERCENTILES:
+        result[f'p{percentile}_seconds'] = None
+    if not count:
+        return result
+
+    # Перцентили по ближайшему рангу: в СУБД сортируется объединение таблиц (UNION ALL),
+    # в Python приходит одна строка на перцентиль
+    durations = closed[0].values_list('duration', flat=True).union(
+        *(queryset.values_list('duration', flat=True) for queryset in closed[1:]), all=True
+    ).order_by('duration')
+    for percentile in PERCENTILES:
+        rank = max(1, math.ceil(percentile / 100 * count))
+        result[f'p{percentile}_seconds'] = durations[rank - 1]
+    return result
+
+
+def daily_histogram(start, end):
+    tz = timezone.get_current_timezone()
+    days = {}
+    for model in APPLICATION_MODELS:
+        opened = (
+            model.objects.filter(start_time__gte=start, start_time__lt=end)
+            .annotate(day=TruncDate('start_time', tzinfo=tz))
+            .order_by().values('day').annotate(count=Count('id'))
+        )
+        closed = (
+            model.objects.filter(end_time__gte=start, end_time__lt=end)
+            .annotate(day=TruncDate('end_time', tzinfo=tz))
+            .order_by().values('day').annotate(count=Count('id'))
+        )
+        for row in opened:
+            days.setdefault(row['day'], {'opened': 0, 'closed': 0})['opened'] += row['count']
+        for row in closed:
+            days.setdefault(row['day'], {'opened': 0, 'closed': 0})['closed'] += row['count']
+    return [{'date': day.isoformat(), **counts} for day, counts in sorted(days.items())]
+
+
+def application_statistics(start, end):
+    """Сводка по заявкам (рабочим и архивным), возникшим в [start, end): все агрегаты считает СУБД."""
+    querysets = application_querysets(start_time__gte=start, start_time__lt=end)
+    total = opened = 0
+    for queryset in querysets:
+        totals = queryset.aggregate(total=Count('id'), open=Count('id', filter=Q(end_time__isnull=True)))
+        total += totals['total']
+        opened += totals['open']
+    data = {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'total': total,
+        'open': opened,
+        'closed': total - opened,
+    }
+    for name, (column, model, field) in GROUPINGS.items():
+        data[name] = grouped_counts(querysets, column, model, field)
+    data['time_to_close'] = time_to_close(querysets)
+    data['daily'] = daily_histogram(start, end)
+    return data
+
+
+def cached_application_statistics(start=None, end=None, days=30):
+    """Сводка с кэшированием.
+
+    Открытый конец диапазона («до сейчас») округляется до ANALYTICS_BUCKET_SECONDS,
+    поэтому повторные загрузки панели в пределах интервала попадают в кэш.
+    Ключ включает версии таблиц, так что запись через API сразу сбрасывает кэш.
+    """
+    if end is None:
+        bucket = settings.ANALYTICS_BUCKET_SECONDS
+        now = int(timezone.now().timestamp())
+        end = datetime.fromtimestamp(now - now % bucket + bucket, tz=timezone.get_current_timezone())
+    if start is None:
+        start = end - timedelta(days=days)
+    versions = [get_table_version(model._meta.db_table) for model in (Application, Brigade, Location, Object, Status)]
+    key = 'api:analytics:' + hashlib.sha1('|'.join([start.isoformat(), end.isoformat()] + versions).encode()).hexdigest()
+    data = cache.get(key)
+    if data is None:
+        data = application_statistics(start, end)
+        cache.set(key, data, settings.ANALYTICS_CACHE_TIMEOUT)
+    return data
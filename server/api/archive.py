@@ -0,0 +1,63 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .cache import bump_table_version
+from .models import Application, ArchivedApplication, ApplicationChange
+
+ARCHIVED_FIELDS = (
+    'id', 'brigade_id', 'location_id', 'identifier', 'correction', 'object_instance_id',
+    'status_id', 'start_time', 'end_time', 'updated_at',
+)
+
+
+def archive_applications(older_than_days=None, batch_size=5000):
+    """Переносит заявки, закрытые раньше чем older_than_days дней назад, в ArchivedApplication.
+
+    Каждая пачка переносится своей транзакцией: INSERT в архив и DELETE из рабочей
+    таблицы. Суточные итоги не меняются — история в них сохраняется.
+    """
+    if older_than_days is None:
+        older_than_days = settings.ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    archived = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Application.objects.select_for_update()
+                .filter(end_time__lt=cutoff)
+                .order_by('id')
+                .values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not batch:
+                break
+            archived_batch = ArchivedApplication.objects.bulk_create([ArchivedApplication(**row) for row in batch])
+            Application.objects.filter(pk__in=[row['id'] for row in batch]).delete()
+            # Для клиентов синхронизации заявка исчезает из рабочего списка
+            ApplicationChange.record(ApplicationChange.DELETED, archived_batch)
+            bump_table_version(Application._meta.db_table)
+        archived += len(batch)
+        if len(batch) < batch_size:
+            break
+    return archived
+
+
+def prune_changes(older_than_days=None):
+    """Удаляет записи журнала ApplicationChange старше older_than_days дней.
+
+    Клиент синхронизации с более старым токеном получит 410 и загрузит список заново.
+    """
+    if older_than_days is None:
+        older_than_days = settings.CHANGES_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return ApplicationChange.objects.filter(changed_at__lt=cutoff).delete()[0]
+
+
+def find_application(identifier):
+    """Заявка по идентификатору: сначала рабочая таблица, затем архив. (заявка, в_архиве) или (None, False)."""
+    related = ('brigade', 'location', 'object_instance', 'status')
+    for model, archived in ((Application, False), (ArchivedApplication, True)):
+        instance = model.objects.select_related(*related).filter(identifier=identifier).first()
+        if instance is not None:
+            return instance, archived
+    return None, False
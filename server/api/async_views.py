@@ -0,0 +1,218 @@
+import asyncio
+import functools
+from types import SimpleNamespace
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import AuthenticationFailed, MethodNotAllowed, NotFound, ValidationError
+from rest_framework.filters import SearchFilter
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .authentication import CachedJWTAuthentication, CachedTokenUser, user_states
+from .cache import reference_cache, has_shared_versions
+from .events import get_broker, format_sse, redeem_stream_ticket
+from .filters import ApplicationFilterBackend, is_digits
+from .models import Application, ArchivedApplication
+from .pagination import ApplicationCursorPagination
+from .renderers import FastJSONRenderer
+from .rows import APPLICATION_FIELDS, application_columns, application_dicts, format_datetime, parse_fields
+from .views import BOOTSTRAP_TABLES, ApplicationViewSet
+
+EVENTS_KEEPALIVE_SECONDS = 15
+UNAUTHORIZED_DETAIL = "Учетные данные не были предоставлены или недействительны."
+EVENTS_DISABLED_DETAIL = "Поток событий выключен (EVENTS_ENABLED)."
+
+
+async def authenticate_request(request):
+    """Пользователь по JWT из заголовка Authorization."""
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if not raw_token:
+        return None
+    try:
+        # Проверка отзыва и кэш пользователей при промахе обращаются к БД
+        validated_token = await sync_to_async(authentication.get_validated_token)(raw_token)
+        return await sync_to_async(authentication.get_user)(validated_token)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def ticket_user(ticket):
+    user_id = redeem_stream_ticket(ticket)
+    state = user_states.get(user_id) if user_id is not None else None
+    if state is None or not state['is_active']:
+        return None
+    return CachedTokenUser({'user_id': user_id}, state)
+
+
+async def application_events(request):
+    """Поток событий о заявках (Server-Sent Events).
+
+    Открытое соединение не занимает поток: генератор ждёт в цикле событий ASGI.
+    Поэтому поток включается настройкой EVENTS_ENABLED только под ASGI-сервером.
+    Браузер подключается с ?ticket= из /api/events/ticket/, а не с JWT в адресе.
+    """
+    if not settings.EVENTS_ENABLED:
+        return JsonResponse({"detail": EVENTS_DISABLED_DETAIL}, status=404)
+    user = await authenticate_request(request)
+    if user is None and request.GET.get('ticket'):
+        user = await sync_to_async(ticket_user)(request.GET['ticket'])
+    if user is None:
+        return JsonResponse({"detail": UNAUTHORIZED_DETAIL}, status=401)
+
+    async def stream():
+        subscription = get_broker().subscribe()
+        try:
+            yield ': connected\n\n'
+            while True:
+                try:
+                    event = await subscription.get(timeout=EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                yield format_sse(event)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def json_response(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def not_found():
+    return json_response({"detail": NotFound.default_detail}, status=404)
+
+
+async def alist(queryset):
+    return [row async for row in queryset]
+
+
+def async_api_view(view):
+    """GET-view для ASGI: JWT-аутентификация и ошибки валидации в формате DRF-views.
+
+    Запросы async ORM Django выполняет в одном потоке на воркер, поэтому сколько бы
+    медленных клиентов ни ждали ответа, число потоков не растёт.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return json_response({"detail": MethodNotAllowed(request.method).detail}, status=405)
+        request.user = await authenticate_request(request)
+        if request.user is None:
+            return json_response({"detail": UNAUTHORIZED_DETAIL}, status=401)
+        try:
+            return await view(request, *args, **kwargs)
+        except ValidationError as e:
+            return json_response({"detail": "Ошибка валидации запроса.", "errors": e.detail}, status=400)
+    return wrapper
+
+
+async def load_reference_caches():
+    await asyncio.gather(*(reference_cache(model).ainstances() for model in BOOTSTRAP_TABLES.values()))
+
+
+def parse_before(value):
+    """Курсор ?before=<start_time>,<id>: следующая страница начинается после этой заявки."""
+    start_time, _, pk = value.rpartition(',')
+    start_time = parse_datetime(start_time)
+    if start_time is None or not is_digits(pk):
+        raise ValidationError({'before': "Неверный курсор."})
+    return Q(start_time__lt=start_time) | Q(start_time=start_time, id__lt=int(pk))
+
+
+@async_api_view
+async def application_list(request):
+    """Список заявок: фильтры, ?search= и ?fields= как у /api/applications/, страницы по ?before=."""
+    fields = parse_fields(request.GET.get('fields'))
+    page_size = request.GET.get('page_size', str(ApplicationCursorPagination.page_size))
+    if not is_digits(page_size) or not 1 <= int(page_size) <= ApplicationCursorPagination.max_page_size:
+        raise ValidationError({'page_size': f"Ожидается число от 1 до {ApplicationCursorPagination.max_page_size}."})
+    page_size = int(page_size)
+
+    params = SimpleNamespace(query_params=request.GET)
+    queryset = ApplicationFilterBackend().filter_queryset(params, Application.objects.all(), None)
+    queryset = SearchFilter().filter_queryset(params, queryset, ApplicationViewSet)
+    if request.GET.get('before'):
+        queryset = queryset.filter(parse_before(request.GET['before']))
+    columns = application_columns((fields or APPLICATION_FIELDS) + ['id', 'start_time'])
+    queryset = queryset.order_by('-start_time', '-id').values(*columns)[:page_size + 1]
+
+    # Страница и справочники для названий читаются независимо друг от друга
+    rows, _ = await asyncio.gather(alist(queryset), load_reference_caches())
+    next_url = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        params = request.GET.copy()
+        params['before'] = f"{rows[-1]['start_time'].isoformat()},{rows[-1]['id']}"
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    return json_response({'next': next_url, 'results': application_dicts(rows, fields, reload=False)})
+
+
+@async_api_view
+async def application_detail(request, pk):
+    """Заявка по ID из рабочей таблицы или из архива."""
+    fields = parse_fields(request.GET.get('fields'))
+    columns = application_columns(fields)
+    row, _ = await asyncio.gather(
+        Application.objects.filter(pk=pk).values(*columns).afirst(), load_reference_caches(),
+    )
+    archived = row is None
+    if archived:
+        row = await ArchivedApplication.objects.filter(pk=pk).values(*columns, 'archived_at').afirst()
+        if row is None:
+            return not_found()
+    data = application_dicts([row], fields, reload=False)[0]
+    if archived:
+        data['archived_at'] = format_datetime(row['archived_at'])
+    return json_response(data)
+
+
+@async_api_view
+async def reference_list(request, table):
+    model = BOOTSTRAP_TABLES.get(table)
+    if model is None:
+        return not_found()
+    _, rows = await reference_cache(model).aversioned_rows()
+    return json_response(rows)
+
+
+@async_api_view
+async def reference_detail(request, table, pk):
+    model = BOOTSTRAP_TABLES.get(table)
+    row = None
+    if model is not None:
+        _, rows = await reference_cache(model).aversioned_rows()
+        row = next((row for row in rows if row['id'] == pk), None)
+    if row is None:
+        return not_found()
+    return json_response(row)
+
+
+@async_api_view
+async def bootstrap(request):
+    """То же, что /api/bootstrap/; справочники загружаются одновременно."""
+    snapshots = await asyncio.gather(*(reference_cache(model).aversioned_rows() for model in BOOTSTRAP_TABLES.values()))
+    shared = has_shared_versions()
+    data = {'versions': {}}
+    for name, (version, rows) in zip(BOOTSTRAP_TABLES, snapshots):
+        if not shared:
+            data[name] = rows
+            continue
+        data['versions'][name] = version
+        if request.GET.get(name) != version:
+            data[name] = rows
+    user = request.user
+    data['user'] = {
+        'id': user.pk,
+        'username': user.username,
+        'email': getattr(user, 'email', ''),
+        'is_staff': user.is_staff,
+    }
+    return json_response(data)
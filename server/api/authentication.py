@@ -0,0 +1,166 @@
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .cache import bump_table_version, get_table_version
+from .models import RevokedToken
+
+USER_FIELDS = ('id', 'username', 'email', 'is_active', 'is_staff', 'is_superuser')
+
+
+class RevokedTokens:
+    """jti отозванных токенов в памяти процесса.
+
+    Множество перечитывается, когда меняется версия таблицы RevokedToken (см.
+    bump_table_version; с общим кэшем версий — и после отзыва в другом воркере)
+    или раз в REVOKED_TOKENS_SYNC_SECONDS. В остальное время проверка — поиск в set.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+
+    def _is_fresh(self, state, version):
+        return (
+            state is not None and state[0] == version
+            and time.monotonic() - state[1] < settings.REVOKED_TOKENS_SYNC_SECONDS
+        )
+
+    def jtis(self):
+        version = get_table_version(RevokedToken._meta.db_table)
+        state = self._state
+        if not self._is_fresh(state, version):
+            with self._lock:
+                state = self._state
+                if not self._is_fresh(state, version):
+                    jtis = frozenset(
+                        RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list('jti', flat=True)
+                    )
+                    state = self._state = (version, time.monotonic(), jtis)
+        return state[2]
+
+    def __contains__(self, jti):
+        return jti in self.jtis()
+
+    def clear(self):
+        self._state = None
+
+
+class UserStates:
+    """Поля пользователя для TokenUser, кэшируемые на AUTH_USER_CACHE_TIMEOUT секунд."""
+
+    def __init__(self):
+        self._states = {}
+
+    def get(self, user_id):
+        entry = self._states.get(user_id)
+        if entry is not None and time.monotonic() - entry[0] < settings.AUTH_USER_CACHE_TIMEOUT:
+            return entry[1]
+        state = User.objects.filter(pk=user_id).values(*USER_FIELDS).first()
+        self._states[user_id] = (time.monotonic(), state)
+        return state
+
+    def invalidate(self, user_id):
+        self._states.pop(user_id, None)
+
+    def clear(self):
+        self._states.clear()
+
+
+revoked_tokens = RevokedTokens()
+user_states = UserStates()
+
+
+def _user_changed(sender, instance, **kwargs):
+    user_states.invalidate(instance.pk)
+
+
+post_save.connect(_user_changed, sender=User)
+post_delete.connect(_user_changed, sender=User)
+
+
+def revoke_token(token):
+    """Отзывает токен до истечения его срока."""
+    jti = token.get(api_settings.JTI_CLAIM)
+    if not jti:
+        return
+    RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    RevokedToken.objects.get_or_create(
+        jti=jti, defaults={'expires_at': datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)}
+    )
+    bump_table_version(RevokedToken._meta.db_table)
+
+
+def is_token_revoked(token):
+    """Точная проверка по БД — для редких путей вроде обновления токена."""
+    return RevokedToken.objects.filter(jti=token.get(api_settings.JTI_CLAIM)).exists()
+
+
+class RevocableRefreshToken(RefreshToken):
+    """Refresh token без списка выданных токенов из token_blacklist: отзыв ведёт RevokedToken."""
+
+    def outstand(self):
+        return None
+
+
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RevocableRefreshToken
+
+
+class CachedTokenUser(TokenUser):
+    """TokenUser, чьи username, email и права берутся из кэша пользователей, а не из токена."""
+
+    def __init__(self, token, state):
+        super().__init__(token)
+        self.state = state
+
+    @property
+    def username(self):
+        return self.state['username']
+
+    @property
+    def email(self):
+        return self.state['email']
+
+    @property
+    def is_staff(self):
+        return self.state['is_staff']
+
+    @property
+    def is_superuser(self):
+        return self.state['is_superuser']
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT без запросов к БД на каждый запрос.
+
+    Подпись и срок проверяются как обычно, отзыв — по множеству в памяти,
+    пользователь — по кэшу UserStates. Запрос к БД нужен только при промахе кэша.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if token.get(api_settings.JTI_CLAIM) in revoked_tokens:
+            raise InvalidToken("Токен отозван.")
+        return token
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            raise InvalidToken("В токене нет идентификатора пользователя.")
+        state = user_states.get(user_id)
+        if state is None:
+            raise AuthenticationFailed("Пользователь не найден.", code='user_not_found')
+        if not state['is_active']:
+            raise AuthenticationFailed("Пользователь неактивен.", code='user_inactive')
+        return CachedTokenUser(validated_token, state)
@@ -0,0 +1,184 @@
+import random
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection, connections
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .models import Brigade, Location, Object, Status, Application
+
+PERCENTILES = (50, 95, 99)
+# Метрика, направление «лучше» (1 — больше лучше, -1 — меньше лучше)
+COMPARED_METRICS = (
+    ('throughput_rps', 1),
+    ('latency_p95_ms', -1),
+    ('queries_per_request', -1),
+)
+
+
+def _list(client, context, number):
+    return client.get('/api/applications/')
+
+
+def _filter(client, context, number):
+    status_id = context.rng.choice(context.status_ids)
+    location_id = context.rng.choice(context.location_ids)
+    return client.get(f'/api/applications/?status={status_id}&location={location_id}&is_open=true')
+
+
+def _create(client, context, number):
+    return client.post('/api/applications/', {
+        'identifier': f'{context.prefix}{number}',
+        'brigade': context.rng.choice(context.brigade_ids) if context.brigade_ids else None,
+        'location': context.rng.choice(context.location_ids),
+        'object_instance': context.rng.choice(context.object_ids),
+        'status': context.rng.choice(context.status_ids),
+        'start_time': timezone.now().isoformat(),
+    }, format='json')
+
+
+def _login(client, context, number):
+    return client.post('/api/login/', {'username': context.username, 'password': context.password}, format='json')
+
+
+def _refresh(client, context, number):
+    # Refresh token из cookie клиента ротируется при каждом обновлении
+    return client.post('/api/token/refresh/')
+
+
+SCENARIOS = {
+    'list': _list,
+    'filter': _filter,
+    'create': _create,
+    'login': _login,
+    'refresh': _refresh,
+}
+
+
+class BenchmarkContext:
+    def __init__(self, username, password, seed=None):
+        self.username = username
+        self.password = password
+        self.rng = random.Random(seed)
+        # Идентификатор заявки не длиннее 16 символов: префикс 10 символов и номер запроса
+        self.prefix = f'bn{int(time.time()) % 10 ** 8:08d}'
+        self.brigade_ids = list(Brigade.objects.values_list('id', flat=True))
+        self.location_ids = list(Location.objects.values_list('id', flat=True))
+        self.object_ids = list(Object.objects.values_list('id', flat=True))
+        self.status_ids = list(Status.objects.values_list('id', flat=True))
+        if not (self.location_ids and self.object_ids and self.status_ids):
+            raise ValueError("Справочники пусты: сначала заполните базу (--seed).")
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, percent):
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def summarize(samples, elapsed):
+    """samples — кортежи (секунды, запросов к БД, успех)."""
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    data = {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if not sample[2]),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'queries_per_request': round(sum(sample[1] for sample in samples) / len(samples), 2),
+        'latency_mean_ms': round(sum(latencies) / len(latencies), 3),
+    }
+    for percent in PERCENTILES:
+        data[f'latency_p{percent}_ms'] = round(percentile(latencies, percent), 3)
+    data['latency_max_ms'] = round(latencies[-1], 3)
+    return data
+
+
+def _client_loop(scenario, context, client_number, count, clients):
+    client = APIClient()
+    login = client.post('/api/login/', {'username': context.username, 'password': context.password}, format='json')
+    if login.status_code != 200:
+        raise ValueError(f"Не удалось войти как {context.username}: ответ {login.status_code}")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access_token']}")
+    counter = QueryCounter()
+    samples = []
+    with connection.execute_wrapper(counter):
+        for number in range(client_number, count * clients, clients):
+            counter.queries = 0
+            started = time.perf_counter()
+            response = scenario(client, context, number)
+            samples.append((time.perf_counter() - started, counter.queries, response.status_code < 400))
+    return samples
+
+
+def _worker(*args):
+    try:
+        return _client_loop(*args)
+    finally:
+        # Соединения этого потока больше не понадобятся
+        connections.close_all()
+
+
+def run_scenario(name, context, requests=200, clients=4):
+    """Выполняет requests запросов сценария name из clients параллельных клиентов."""
+    scenario = SCENARIOS[name]
+    per_client = max(1, requests // clients)
+    started = time.perf_counter()
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        if clients == 1:
+            # Без потоков запросы видят транзакцию вызывающего кода (например, теста)
+            results = [_client_loop(scenario, context, 0, per_client, 1)]
+        else:
+            with ThreadPoolExecutor(max_workers=clients) as executor:
+                results = list(executor.map(
+                    lambda client_number: _worker(scenario, context, client_number, per_client, clients),
+                    range(clients),
+                ))
+    elapsed = time.perf_counter() - started
+    return summarize([sample for samples in results for sample in samples], elapsed)
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(context, scenarios=tuple(SCENARIOS), requests=200, clients=4):
+    return {
+        'commit': current_commit(),
+        'created_at': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'applications': Application.objects.count(),
+        'brigades': len(context.brigade_ids),
+        'locations': len(context.location_ids),
+        'requests': requests,
+        'clients': clients,
+        'scenarios': {name: run_scenario(name, context, requests, clients) for name in scenarios},
+    }
+
+
+def compare_results(baseline, current, threshold=0.1):
+    """Строки (сценарий, метрика, было, стало, изменение, регрессия) для общих сценариев.
+
+    Регрессия — ухудшение метрики больше чем на threshold (доля).
+    """
+    rows = []
+    for name, after in current['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            continue
+        for metric, direction in COMPARED_METRICS:
+            old, new = before[metric], after[metric]
+            change = (new - old) / old if old else 0.0
+            rows.append((name, metric, old, new, change, -change * direction > threshold))
+    return rows
@@ -0,0 +1,142 @@
+from collections import Counter
+from django.utils import timezone
+from .models import Application, ArchivedApplication
+from .rollups import rollup_entries
+from .serializers import ApplicationBulkItemSerializer, ApplicationBulkSerializer
+
+
+class ApplicationBulkWriter:
+    """Пакетное создание, изменение и удаление заявок.
+
+    Все элементы проверяются до записи: справочники берутся из кэша, заявки для
+    изменения загружаются одним запросом, уникальность идентификаторов проверяется
+    одним запросом на весь пакет. Запись идёт пачками INSERT/UPDATE/DELETE;
+    run() нужно вызывать внутри transaction.atomic().
+    """
+
+    batch_size = 500
+
+    def __init__(self, mode, items, delete):
+        self.mode = mode
+        self.items = items
+        self.delete_ids = list(dict.fromkeys(delete))
+        self.results = [None] * len(items)
+        self.delete_results = []
+        self.created = []
+        self.updated = []
+        self.deleted = []
+        self.previous_entries = {}
+
+    @property
+    def error_count(self):
+        return sum(1 for result in self.results + self.delete_results if result and result['status'] == 'error')
+
+    def fail(self, index, errors):
+        self.results[index] = {'index': index, 'status': 'error', 'errors': errors}
+
+    def validate(self):
+        # type() вместо isinstance: JSON true/false — тоже int и указывали бы на заявку 1 или 0
+        update_ids = [item['id'] for item in self.items if type(item.get('id')) is int]
+        existing = self.existing = Application.objects.select_related(
+            'brigade', 'location', 'object_instance', 'status'
+        ).order_by().in_bulk(update_ids + self.delete_ids)
+
+        for pk in self.delete_ids:
+            if pk in existing:
+                self.delete_results.append({'id': pk, 'status': 'deleted'})
+            else:
+                self.delete_results.append({'id': pk, 'status': 'error', 'errors': {'id': ["Заявка не найдена."]}})
+        deleting = {result['id'] for result in self.delete_results if result['status'] == 'deleted'}
+
+        serializers = {}
+        seen = set()
+        for index, item in enumerate(self.items):
+            pk = item.get('id')
+            if pk is None:
+                serializer = ApplicationBulkItemSerializer(data=item)
+            elif type(pk) is not int or pk not in existing or pk in deleting:
+                self.fail(index, {'id': ["Заявка не найдена."]})
+                continue
+            elif pk in seen:
+                self.fail(index, {'id': ["Заявка повторяется в пакете."]})
+                continue
+            else:
+                seen.add(pk)
+                serializer = ApplicationBulkItemSerializer(existing[pk], data=item, partial=True)
+            if serializer.is_valid():
+                serializers[index] = serializer
+            else:
+                self.fail(index, serializer.errors)
+
+        self.validate_identifiers(serializers, deleting)
+        return serializers
+
+    def validate_identifiers(self, serializers, deleting):
+        identifiers = {}
+        for index, serializer in serializers.items():
+            identifier = serializer.validated_data.get('identifier')
+            if identifier is not None:
+                identifiers[index] = identifier
+        counts = Counter(identifiers.values())
+        taken = dict(
+            Application.objects.filter(identifier__in=counts)
+            .exclude(pk__in=deleting)
+            .order_by()
+            .values_list('identifier', 'pk')
+        )
+        archived = set(
+            ArchivedApplication.objects.filter(identifier__in=counts).order_by().values_list('identifier', flat=True)
+        )
+        for index, identifier in identifiers.items():
+            own_pk = serializers[index].instance.pk if serializers[index].instance else None
+            if counts[identifier] > 1:
+                error = "Идентификатор повторяется в пакете."
+            elif identifier in taken and taken[identifier] != own_pk:
+                error = "Заявка с таким идентификатором уже существует."
+            elif identifier in archived:
+                error = "Заявка с таким идентификатором есть в архиве."
+            else:
+                continue
+            del serializers[index]
+            self.fail(index, {'identifier': [error]})
+
+    def run(self):
+        serializers = self.validate()
+        if self.mode == ApplicationBulkSerializer.ATOMIC and self.error_count:
+            for index in serializers:
+                self.results[index] = {'index': index, 'status': 'skipped'}
+            return False
+
+        to_create, to_update, update_fields = [], [], {'updated_at'}
+        now = timezone.now()
+        for index, serializer in serializers.items():
+            if serializer.instance is None:
+                to_create.append((index, Application(**serializer.validated_data)))
+            else:
+                instance = serializer.instance
+                self.previous_entries[instance.pk] = rollup_entries(instance)
+                for field, value in serializer.validated_data.items():
+                    setattr(instance, field, value)
+                    update_fields.add(field)
+                instance.updated_at = now
+                to_update.append((index, instance))
+
+        self.deleted = [
+            self.existing[result['id']] for result in self.delete_results if result['status'] == 'deleted'
+        ]
+        if self.deleted:
+            Application.objects.filter(pk__in=[instance.pk for instance in self.deleted]).delete()
+        if to_create:
+            Application.objects.bulk_create([instance for _, instance in to_create], batch_size=self.batch_size)
+        if to_update:
+            Application.objects.bulk_update(
+                [instance for _, instance in to_update], sorted(update_fields), batch_size=self.batch_size
+            )
+
+        for index, instance in to_create:
+            self.results[index] = {'index': index, 'status': 'created', 'id': instance.pk}
+        for index, instance in to_update:
+            self.results[index] = {'index': index, 'status': 'updated', 'id': instance.pk}
+        self.created = [instance for _, instance in to_create]
+        self.updated = [instance for _, instance in to_update]
+        return True
@@ -0,0 +1,152 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from .models import Brigade, Location, Object, Status
+
+VERSION_KEY_PREFIX = 'api:table-version:'
+
+_local_versions = {}
+
+
+def _shared_cache():
+    alias = getattr(settings, 'REFERENCE_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def _new_version():
+    return f'{time.time_ns():x}'
+
+
+def has_shared_versions():
+    """Общие ли версии таблиц у всех воркеров (задан REFERENCE_CACHE_ALIAS).
+
+    Только тогда версию можно отдавать клиенту для проверки актуальности: версия
+    в памяти процесса не меняется от записей через другие воркеры.
+    """
+    return _shared_cache() is not None
+
+
+def get_table_version(table):
+    """Текущая версия таблицы. Меняется при каждой записи через API."""
+    shared = _shared_cache()
+    if shared is None:
+        version = _local_versions.get(table)
+        if version is None:
+            version = _local_versions.setdefault(table, _new_version())
+        return version
+    key = VERSION_KEY_PREFIX + table
+    version = shared.get(key)
+    if version is None:
+        shared.add(key, _new_version(), None)
+        version = shared.get(key)
+    return version
+
+
+def bump_table_version(table):
+    def bump():
+        version = _new_version()
+        shared = _shared_cache()
+        if shared is None:
+            _local_versions[table] = version
+        else:
+            shared.set(VERSION_KEY_PREFIX + table, version, None)
+    transaction.on_commit(bump)
+
+
+class ReferenceCache:
+    """Процессный кэш небольшой справочной таблицы.
+
+    Таблица целиком загружается одним запросом и перечитывается, только когда
+    меняется её версия (см. bump_table_version) или истекает REFERENCE_CACHE_TIMEOUT.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.table = model._meta.db_table
+        self._lock = threading.Lock()
+        self._state = None
+
+    def _is_fresh(self, state, version):
+        timeout = getattr(settings, 'REFERENCE_CACHE_TIMEOUT', None)
+        if state is None or state[0] != version:
+            return False
+        return timeout is None or time.monotonic() - state[1] < timeout
+
+    def _snapshot(self):
+        version = get_table_version(self.table)
+        state = self._state
+        if self._is_fresh(state, version):
+            return state
+        with self._lock:
+            state = self._state
+            if not self._is_fresh(state, version):
+                queryset = self.model.objects.all()
+                rows = list(queryset.values())
+                instances = {}
+                for row in rows:
+                    instances[row['id']] = self.model.from_db(queryset.db, list(row), list(row.values()))
+                state = (version, time.monotonic(), rows, instances)
+                self._state = state
+        return state
+
+    async def _asnapshot(self):
+        # Для async-кода: свежий снимок отдаётся без потока, иначе таблица читается async ORM
+        version = get_table_version(self.table)
+        state = self._state
+        if self._is_fresh(state, version):
+            return state
+        queryset = self.model.objects.all()
+        rows = [row async for row in queryset.values()]
+        instances = {}
+        for row in rows:
+            instances[row['id']] = self.model.from_db(queryset.db, list(row), list(row.values()))
+        state = self._state = (version, time.monotonic(), rows, instances)
+        return state
+
+    def rows(self):
+        return self._snapshot()[2]
+
+    async def aversioned_rows(self):
+        state = await self._asnapshot()
+        return state[0], state[2]
+
+    async def ainstances(self):
+        return (await self._asnapshot())[3]
+
+    def loaded_instances(self):
+        """Последний загруженный снимок без проверки версии и без запросов к БД."""
+        state = self._state
+        return state[3] if state is not None else {}
+
+    def versioned_rows(self):
+        state = self._snapshot()
+        return state[0], state[2]
+
+    def instances(self):
+        return self._snapshot()[3]
+
+    def get(self, pk):
+        return self.instances().get(pk)
+
+    def invalidate(self):
+        self._state = None
+        bump_table_version(self.table)
+
+    def clear(self):
+        self._state = None
+
+
+_reference_caches = {model: ReferenceCache(model) for model in (Brigade, Location, Object, Status)}
+
+
+def reference_cache(model):
+    """Кэш справочника для модели или None, если модель не справочная."""
+    return _reference_caches.get(model)
+
+
+def clear_reference_caches():
+    _local_versions.clear()
+    for cache in _reference_caches.values():
+        cache.clear()
@@ -0,0 +1,42 @@
+from django.db.models import Min
+from .models import ApplicationChange
+
+
+def changes_since(since, limit):
+    """Изменения после токена since: ([(ID заявки, идентификатор, действие)], новый токен, есть ли ещё).
+
+    SQLite: токен — id последнего отданного изменения. PostgreSQL: токен — номер первой
+    ещё не отданной транзакции; отдаются только транзакции меньше pg_snapshot_xmin,
+    поэтому изменение, зафиксированное позже соседних, не будет пропущено.
+    """
+    if not ApplicationChange.uses_transaction_ids():
+        rows = list(
+            ApplicationChange.objects.filter(id__gt=since).order_by('id')
+            .values_list('id', 'application_id', 'identifier', 'action')[:limit + 1]
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return [row[1:] for row in rows], rows[-1][0] if rows else since, has_more
+
+    horizon = ApplicationChange.visible_horizon()
+    queryset = ApplicationChange.objects.filter(transaction_id__gte=since, transaction_id__lt=horizon)
+    columns = ('transaction_id', 'application_id', 'identifier', 'action')
+    rows = list(queryset.order_by('transaction_id', 'id').values_list(*columns)[:limit + 1])
+    if len(rows) <= limit:
+        return [row[1:] for row in rows], max(since, horizon), False
+    # Страница не делит транзакцию: иначе продолжить с середины было бы нечем
+    boundary = rows[limit][0]
+    rows = [row for row in rows[:limit] if row[0] < boundary]
+    if rows:
+        return [row[1:] for row in rows], boundary, True
+    rows = list(queryset.filter(transaction_id=boundary).order_by('id').values_list(*columns))
+    return [row[1:] for row in rows], boundary + 1, queryset.filter(transaction_id__gt=boundary).exists()
+
+
+def is_change_token_expired(since):
+    """Старше ли токен самой старой записи журнала (см. prune_changes)."""
+    if not ApplicationChange.uses_transaction_ids():
+        oldest = ApplicationChange.objects.aggregate(oldest=Min('id'))['oldest']
+        return oldest is not None and since < oldest - 1
+    oldest = ApplicationChange.objects.aggregate(oldest=Min('transaction_id'))['oldest']
+    return oldest is not None and since < oldest
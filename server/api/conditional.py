@@ -0,0 +1,52 @@
+import hashlib
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from .cache import get_table_version, has_shared_versions
+
+
+class ConditionalGetMixin:
+    """ETag и Last-Modified для list/retrieve по версиям таблиц.
+
+    Валидаторы считаются из версий таблиц, от которых зависит ответ, без
+    сериализации и без запросов к базе, поэтому ответ 304 почти ничего не стоит.
+    Версии должны быть общими для воркеров (REFERENCE_CACHE_ALIAS): иначе
+    воркер, не видевший записи, отвечал бы 304 на изменённые данные, поэтому
+    без общего кэша валидаторы не отправляются.
+    """
+
+    version_models = ()
+
+    def get_version_models(self):
+        return self.version_models or (self.queryset.model,)
+
+    def get_validators(self, request):
+        """(ETag, Last-Modified) или None, если версии таблиц не общие."""
+        if not has_shared_versions():
+            return None
+        versions = [get_table_version(model._meta.db_table) for model in self.get_version_models()]
+        parts = versions + [request.get_full_path(), request.accepted_media_type]
+        etag = '"%s"' % hashlib.sha1('|'.join(parts).encode()).hexdigest()
+        # Версия — время записи в наносекундах (см. bump_table_version)
+        last_modified = max(int(version, 16) for version in versions) // 10 ** 9
+        return etag, last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        validators = self.get_validators(request)
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        etag, last_modified = validators
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,125 @@
+import heapq
+from collections import defaultdict
+from django.db.models import Count, Sum
+from .cache import reference_cache
+from .models import Brigade, Application, ApplicationDailyRollup
+
+AFFINITY_WEIGHT = 2.0
+
+
+class Dispatcher:
+    """Выбор бригады для заявки.
+
+    Стоимость назначения = открытые заявки бригады − AFFINITY_WEIGHT × доля заявок
+    этого местоположения, которые бригада закрывала раньше. Бригады без опыта на
+    местоположении различаются только нагрузкой, поэтому из них берётся вершина
+    кучи по нагрузке; бригады с опытом проверяются явно — их обычно единицы.
+    Решение занимает O(k + log n), где k — число бригад с опытом на местоположении.
+    """
+
+    def __init__(self, brigade_ids, workload=None, affinity=None, affinity_weight=AFFINITY_WEIGHT):
+        self.affinity_weight = affinity_weight
+        self.workload = {pk: 0 for pk in brigade_ids}
+        for pk, count in (workload or {}).items():
+            if pk in self.workload:
+                self.workload[pk] = count
+        self.affinity = defaultdict(dict)
+        self.location_totals = defaultdict(int)
+        for (brigade_id, location_id), count in (affinity or {}).items():
+            if brigade_id in self.workload:
+                self.affinity[location_id][brigade_id] = count
+                self.location_totals[location_id] += count
+        self._heap = [(count, pk) for pk, count in self.workload.items()]
+        heapq.heapify(self._heap)
+
+    @classmethod
+    def from_database(cls, **kwargs):
+        """Нагрузка — открытые заявки бригад, опыт — суточные итоги по бригадам и местоположениям."""
+        brigade_ids = list(reference_cache(Brigade).instances())
+        workload = dict(
+            Application.objects.filter(end_time__isnull=True, brigade__isnull=False)
+            .order_by().values_list('brigade_id').annotate(count=Count('id'))
+        )
+        affinity = {
+            (brigade_id, location_id): opened
+            for brigade_id, location_id, opened in ApplicationDailyRollup.objects
+            .exclude(brigade_id=ApplicationDailyRollup.NO_BRIGADE)
+            .order_by().values_list('brigade_id', 'location_id').annotate(opened=Sum('opened'))
+            if opened > 0
+        }
+        return cls(brigade_ids, workload, affinity, **kwargs)
+
+    def _least_loaded(self):
+        # Ленивое удаление: устаревшие записи кучи выбрасываются при чтении
+        while self._heap:
+            count, pk = self._heap[0]
+            if self.workload.get(pk) == count:
+                return pk
+            heapq.heappop(self._heap)
+        return None
+
+    def _set_workload(self, pk, count):
+        self.workload[pk] = count
+        heapq.heappush(self._heap, (count, pk))
+
+    def cost(self, brigade_id, location_id):
+        total = self.location_totals.get(location_id)
+        share = self.affinity[location_id].get(brigade_id, 0) / total if total else 0.0
+        return self.workload[brigade_id] - self.affinity_weight * share
+
+    def choose(self, location_id):
+        """(бригада, стоимость) или (None, None), если бригад нет. Нагрузка не меняется."""
+        candidates = list(self.affinity.get(location_id, ()))
+        least_loaded = self._least_loaded()
+        if least_loaded is not None:
+            candidates.append(least_loaded)
+        if not candidates:
+            return None, None
+        brigade_id = min(candidates, key=lambda pk: (self.cost(pk, location_id), pk))
+        return brigade_id, self.cost(brigade_id, location_id)
+
+    def assign(self, location_id, learn=False):
+        """Выбирает бригаду и учитывает новую заявку в её нагрузке (и опыте, если learn)."""
+        brigade_id, cost = self.choose(location_id)
+        if brigade_id is not None:
+            self._set_workload(brigade_id, self.workload[brigade_id] + 1)
+            if learn:
+                self.affinity[location_id][brigade_id] = self.affinity[location_id].get(brigade_id, 0) + 1
+                self.location_totals[location_id] += 1
+        return brigade_id, cost
+
+    def release(self, brigade_id):
+        """Заявка бригады закрыта."""
+        if self.workload.get(brigade_id, 0) > 0:
+            self._set_workload(brigade_id, self.workload[brigade_id] - 1)
+
+    def plan(self, applications):
+        """Назначения для открытых заявок без бригады: самые старые выбирают первыми.
+
+        applications — кортежи (id, location_id, start_time).
+        """
+        queue = [(start_time, pk, location_id) for pk, location_id, start_time in applications]
+        heapq.heapify(queue)
+        proposals = []
+        while queue:
+            start_time, pk, location_id = heapq.heappop(queue)
+            brigade_id, cost = self.assign(location_id)
+            if brigade_id is None:
+                break
+            proposals.append({'id': pk, 'brigade': brigade_id, 'cost': round(cost, 3)})
+        return proposals
+
+
+def unassigned_applications(limit):
+    return list(
+        Application.objects.filter(brigade__isnull=True, end_time__isnull=True)
+        .order_by('start_time', 'id')
+        .values_list('id', 'location_id', 'start_time')[:limit]
+    )
+
+
+def jain_index(values):
+    """Индекс справедливости Джайна: 1 — нагрузка распределена поровну."""
+    values = list(values)
+    squares = sum(value * value for value in values)
+    return sum(values) ** 2 / (len(values) * squares) if squares else 1.0
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import secrets
+import threading
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    def __init__(self, broker, loop, max_size):
+        self.broker = broker
+        self.loop = loop
+        self.queue = asyncio.Queue(max_size)
+
+    def put(self, event):
+        # Медленный клиент не должен копить события бесконечно: старые отбрасываются
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker:
+    """Брокер событий в памяти процесса.
+
+    Подписчики — очереди asyncio в цикле событий ASGI-сервера, публиковать можно
+    из любого потока (например, из синхронных view DRF). Другой бэкенд (Redis и т. п.)
+    должен реализовать те же subscribe/unsubscribe/publish.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscription = Subscription(self, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # Цикл событий уже закрыт
+                self.unsubscribe(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscriptions)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                options = getattr(settings, 'EVENTS_BROKER', {})
+                backend = import_string(options.get('BACKEND', 'api.events.InMemoryBroker'))
+                _broker = backend(**options.get('OPTIONS', {}))
+    return _broker
+
+
+def publish_application_event(action, data, token=None):
+    """Публикует событие о заявке после фиксации транзакции."""
+    event = {'event': f'application.{action}', 'id': token, 'data': data}
+    transaction.on_commit(lambda: get_broker().publish(event))
+
+
+TICKET_SALT = 'api.events.ticket'
+
+
+def issue_stream_ticket(user_id):
+    """Билет на подключение к потоку событий.
+
+    EventSource не умеет передавать заголовки, а JWT в адресе попадал бы в журналы
+    сервера. Билет подписан SECRET_KEY, действует EVENTS_TICKET_SECONDS секунд
+    и принимается один раз.
+    """
+    return signing.dumps({'user': user_id, 'nonce': secrets.token_urlsafe(12)}, salt=TICKET_SALT)
+
+
+def redeem_stream_ticket(ticket):
+    """ID пользователя из билета или None, если билет подделан, просрочен или уже использован."""
+    try:
+        payload = signing.loads(ticket, salt=TICKET_SALT, max_age=settings.EVENTS_TICKET_SECONDS)
+    except signing.BadSignature:
+        return None
+    # Повторное предъявление отклоняется (в других воркерах — если кэш по умолчанию общий)
+    if not cache.add(f"api:events-ticket:{payload['nonce']}", True, settings.EVENTS_TICKET_SECONDS):
+        return None
+    return payload['user']
+
+
+def format_sse(event):
+    lines = []
+    if event.get('id') is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['event']}")
+    lines.append(f"data: {json.dumps(event['data'], ensure_ascii=False, default=str)}")
+    return '\n'.join(lines) + '\n\n'
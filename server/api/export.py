@@ -0,0 +1,42 @@
+import csv
+import json
+from itertools import islice
+from asgiref.sync import sync_to_async
+from .rows import APPLICATION_FIELDS, application_tuples
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def csv_rows(queryset):
+    writer = csv.writer(Echo())
+    # BOM, чтобы Excel распознал UTF-8
+    yield '\ufeff' + writer.writerow(APPLICATION_FIELDS)
+    for row in application_tuples(queryset):
+        yield writer.writerow(row)
+
+
+def ndjson_rows(queryset):
+    for row in application_tuples(queryset):
+        yield json.dumps(dict(zip(APPLICATION_FIELDS, row)), ensure_ascii=False) + '\n'
+
+
+async def achunks(rows, chunk_size=500):
+    """Асинхронный обход синхронного генератора пачками по chunk_size строк.
+
+    Под ASGI StreamingHttpResponse с синхронным итератором сначала собирает его
+    целиком в список. Пачки читаются в общем синхронном потоке (thread_sensitive),
+    поэтому курсор на сервере БД остаётся на одном соединении.
+    """
+    next_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)), thread_sensitive=True)
+    while chunk := await next_chunk():
+        for row in chunk:
+            yield row
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_rows, 'text/csv; charset=utf-8'),
+    'ndjson': (ndjson_rows, 'application/x-ndjson; charset=utf-8'),
+}
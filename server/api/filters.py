@@ -0,0 +1,49 @@
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+
+def is_digits(value):
+    """Строка из цифр 0–9. str.isdigit() принимает и '²', на котором int() падает."""
+    return value.isascii() and value.isdigit()
+
+
+class ApplicationFilterBackend(BaseFilterBackend):
+    id_filters = {
+        'status': 'status_id',
+        'brigade': 'brigade_id',
+        'location': 'location_id',
+        'object': 'object_instance_id',
+    }
+    time_filters = {
+        'start_time_after': 'start_time__gte',
+        'start_time_before': 'start_time__lte',
+        'end_time_after': 'end_time__gte',
+        'end_time_before': 'end_time__lte',
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        lookups = {}
+        for param, lookup in self.id_filters.items():
+            value = params.get(param)
+            if value:
+                if not is_digits(value):
+                    raise serializers.ValidationError({param: "Ожидается числовой ID."})
+                lookups[lookup] = int(value)
+        for param, lookup in self.time_filters.items():
+            value = params.get(param)
+            if value:
+                parsed = parse_datetime(value)
+                if parsed is None:
+                    raise serializers.ValidationError({param: "Неверный формат даты и времени."})
+                if timezone.is_naive(parsed):
+                    parsed = timezone.make_aware(parsed)
+                lookups[lookup] = parsed
+        is_open = params.get('is_open')
+        if is_open in ('true', '1'):
+            lookups['end_time__isnull'] = True
+        elif is_open in ('false', '0'):
+            lookups['end_time__isnull'] = False
+        return queryset.filter(**lookups) if lookups else queryset
@@ -0,0 +1,104 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+from collections.abc import Mapping
+from datetime import date, datetime, time
+from decimal import Decimal
+from logging.handlers import QueueHandler, QueueListener
+from uuid import UUID
+from django.db.models import Model
+
+# Аргументы этих типов безопасно форматировать позже в фоновом потоке
+LAZY_ARG_TYPES = (str, int, float, bool, type(None), Decimal, datetime, date, time, UUID)
+
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+def log_fields(data):
+    """validated_data и подобное в виде, пригодном для лога: модели заменяются их ID.
+
+    Так строка лога не вызывает __str__ моделей, а значит, и лишних запросов к БД.
+    """
+    if isinstance(data, Model):
+        return data.pk
+    if isinstance(data, Mapping):
+        return {key: log_fields(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [log_fields(value) for value in data]
+    return data
+
+
+class JSONFormatter(logging.Formatter):
+    """Одна JSON-строка на запись; поля из extra попадают в запись как есть."""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'process': record.process,
+            'thread': record.thread,
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """Кладёт записи в очередь; в файл и консоль их пишет отдельный поток.
+
+    handlers — имена обработчиков из LOGGING, которым поток передаёт записи.
+    Сообщение форматируется в фоновом потоке, если аргументы простых типов;
+    иначе (модели, словари) — сразу, как в обычном QueueHandler, чтобы фоновый
+    поток не обращался к чужим объектам и к БД.
+    """
+
+    def __init__(self, handlers, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.handler_names = handlers
+        self.listener = None
+        self._start_lock = threading.Lock()
+
+    def prepare(self, record):
+        args = record.args
+        if args:
+            values = args.values() if isinstance(args, Mapping) else args
+            if not all(isinstance(value, LAZY_ARG_TYPES) for value in values):
+                record.msg = record.getMessage()
+                record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self.listener is None:
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Запрос не ждёт диска: при переполнении очереди запись теряется
+            pass
+
+    def start(self):
+        with self._start_lock:
+            if self.listener is None:
+                handlers = [resolve_handler(name) for name in self.handler_names]
+                self.listener = QueueListener(self.queue, *[h for h in handlers if h], respect_handler_level=True)
+                self.listener.start()
+                atexit.register(self.stop)
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+def resolve_handler(name):
+    if hasattr(logging, 'getHandlerByName'):
+        return logging.getHandlerByName(name)
+    return logging._handlers.get(name)
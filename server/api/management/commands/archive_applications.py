@@ -0,0 +1,24 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.archive import archive_applications, prune_changes
+
+
+class Command(BaseCommand):
+    help = "Переносит давно закрытые заявки в архивную таблицу и удаляет старые записи журнала изменений."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+                            help="Архивировать заявки, закрытые больше указанного числа дней назад.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--changes-days', type=int, default=settings.CHANGES_RETENTION_DAYS,
+                            help="Удалить записи журнала изменений старше указанного числа дней.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        archived = archive_applications(options['days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Перенесено в архив заявок: {archived}, {time.monotonic() - started:.1f} с"
+        ))
+        pruned = prune_changes(options['changes_days'])
+        self.stdout.write(f"Удалено записей журнала изменений: {pruned}")
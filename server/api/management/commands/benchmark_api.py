@@ -0,0 +1,81 @@
+import json
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api.benchmark import SCENARIOS, BenchmarkContext, compare_results, run_benchmark
+from api.seeding import seed_reference_data, seed_applications
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон API: параллельные клиенты выполняют сценарии (список, фильтр, создание, вход, "
+        "обновление токена), для каждого печатаются p50/p95/p99, запросы/с и запросы к БД на запрос. "
+        "Сценарий create добавляет заявки bn*: запускайте на отдельной базе."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help=f"Сценарии: {', '.join(SCENARIOS)} (по умолчанию все).")
+        parser.add_argument('--requests', type=int, default=200, help="Запросов на сценарий.")
+        parser.add_argument('--clients', type=int, default=4, help="Число параллельных клиентов.")
+        parser.add_argument('--seed', type=int, default=0, help="Сколько заявок добавить перед прогоном.")
+        parser.add_argument('--brigades', type=int, default=200)
+        parser.add_argument('--locations', type=int, default=500)
+        parser.add_argument('--objects', type=int, default=100)
+        parser.add_argument('--user', default='benchmark', help="Пользователь клиентов; создаётся при отсутствии.")
+        parser.add_argument('--password', default='benchmark-pass')
+        parser.add_argument('--output', help="Сохранить результаты в JSON-файл.")
+        parser.add_argument('--compare', help="JSON-файл предыдущего прогона для сравнения.")
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help="Допустимое ухудшение метрики при сравнении (доля, по умолчанию 0.1).")
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'] or list(SCENARIOS)
+        unknown = [name for name in scenarios if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f"Неизвестные сценарии: {', '.join(unknown)}")
+        if options['seed']:
+            seed_reference_data(options['brigades'], options['locations'], options['objects'])
+            created = seed_applications(options['seed'])
+            self.stdout.write(f"Добавлено заявок: {created}")
+
+        user, created = User.objects.get_or_create(username=options['user'])
+        if created or not user.check_password(options['password']):
+            user.set_password(options['password'])
+            user.save()
+
+        try:
+            context = BenchmarkContext(options['user'], options['password'])
+            results = run_benchmark(context, scenarios, options['requests'], max(1, options['clients']))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"База {results['database']}, заявок {results['applications']}, клиентов {results['clients']}, "
+            f"коммит {results['commit'] or '—'}"
+        )
+        self.stdout.write(
+            f"{'Сценарий':<10} {'запросов':>8} {'ошибок':>7} {'запр/с':>9} {'p50 мс':>9} {'p95 мс':>9} "
+            f"{'p99 мс':>9} {'SQL/запр':>9}"
+        )
+        for name, data in results['scenarios'].items():
+            self.stdout.write(
+                f"{name:<10} {data['requests']:>8} {data['errors']:>7} {data['throughput_rps']:>9.1f} "
+                f"{data['latency_p50_ms']:>9.2f} {data['latency_p95_ms']:>9.2f} {data['latency_p99_ms']:>9.2f} "
+                f"{data['queries_per_request']:>9.2f}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Результаты сохранены в {options['output']}")
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            self.stdout.write(f"Сравнение с коммитом {baseline.get('commit') or '—'}:")
+            regressions = 0
+            for name, metric, old, new, change, regressed in compare_results(baseline, results, options['threshold']):
+                line = f"{name:<10} {metric:<20} {old:>10.2f} → {new:>10.2f} ({change:+.1%})"
+                self.stdout.write(self.style.ERROR(line) if regressed else line)
+                regressions += regressed
+            if regressions:
+                raise CommandError(f"Регрессий: {regressions}")
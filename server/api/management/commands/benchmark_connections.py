@@ -0,0 +1,79 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.test import override_settings
+from rest_framework.test import APIClient
+from api import metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает запросы/с к эндпоинту при соединении с БД на каждый запрос (CONN_MAX_AGE=0) "
+        "и при текущих настройках соединений."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/applications/')
+        parser.add_argument('--requests', type=int, default=200, help="Запросов на каждый прогон.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Число параллельных клиентов.")
+        parser.add_argument('--user', help="Пользователь для запросов (по умолчанию первый суперпользователь).")
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(username=options['user']) if options['user'] else User.objects.filter(is_superuser=True)
+        self.user = users.order_by('id').first()
+        if self.user is None:
+            raise CommandError("Пользователь для запросов не найден.")
+
+        settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+        configured = settings_dict['CONN_MAX_AGE']
+        results = {}
+        try:
+            runs = (
+                ("без переиспользования (CONN_MAX_AGE=0)", 0),
+                (f"текущие настройки (CONN_MAX_AGE={configured})", configured),
+            )
+            for title, max_age in runs:
+                # Новые потоки создают соединения по этому словарю настроек
+                settings_dict['CONN_MAX_AGE'] = max_age
+                results[title] = self.run(options)
+        finally:
+            settings_dict['CONN_MAX_AGE'] = configured
+
+        for title, (rate, latency, opened) in results.items():
+            self.stdout.write(f"{title}: {rate:.0f} запросов/с, среднее {latency:.2f} мс, открыто соединений {opened}")
+        (before, *_), (after, *_) = results.values()
+        self.stdout.write(self.style.SUCCESS(f"Ускорение: {after / before:.2f}×"))
+
+    def run(self, options):
+        per_client = max(1, options['requests'] // options['concurrency'])
+        opened_before = self.opened()
+        started = time.perf_counter()
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                latencies = sum(executor.map(lambda _: self.client_loop(options['path'], per_client),
+                                             range(options['concurrency'])), [])
+        elapsed = time.perf_counter() - started
+        return len(latencies) / elapsed, sum(latencies) / len(latencies) * 1000, self.opened() - opened_before
+
+    def client_loop(self, path, count):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        latencies = []
+        try:
+            for _ in range(count):
+                started = time.perf_counter()
+                # Тестовый клиент не закрывает соединения сам: повторяем то, что делает обработчик запросов
+                close_old_connections()
+                response = client.get(path)
+                close_old_connections()
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    raise CommandError(f"{path}: ответ {response.status_code}")
+        finally:
+            connections.close_all()
+        return latencies
+
+    def opened(self):
+        return metrics.registry.values().get((metrics.db_connections_total.name, (DEFAULT_DB_ALIAS,)), 0)
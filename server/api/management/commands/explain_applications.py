@@ -0,0 +1,60 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from api.models import Brigade, Status, Application
+from api.seeding import seed_reference_data, seed_applications
+
+
+class Command(BaseCommand):
+    help = "Выполняет EXPLAIN для основных запросов к заявкам и показывает используемые индексы."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Сколько тестовых заявок добавить перед анализом (только при DEBUG=True).")
+        parser.add_argument('--analyze', action='store_true',
+                            help="EXPLAIN ANALYZE (только PostgreSQL): запрос выполняется по-настоящему.")
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            if not settings.DEBUG:
+                raise CommandError("--seed записывает тестовые заявки в настроенную БД и доступен только при DEBUG=True.")
+            seed_reference_data()
+            created = seed_applications(options['seed'])
+            self.stdout.write(f"Добавлено заявок: {created}")
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(Application._meta.db_table)}')
+
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+
+        index_names = [index.name for index in Application._meta.indexes]
+        for title, queryset in self.hot_queries():
+            plan = queryset.explain(**explain_options)
+            used = [name for name in index_names if name in plan]
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(plan)
+            if used:
+                self.stdout.write(self.style.SUCCESS(f"Индексы: {', '.join(used)}"))
+            else:
+                self.stdout.write(self.style.WARNING("Составные индексы заявок не используются."))
+            self.stdout.write('')
+
+    def hot_queries(self):
+        queryset = Application.objects.select_related('brigade', 'location', 'object_instance', 'status')
+        ordered = queryset.order_by('-start_time', '-id')
+        status = Status.objects.first()
+        brigade = Brigade.objects.first()
+        week_ago = timezone.now() - timedelta(days=7)
+        queries = [("Список заявок", ordered[:21])]
+        if status:
+            queries.append((
+                "Заявки по статусу за неделю",
+                ordered.filter(status=status, start_time__gte=week_ago)[:21],
+            ))
+        if brigade:
+            queries.append(("Заявки бригады", ordered.filter(brigade=brigade)[:21]))
+        queries.append(("Открытые заявки", ordered.filter(end_time__isnull=True)[:21]))
+        return queries
@@ -0,0 +1,253 @@
+import csv
+import io
+import json
+import sys
+import time
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+from api.cache import reference_cache
+from api.models import Brigade, Location, Object, Status, Application, ApplicationChange, ArchivedApplication
+from api.serializers import ApplicationSerializer, ApplicationBulkItemSerializer
+from api.views import ApplicationViewSet
+
+COPY_COLUMNS = [
+    'identifier', 'brigade_id', 'location_id', 'object_instance_id', 'status_id',
+    'correction', 'start_time', 'end_time', 'updated_at',
+]
+
+
+class ReferenceMap:
+    """Натуральный ключ справочника -> ID, недостающие записи создаются по запросу."""
+
+    def __init__(self, model, field, create):
+        self.model = model
+        self.field = field
+        self.create = create
+        self.ids = dict(model.objects.values_list(field, 'id'))
+        self.created = 0
+
+    def resolve(self, value):
+        pk = self.ids.get(value)
+        if pk is None:
+            if not self.create:
+                raise ValueError(f"{self.model._meta.verbose_name} «{value}» не найден(о).")
+            try:
+                self.model._meta.get_field(self.field).run_validators(value)
+            except ValidationError as e:
+                raise ValueError(f"{self.model._meta.verbose_name} «{value}»: {' '.join(e.messages)}")
+            pk = self.model.objects.get_or_create(**{self.field: value})[0].pk
+            self.ids[value] = pk
+            self.created += 1
+        return pk
+
+
+class Command(BaseCommand):
+    help = "Потоковый импорт заявок из CSV или NDJSON (столбцы как в выгрузке /api/applications/export/)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Путь к файлу или «-» для стандартного ввода.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help="Формат входных данных (по умолчанию по расширению файла).")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--no-create-references', action='store_true',
+                            help="Не создавать недостающие бригады, местоположения, объекты и статусы.")
+        parser.add_argument('--skip-existing', action='store_true',
+                            help="Пропускать заявки с уже существующим идентификатором.")
+        parser.add_argument('--skip-invalid', action='store_true',
+                            help="Пропускать некорректные строки вместо остановки импорта.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        create = not options['no_create_references']
+        self.references = {
+            'brigade': ReferenceMap(Brigade, 'brigade', create),
+            'location': ReferenceMap(Location, 'location', create),
+            'object': ReferenceMap(Object, 'object', create),
+            'status': ReferenceMap(Status, 'status', create),
+        }
+        self.use_copy = connection.vendor == 'postgresql' and not options['skip_existing']
+        self.skip_existing = options['skip_existing']
+        self.skip_invalid = options['skip_invalid']
+        # Те же проверки полей, что и у API; уникальность идентификатора проверяется пакетом
+        self.fields = ApplicationBulkItemSerializer().fields
+        self.changed = ApplicationViewSet().applications_changed
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        try:
+            records = csv.DictReader(stream) if input_format == 'csv' else self.read_ndjson(stream)
+            imported, skipped = self.import_records(records, options['batch_size'])
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for name, reference in self.references.items():
+            if reference.created:
+                reference_cache(reference.model).invalidate()
+                self.stdout.write(f"Создано записей справочника {reference.model._meta.verbose_name_plural}: {reference.created}")
+        self.stdout.write(self.style.SUCCESS(f"Импортировано заявок: {imported}, пропущено строк: {skipped}"))
+
+    def read_ndjson(self, stream):
+        # Строки разбираются в parse, чтобы ошибка JSON прошла через --skip-invalid
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield line
+
+    def reject(self, line_number, error):
+        if not self.skip_invalid:
+            raise CommandError(f"Запись {line_number}: {error}")
+        self.stderr.write(f"Запись {line_number} пропущена: {error}")
+
+    def import_records(self, records, batch_size):
+        started = time.monotonic()
+        imported = skipped = 0
+        batch = []
+        for line_number, record in enumerate(records, start=1):
+            try:
+                batch.append((line_number, self.parse(record)))
+            except (ValueError, KeyError) as e:
+                self.reject(line_number, e)
+                skipped += 1
+                continue
+            if len(batch) >= batch_size:
+                written, rejected = self.write_batch(batch)
+                imported, skipped, batch = imported + written, skipped + rejected, []
+                self.report(imported, started)
+        if batch:
+            written, rejected = self.write_batch(batch)
+            imported, skipped = imported + written, skipped + rejected
+            self.report(imported, started)
+        return imported, skipped
+
+    def write_batch(self, batch):
+        """Проверяет идентификаторы пакета (повторы в файле, рабочая таблица, архив)
+        двумя запросами и записывает остальные строки.
+        """
+        identifiers = [row[0] for _, row in batch]
+        archived = set(
+            ArchivedApplication.objects.filter(identifier__in=identifiers).values_list('identifier', flat=True)
+        )
+        existing = set(Application.objects.filter(identifier__in=identifiers).values_list('identifier', flat=True))
+        serializer = ApplicationSerializer(context={'archived_identifiers': archived})
+        rows = []
+        seen = set()
+        for line_number, row in batch:
+            identifier = row[0]
+            # Повтор в файле — та же заявка, что уже будет записана строкой выше
+            if identifier in existing or identifier in seen:
+                if not self.skip_existing:
+                    self.reject(line_number, f"заявка {identifier} уже существует.")
+                continue
+            try:
+                serializer.validate_identifier(identifier)
+            except serializers.ValidationError as e:
+                self.reject(line_number, ' '.join(map(str, e.detail)))
+                continue
+            seen.add(identifier)
+            rows.append(row)
+        return (self.write(rows) if rows else 0), len(batch) - len(rows)
+
+    def report(self, imported, started):
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write(f"Импортировано {imported} строк, {imported / elapsed:.0f} строк/с")
+
+    def parse(self, record):
+        if isinstance(record, str):
+            record = json.loads(record)
+        if not isinstance(record, dict):
+            raise ValueError("ожидается JSON-объект.")
+
+        def value(*names):
+            # Выгрузка содержит и ID, и названия справочников; для импорта нужны названия
+            for name in names:
+                if record.get(name) not in (None, ''):
+                    return record[name]
+            return None
+
+        identifier = value('identifier')
+        if not identifier:
+            raise ValueError("не указан идентификатор.")
+        start_time = self.parse_datetime(value('start_time'), 'start_time')
+        if start_time is None:
+            raise ValueError("не указано время возникновения.")
+        brigade = value('brigade_number', 'brigade')
+        location, object_name, status = value('location_name', 'location'), value('object_name', 'object'), value('status_name', 'status')
+        if not (location and object_name and status):
+            raise ValueError("не указаны местоположение, объект или статус.")
+        return (
+            self.validate_field('identifier', str(identifier)),
+            self.references['brigade'].resolve(int(brigade)) if brigade is not None else None,
+            self.references['location'].resolve(str(location)),
+            self.references['object'].resolve(str(object_name)),
+            self.references['status'].resolve(str(status)),
+            self.validate_field('correction', value('correction')),
+            start_time,
+            self.parse_datetime(value('end_time'), 'end_time'),
+        )
+
+    def validate_field(self, name, raw):
+        try:
+            return self.fields[name].run_validation(raw)
+        except serializers.ValidationError as e:
+            raise ValueError(f"{name}: {' '.join(map(str, e.detail))}")
+
+    def parse_datetime(self, raw, name):
+        if raw is None:
+            return None
+        parsed = parse_datetime(str(raw))
+        if parsed is None:
+            raise ValueError(f"неверный формат {name}: {raw}")
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+    def write(self, batch):
+        now = timezone.now()
+        applications = [
+            Application(
+                identifier=identifier, brigade_id=brigade_id, location_id=location_id,
+                object_instance_id=object_id, status_id=status_id, correction=correction,
+                start_time=start_time, end_time=end_time, updated_at=now,
+            )
+            for identifier, brigade_id, location_id, object_id, status_id, correction, start_time, end_time in batch
+        ]
+        with transaction.atomic():
+            if self.use_copy:
+                self.copy(batch, now)
+            else:
+                Application.objects.bulk_create(applications, ignore_conflicts=self.skip_existing)
+            # COPY и bulk_create с ignore_conflicts не возвращают ID: вставленные строки
+            # (пропущенные существующие не меняются) находятся по идентификатору и updated_at не раньше now
+            applications = list(
+                Application.objects.filter(
+                    identifier__in=[application.identifier for application in applications], updated_at__gte=now
+                ).only('id', 'identifier', 'brigade_id', 'location_id', 'status_id', 'start_time', 'end_time')
+            )
+            if applications:
+                # Журнал изменений, суточные итоги и версия таблицы — как при записи через API,
+                # но без сериализации каждой строки: подписчики получают одно событие на пакет
+                self.changed(ApplicationChange.CREATED, applications, batch_event=True)
+            return len(applications)
+
+    def copy(self, batch, now):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow([
+                '' if value is None else value.isoformat() if hasattr(value, 'isoformat') else value
+                for value in row + (now,)
+            ])
+        buffer.seek(0)
+        table = connection.ops.quote_name(Application._meta.db_table)
+        columns = ', '.join(connection.ops.quote_name(column) for column in COPY_COLUMNS)
+        sql = f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)'
+        with connection.cursor() as cursor:
+            raw_cursor = cursor.cursor
+            if hasattr(raw_cursor, 'copy_expert'):
+                raw_cursor.copy_expert(sql, buffer)
+            else:
+                with raw_cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
@@ -0,0 +1,41 @@
+import json
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework.test import APIClient
+from api.profiling import registry, METRICS
+
+
+class Command(BaseCommand):
+    help = "Выполняет GET-запросы к эндпоинтам в этом процессе с включённым профилированием и печатает статистику."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=['/api/applications/', '/api/statuses/', '/api/bootstrap/'])
+        parser.add_argument('--repeat', type=int, default=20, help="Сколько раз запросить каждый путь.")
+        parser.add_argument('--user', help="Имя пользователя, от которого идут запросы (по умолчанию первый суперпользователь).")
+        parser.add_argument('--json', action='store_true', help="Вывести полный отчёт в JSON.")
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(username=options['user']) if options['user'] else User.objects.filter(is_superuser=True)
+        user = users.order_by('id').first()
+        if user is None:
+            raise CommandError("Пользователь для запросов не найден.")
+
+        registry.reset()
+        with override_settings(PROFILING_ENABLED=True, ALLOWED_HOSTS=['testserver']):
+            client = APIClient()
+            client.force_authenticate(user)
+            for path in options['paths']:
+                for _ in range(options['repeat']):
+                    response = client.get(path)
+                    if response.status_code >= 400:
+                        raise CommandError(f"{path}: ответ {response.status_code}")
+
+        report = registry.report()
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+        self.stdout.write(f"{'Эндпоинт':<40} {'запросов':>8} " + ' '.join(f'{metric + " p50/p95":>22}' for metric in METRICS))
+        for endpoint, data in report.items():
+            columns = ' '.join(f"{data[metric]['p50']:>10.2f} /{data[metric]['p95']:>10.2f}" for metric in METRICS)
+            self.stdout.write(f"{endpoint:<40} {data['requests']:>8} {columns}")
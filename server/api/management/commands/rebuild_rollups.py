@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from api.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает суточные итоги по заявкам с нуля, параллельно по отрезкам истории."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-days', type=int, default=30,
+                            help="Длина отрезка истории в днях, считаемого одним потоком.")
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Число параллельных потоков (1 — в текущем потоке).")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        chunks, rows = rebuild_rollups(chunk_days=options['chunk_days'], workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Итоги пересчитаны: отрезков {chunks}, строк итогов {rows}, {time.monotonic() - started:.1f} с"
+        ))
@@ -0,0 +1,60 @@
+import heapq
+import time
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from api.cache import reference_cache
+from api.dispatch import AFFINITY_WEIGHT, Dispatcher, jain_index
+from api.models import Brigade, Application
+
+
+class Command(BaseCommand):
+    help = "Воспроизводит историю заявок через планировщик бригад и оценивает скорость и равномерность назначений."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help="Сколько первых по времени заявок воспроизвести.")
+        parser.add_argument('--affinity-weight', type=float, default=AFFINITY_WEIGHT,
+                            help="Вес опыта бригады на местоположении относительно её нагрузки.")
+
+    def handle(self, *args, **options):
+        brigade_ids = list(reference_cache(Brigade).instances())
+        if not brigade_ids:
+            raise CommandError("Нет бригад для назначения.")
+        # Опыт накапливается по ходу воспроизведения, нагрузка — по открытым в этот момент заявкам
+        dispatcher = Dispatcher(brigade_ids, affinity_weight=options['affinity_weight'])
+        history = (
+            Application.objects.order_by('start_time', 'id')
+            .values_list('location_id', 'start_time', 'end_time', 'brigade_id')
+        )
+        if options['limit']:
+            history = history[:options['limit']]
+
+        closing = []
+        assigned = Counter()
+        decision_times = []
+        same_as_history = peak = 0
+        for sequence, (location_id, start_time, end_time, brigade_id) in enumerate(history.iterator(chunk_size=5000)):
+            while closing and closing[0][0] <= start_time:
+                dispatcher.release(heapq.heappop(closing)[2])
+            started = time.perf_counter()
+            chosen, _ = dispatcher.assign(location_id, learn=True)
+            decision_times.append(time.perf_counter() - started)
+            assigned[chosen] += 1
+            same_as_history += chosen == brigade_id
+            peak = max(peak, dispatcher.workload[chosen])
+            if end_time is not None:
+                heapq.heappush(closing, (end_time, sequence, chosen))
+
+        decisions = len(decision_times)
+        if not decisions:
+            raise CommandError("Нет заявок для воспроизведения.")
+        decision_times.sort()
+        total = sum(decision_times)
+        self.stdout.write(f"Решений: {decisions}, бригад: {len(brigade_ids)}")
+        self.stdout.write(f"Пропускная способность: {decisions / max(total, 1e-9):.0f} решений/с")
+        self.stdout.write(
+            f"Время решения: среднее {total / decisions * 1e6:.1f} мкс, "
+            f"p99 {decision_times[min(decisions - 1, int(decisions * 0.99))] * 1e6:.1f} мкс"
+        )
+        self.stdout.write(f"Индекс Джайна по числу заявок: {jain_index(assigned[pk] for pk in brigade_ids):.3f}")
+        self.stdout.write(f"Пиковая нагрузка бригады: {peak} открытых заявок")
+        self.stdout.write(f"Совпадений с фактическим назначением: {same_as_history / decisions:.1%}")
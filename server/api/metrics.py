@@ -0,0 +1,212 @@
+import atexit
+import glob
+import json
+import os
+import threading
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+class MetricsRegistry:
+    """Счётчики в памяти процесса в духе Prometheus.
+
+    Каждый поток пишет в собственный словарь, поэтому увеличение счётчика не берёт
+    блокировку; блокировка нужна только при первом обращении потока и при чтении.
+    Если задан METRICS_MULTIPROC_DIR, процесс периодически сохраняет свои значения
+    в файл <pid>.json этого каталога, а /metrics суммирует файлы всех воркеров.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(self, name, documentation, tuple(labelnames))
+        self.metrics[name] = metric
+        return metric
+
+    def _shard(self):
+        shard = getattr(self._local, 'values', None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._start_flusher()
+        return shard
+
+    def inc(self, key, amount):
+        shard = self._shard()
+        shard[key] = shard.get(key, 0) + amount
+
+    def values(self):
+        totals = {}
+        with self._lock:
+            shards = [dict(shard) for shard in self._shards]
+        for shard in shards:
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+
+    def _directory(self):
+        return getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+
+    def _start_flusher(self):
+        if self._flusher is not None or not self._directory():
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Event()
+                threading.Thread(target=self._flush_periodically, name='metrics-flush', daemon=True).start()
+                atexit.register(self.flush)
+
+    def _flush_periodically(self):
+        while not self._flusher.wait(settings.METRICS_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        directory = self._directory()
+        if not directory:
+            return
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        data = [[name, list(labels), value] for (name, labels), value in self.values().items()]
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+    def collect(self):
+        """Значения всех процессов: свои — из памяти, чужие — из файлов каталога."""
+        totals = self.values()
+        directory = self._directory()
+        if directory:
+            own = os.path.join(directory, f'{os.getpid()}.json')
+            for path in glob.glob(os.path.join(directory, '*.json')):
+                if path == own:
+                    continue
+                try:
+                    with open(path, encoding='utf-8') as file:
+                        data = json.load(file)
+                except (OSError, ValueError):
+                    continue
+                for name, labels, value in data:
+                    key = (name, tuple(labels))
+                    totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus 0.0.4."""
+        totals = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} counter')
+            samples = sorted((labels, value) for (metric_name, labels), value in totals.items() if metric_name == name)
+            if not samples and not metric.labelnames:
+                samples = [((), 0)]
+            for labels, value in samples:
+                label_text = ','.join(
+                    f'{label}="{escape_label(value_)}"' for label, value_ in zip(metric.labelnames, labels)
+                )
+                lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class Counter:
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def inc(self, amount=1, **labels):
+        self.registry.inc((self.name, tuple(str(labels[label]) for label in self.labelnames)), amount)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+registry = MetricsRegistry()
+
+requests_total = registry.counter(
+    'api_requests_total', "HTTP-запросы по маршруту, методу и коду ответа.", ['route', 'method', 'status']
+)
+logins_total = registry.counter('api_logins_total', "Попытки входа по результату.", ['result'])
+token_refreshes_total = registry.counter('api_token_refreshes_total', "Обновления access token по результату.", ['result'])
+applications_created_total = registry.counter('api_applications_created_total', "Созданные заявки.")
+applications_closed_total = registry.counter('api_applications_closed_total', "Закрытые заявки.")
+db_connections_total = registry.counter('api_db_connections_total', "Открытые соединения с БД.", ['alias'])
+db_queries_total = registry.counter('api_db_queries_total', "Запросы к БД из HTTP-запросов.", ['alias'])
+exceptions_total = registry.counter(
+    'api_exceptions_total', "Ошибки, обработанные custom_exception_handler.", ['exception', 'status']
+)
+
+
+def _count_connection(sender, connection, **kwargs):
+    db_connections_total.inc(alias=connection.alias)
+
+
+connection_created.connect(_count_connection)
+
+
+class QueryCounter:
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        db_queries_total.inc(alias=self.alias)
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Считает запросы по маршруту и коду ответа и запросы к БД. Выключается METRICS_ENABLED.
+
+    Поддерживает и async-цепочку, чтобы под ASGI async-views не переводились в поток.
+    Запросы к БД из async-views выполняются в потоке с другими соединениями и не считаются.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.counters = {}
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                counter = self.counters.get(connection.alias)
+                if counter is None:
+                    counter = self.counters[connection.alias] = QueryCounter(connection.alias)
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        self.count_request(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self.count_request(request, response)
+        return response
+
+    def count_request(self, request, response):
+        match = request.resolver_match
+        requests_total.inc(
+            route=match.view_name if match else 'unmatched', method=request.method, status=response.status_code
+        )
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:02
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Brigade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('brigade', models.IntegerField(unique=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Номер бригады')),
+            ],
+            options={
+                'verbose_name': 'Бригада',
+                'verbose_name_plural': 'Бригады',
+                'db_table': 'Brigade',
+                'ordering': ['brigade'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(max_length=64, unique=True, verbose_name='Местоположение')),
+            ],
+            options={
+                'verbose_name': 'Местоположение',
+                'verbose_name_plural': 'Местоположения',
+                'db_table': 'Location',
+                'ordering': ['location'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Object',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object', models.CharField(max_length=64, unique=True, verbose_name='Название объекта')),
+            ],
+            options={
+                'verbose_name': 'Объект',
+                'verbose_name_plural': 'Объекты',
+                'db_table': 'Object',
+                'ordering': ['object'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Status',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=32, unique=True, verbose_name='Статус закрытия заявки')),
+            ],
+            options={
+                'verbose_name': 'Статус',
+                'verbose_name_plural': 'Статусы',
+                'db_table': 'Status',
+                'ordering': ['status'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Application',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('identifier', models.CharField(max_length=16, unique=True, verbose_name='Идентификатор заявки')),
+                ('correction', models.TextField(blank=True, null=True, verbose_name='Примечание к заявке')),
+                ('start_time', models.DateTimeField(verbose_name='Время возникновения заявки')),
+                ('end_time', models.DateTimeField(blank=True, null=True, verbose_name='Время закрытия заявки')),
+                ('brigade', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='applications', to='api.brigade', verbose_name='Бригада')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applications', to='api.location', verbose_name='Местоположение')),
+                ('object_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applications', to='api.object', verbose_name='Объект')),
+                ('status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applications', to='api.status', verbose_name='Статус')),
+            ],
+            options={
+                'verbose_name': 'Заявка',
+                'verbose_name_plural': 'Заявки',
+                'db_table': 'Application',
+                'ordering': ['-start_time'],
+            },
+        ),
+    ]
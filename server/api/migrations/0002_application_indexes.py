@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['-start_time', '-id'], name='application_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['status', '-start_time', '-id'], name='application_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['brigade', '-start_time', '-id'], name='application_brigade_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(condition=models.Q(('end_time__isnull', True)), fields=['-start_time', '-id'], name='application_open_start_idx'),
+        ),
+    ]
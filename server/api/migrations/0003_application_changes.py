@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_application_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('application_id', models.BigIntegerField(verbose_name='ID заявки')),
+                ('identifier', models.CharField(max_length=16, verbose_name='Идентификатор заявки')),
+                ('action', models.CharField(choices=[('created', 'Создание'), ('updated', 'Изменение'), ('deleted', 'Удаление')], max_length=8, verbose_name='Действие')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, verbose_name='Время изменения')),
+            ],
+            options={
+                'verbose_name': 'Изменение заявки',
+                'verbose_name_plural': 'Изменения заявок',
+                'db_table': 'ApplicationChange',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Время изменения заявки'),
+        ),
+    ]
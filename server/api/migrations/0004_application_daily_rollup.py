@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_application_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('status_id', models.BigIntegerField(verbose_name='ID статуса')),
+                ('brigade_id', models.BigIntegerField(default=0, verbose_name='ID бригады (0 — без бригады)')),
+                ('location_id', models.BigIntegerField(verbose_name='ID местоположения')),
+                ('opened', models.IntegerField(default=0, verbose_name='Возникло заявок')),
+                ('closed', models.IntegerField(default=0, verbose_name='Закрыто заявок')),
+                ('close_seconds', models.FloatField(default=0, verbose_name='Суммарное время до закрытия, с')),
+            ],
+            options={
+                'verbose_name': 'Суточный итог по заявкам',
+                'verbose_name_plural': 'Суточные итоги по заявкам',
+                'db_table': 'ApplicationDailyRollup',
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'status_id', 'brigade_id', 'location_id'), name='application_rollup_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_application_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedApplication',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('identifier', models.CharField(max_length=16, unique=True, verbose_name='Идентификатор заявки')),
+                ('correction', models.TextField(blank=True, null=True, verbose_name='Примечание к заявке')),
+                ('start_time', models.DateTimeField(verbose_name='Время возникновения заявки')),
+                ('end_time', models.DateTimeField(verbose_name='Время закрытия заявки')),
+                ('updated_at', models.DateTimeField(verbose_name='Время изменения заявки')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Время переноса в архив')),
+                ('brigade', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_applications', to='api.brigade', verbose_name='Бригада')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_applications', to='api.location', verbose_name='Местоположение')),
+                ('object_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_applications', to='api.object', verbose_name='Объект')),
+                ('status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_applications', to='api.status', verbose_name='Статус')),
+            ],
+            options={
+                'verbose_name': 'Архивная заявка',
+                'verbose_name_plural': 'Архивные заявки',
+                'db_table': 'ArchivedApplication',
+                'ordering': ['-start_time'],
+                'indexes': [models.Index(fields=['-start_time', '-id'], name='archived_start_idx')],
+            },
+        ),
+    ]
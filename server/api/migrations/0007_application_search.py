@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# Полнотекстовый и триграммный поиск есть только в PostgreSQL;
+# на других БД поиск идёт по индексу в памяти (см. api/search.py)
+FORWARD_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """
+    ALTER TABLE "Application" ADD COLUMN "search_vector" tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce("identifier", '')), 'A')
+        || setweight(to_tsvector('russian', coalesce("correction", '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX "application_search_idx" ON "Application" USING GIN ("search_vector")',
+    'CREATE INDEX "application_identifier_trgm_idx" ON "Application" USING GIN ("identifier" gin_trgm_ops)',
+    'CREATE INDEX "location_trgm_idx" ON "Location" USING GIN ("location" gin_trgm_ops)',
+    'CREATE INDEX "object_trgm_idx" ON "Object" USING GIN ("object" gin_trgm_ops)',
+]
+
+REVERSE_SQL = [
+    'DROP INDEX IF EXISTS "object_trgm_idx"',
+    'DROP INDEX IF EXISTS "location_trgm_idx"',
+    'DROP INDEX IF EXISTS "application_identifier_trgm_idx"',
+    'ALTER TABLE "Application" DROP COLUMN IF EXISTS "search_vector"',
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for sql in statements:
+                schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_revoked_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgresql(FORWARD_SQL), run_on_postgresql(REVERSE_SQL)),
+    ]
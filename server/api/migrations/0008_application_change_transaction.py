@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_application_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicationchange',
+            name='transaction_id',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Номер транзакции (PostgreSQL)'),
+        ),
+        migrations.AlterField(
+            model_name='applicationchange',
+            name='changed_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Время изменения'),
+        ),
+        migrations.AddIndex(
+            model_name='applicationchange',
+            index=models.Index(fields=['transaction_id', 'id'], name='application_change_xact_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import connection, models
 from django.core.validators import MinValueValidator
 from django.contrib.auth.models import User
 
@@ -93,12 +93,174 @@ class Application(models.Model):
     )
     start_time = models.DateTimeField(null=False, blank=False, verbose_name="Время возникновения заявки")
     end_time = models.DateTimeField(null=True, blank=True, verbose_name="Время закрытия заявки")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Время изменения заявки")
 
     class Meta:
         verbose_name = "Заявка"
         verbose_name_plural = "Заявки"
         ordering = ['-start_time']
         db_table = 'Application'
+        indexes = [
+            models.Index(fields=['-start_time', '-id'], name='application_start_idx'),
+            models.Index(fields=['status', '-start_time', '-id'], name='application_status_start_idx'),
+            models.Index(fields=['brigade', '-start_time', '-id'], name='application_brigade_start_idx'),
+            models.Index(
+                fields=['-start_time', '-id'],
+                name='application_open_start_idx',
+                condition=models.Q(end_time__isnull=True),
+            ),
+        ]
 
     def __str__(self):
-        return f"Заявка {self.identifier} ({self.object_instance.object})"
\ No newline at end of file
+        return f"Заявка {self.identifier} ({self.object_instance.object})"
+
+class ArchivedApplication(models.Model):
+    """Заявка, закрытая давно и перенесённая из Application (см. api/archive.py).
+
+    ID сохраняется прежним, поэтому ссылки на заявку остаются действительными.
+    """
+
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID")
+    brigade = models.ForeignKey(
+        Brigade,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_applications',
+        verbose_name="Бригада"
+    )
+    location = models.ForeignKey(
+        Location, on_delete=models.CASCADE, related_name='archived_applications', verbose_name="Местоположение"
+    )
+    identifier = models.CharField(max_length=16, unique=True, verbose_name="Идентификатор заявки")
+    correction = models.TextField(null=True, blank=True, verbose_name="Примечание к заявке")
+    object_instance = models.ForeignKey(
+        Object, on_delete=models.CASCADE, related_name='archived_applications', verbose_name="Объект"
+    )
+    status = models.ForeignKey(
+        Status, on_delete=models.CASCADE, related_name='archived_applications', verbose_name="Статус"
+    )
+    start_time = models.DateTimeField(verbose_name="Время возникновения заявки")
+    end_time = models.DateTimeField(verbose_name="Время закрытия заявки")
+    updated_at = models.DateTimeField(verbose_name="Время изменения заявки")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Время переноса в архив")
+
+    class Meta:
+        verbose_name = "Архивная заявка"
+        verbose_name_plural = "Архивные заявки"
+        ordering = ['-start_time']
+        db_table = 'ArchivedApplication'
+        indexes = [
+            models.Index(fields=['-start_time', '-id'], name='archived_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"Архивная заявка {self.identifier}"
+
+class ApplicationChange(models.Model):
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTION_CHOICES = [
+        (CREATED, "Создание"),
+        (UPDATED, "Изменение"),
+        (DELETED, "Удаление"),
+    ]
+
+    # Токен синхронизации (см. ApplicationViewSet.changes). В SQLite записи идут строго
+    # по очереди, и порядок id совпадает с порядком фиксации. В PostgreSQL id выдаются
+    # до фиксации и могут стать видимыми не по порядку, поэтому токеном служит номер
+    # транзакции: всё, что меньше pg_snapshot_xmin, уже зафиксировано или отменено
+    application_id = models.BigIntegerField(verbose_name="ID заявки")
+    identifier = models.CharField(max_length=16, verbose_name="Идентификатор заявки")
+    action = models.CharField(max_length=8, choices=ACTION_CHOICES, verbose_name="Действие")
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Время изменения")
+    transaction_id = models.BigIntegerField(null=True, blank=True, verbose_name="Номер транзакции (PostgreSQL)")
+
+    class Meta:
+        verbose_name = "Изменение заявки"
+        verbose_name_plural = "Изменения заявок"
+        ordering = ['id']
+        db_table = 'ApplicationChange'
+        indexes = [
+            models.Index(fields=['transaction_id', 'id'], name='application_change_xact_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} заявки {self.identifier}"
+
+    @staticmethod
+    def uses_transaction_ids():
+        return connection.vendor == 'postgresql'
+
+    @classmethod
+    def current_transaction_id(cls):
+        if not cls.uses_transaction_ids():
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_current_xact_id()::text::bigint")
+            return cursor.fetchone()[0]
+
+    @classmethod
+    def visible_horizon(cls):
+        """Токен, до которого журнал уже не пополнится: id последней записи или pg_snapshot_xmin."""
+        if not cls.uses_transaction_ids():
+            return cls.objects.aggregate(token=models.Max('id'))['token'] or 0
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+            return cursor.fetchone()[0]
+
+    @classmethod
+    def record(cls, action, applications):
+        transaction_id = cls.current_transaction_id()
+        return cls.objects.bulk_create([
+            cls(application_id=app.pk, identifier=app.identifier, action=action, transaction_id=transaction_id)
+            for app in applications
+        ])
+
+
+class ApplicationDailyRollup(models.Model):
+    """Суточные итоги по заявкам: день × статус × бригада × местоположение.
+
+    opened считается по дню возникновения, closed и close_seconds — по дню закрытия.
+    """
+
+    NO_BRIGADE = 0
+
+    day = models.DateField(verbose_name="День")
+    status_id = models.BigIntegerField(verbose_name="ID статуса")
+    brigade_id = models.BigIntegerField(default=NO_BRIGADE, verbose_name="ID бригады (0 — без бригады)")
+    location_id = models.BigIntegerField(verbose_name="ID местоположения")
+    opened = models.IntegerField(default=0, verbose_name="Возникло заявок")
+    closed = models.IntegerField(default=0, verbose_name="Закрыто заявок")
+    close_seconds = models.FloatField(default=0, verbose_name="Суммарное время до закрытия, с")
+
+    class Meta:
+        verbose_name = "Суточный итог по заявкам"
+        verbose_name_plural = "Суточные итоги по заявкам"
+        ordering = ['day']
+        db_table = 'ApplicationDailyRollup'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'status_id', 'brigade_id', 'location_id'], name='application_rollup_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Итоги за {self.day}"
+
+
+class RevokedToken(models.Model):
+    """Отозванный JWT (выход, ротация refresh token). Проверки идут по копии в памяти."""
+
+    jti = models.CharField(max_length=255, unique=True, verbose_name="Идентификатор токена")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Срок действия токена")
+    revoked_at = models.DateTimeField(auto_now_add=True, verbose_name="Время отзыва")
+
+    class Meta:
+        verbose_name = "Отозванный токен"
+        verbose_name_plural = "Отозванные токены"
+        db_table = 'RevokedToken'
+
+    def __str__(self):
+        return self.jti
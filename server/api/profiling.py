@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('api')
+
+METRICS = ('wall_ms', 'sql_ms', 'python_ms', 'queries')
+HISTOGRAM_EDGES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+PERCENTILES = (50, 95, 99)
+
+
+class EndpointProfile:
+    """Последние window замеров одного эндпоинта."""
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.total = 0
+
+    def add(self, sample):
+        self.samples.append(sample)
+        self.total += 1
+
+    def summary(self):
+        samples = list(self.samples)
+        data = {'requests': self.total, 'window': len(samples)}
+        for position, metric in enumerate(METRICS):
+            values = sorted(sample[position] for sample in samples)
+            stats = {'mean': sum(values) / len(values)}
+            for percentile in PERCENTILES:
+                stats[f'p{percentile}'] = values[min(len(values) - 1, int(len(values) * percentile / 100))]
+            stats['max'] = values[-1]
+            data[metric] = {name: round(value, 3) for name, value in stats.items()}
+        histogram = [0] * (len(HISTOGRAM_EDGES_MS) + 1)
+        for sample in samples:
+            histogram[next((i for i, edge in enumerate(HISTOGRAM_EDGES_MS) if sample[0] <= edge), -1)] += 1
+        data['wall_ms_histogram'] = {
+            **{f'<={edge}': count for edge, count in zip(HISTOGRAM_EDGES_MS, histogram)},
+            f'>{HISTOGRAM_EDGES_MS[-1]}': histogram[-1],
+        }
+        return data
+
+
+class ProfileRegistry:
+    """Замеры по эндпоинтам в памяти процесса; у каждого воркера своя статистика."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = {}
+
+    def record(self, endpoint, sample):
+        with self._lock:
+            profile = self._profiles.get(endpoint)
+            if profile is None:
+                profile = self._profiles[endpoint] = EndpointProfile(settings.PROFILING_WINDOW)
+            profile.add(sample)
+
+    def report(self):
+        with self._lock:
+            profiles = list(self._profiles.items())
+        return {endpoint: profile.summary() for endpoint, profile in sorted(profiles)}
+
+    def reset(self):
+        with self._lock:
+            self._profiles.clear()
+
+
+registry = ProfileRegistry()
+
+
+class RequestProfile:
+    """Счётчик запросов к БД для connection.execute_wrapper."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.view_started = None
+        self.view_sql_seconds = 0.0
+        self.rendered = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class ProfilingMiddleware:
+    """Число запросов к БД, время SQL, время Python и общее время каждого запроса.
+
+    Включается настройкой PROFILING_ENABLED; если она выключена, Django исключает
+    middleware из цепочки при запуске, и запросы его не проходят вовсе.
+    Время Python — время view и отрисовки ответа за вычетом SQL: логика view,
+    валидация, сериализация и рендеринг вместе, по отдельности они не замеряются.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = request._profile = RequestProfile()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+        finished = time.perf_counter()
+
+        match = request.resolver_match
+        if match is None:
+            return response
+        view_started = profile.view_started or started
+        view_finished = profile.rendered or finished
+        python_seconds = max(0.0, view_finished - view_started - (profile.sql_seconds - profile.view_sql_seconds))
+        sample = (
+            (finished - started) * 1000, profile.sql_seconds * 1000, python_seconds * 1000, profile.queries,
+        )
+        endpoint = f'{request.method} {match.view_name}'
+        registry.record(endpoint, sample)
+        response['Server-Timing'] = (
+            f'db;dur={sample[1]:.1f};desc="{profile.queries} queries", '
+            f'python;dur={sample[2]:.1f}, total;dur={sample[0]:.1f}'
+        )
+        if sample[0] >= settings.PROFILING_SLOW_MS:
+            logger.warning(
+                "Медленный запрос %s %s: %.0f мс, запросов к БД %d (%.0f мс)",
+                request.method, request.path, sample[0], profile.queries, sample[1],
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = request._profile
+        profile.view_started = time.perf_counter()
+        profile.view_sql_seconds = profile.sql_seconds
+
+    def process_template_response(self, request, response):
+        # Ответы DRF отрисовываются после middleware: фиксируем момент окончания отрисовки
+        profile = request._profile
+        response.add_post_render_callback(lambda rendered: setattr(profile, 'rendered', time.perf_counter()))
+        return response
@@ -0,0 +1,167 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.db import connections, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .analytics import APPLICATION_MODELS, DurationSeconds, GROUPINGS
+from .cache import reference_cache
+from .models import ApplicationDailyRollup
+
+KEY_FIELDS = ('day', 'status_id', 'brigade_id', 'location_id')
+VALUE_FIELDS = ('opened', 'closed', 'close_seconds')
+ROLLUP_GROUPINGS = ('by_status', 'by_brigade', 'by_location')
+
+
+def rollup_entries(application):
+    """Вклад заявки в суточные итоги: [(ключ, (opened, closed, close_seconds))]."""
+    brigade_id = application.brigade_id or ApplicationDailyRollup.NO_BRIGADE
+
+    def key(moment):
+        return (timezone.localdate(moment), application.status_id, brigade_id, application.location_id)
+
+    entries = [(key(application.start_time), (1, 0, 0.0))]
+    if application.end_time is not None:
+        seconds = (application.end_time - application.start_time).total_seconds()
+        entries.append((key(application.end_time), (0, 1, seconds)))
+    return entries
+
+
+def update_rollups(removed=(), added=(), batch_size=500):
+    """Применяет к итогам разницу между старым (removed) и новым (added) вкладом заявок.
+
+    Вызывать внутри transaction.atomic(): строки итогов блокируются до конца транзакции.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    for sign, entries in ((-1, removed), (1, added)):
+        for key, values in entries:
+            for position, value in enumerate(values):
+                deltas[key][position] += sign * value
+    keys = sorted(key for key, values in deltas.items() if any(values))
+    for offset in range(0, len(keys), batch_size):
+        _apply_deltas(keys[offset:offset + batch_size], deltas)
+
+
+def _apply_deltas(keys, deltas):
+    ApplicationDailyRollup.objects.bulk_create(
+        [ApplicationDailyRollup(**dict(zip(KEY_FIELDS, key))) for key in keys], ignore_conflicts=True
+    )
+    condition = Q()
+    for key in keys:
+        condition |= Q(**dict(zip(KEY_FIELDS, key)))
+    rows = list(ApplicationDailyRollup.objects.select_for_update().filter(condition).order_by(*KEY_FIELDS))
+    for row in rows:
+        opened, closed, seconds = deltas[tuple(getattr(row, field) for field in KEY_FIELDS)]
+        row.opened += opened
+        row.closed += closed
+        row.close_seconds += seconds
+    ApplicationDailyRollup.objects.bulk_update(rows, VALUE_FIELDS)
+
+
+def compute_rollups(start, end):
+    """Итоги по заявкам, возникшим или закрытым в [start, end), одним GROUP BY на каждую сторону.
+
+    Считаются и рабочая таблица, и архив: после архивации пересчёт даёт те же итоги.
+    """
+    tz = timezone.get_current_timezone()
+    totals = defaultdict(lambda: [0, 0, 0.0])
+    for model in APPLICATION_MODELS:
+        opened = (
+            model.objects.filter(start_time__gte=start, start_time__lt=end)
+            .annotate(day=TruncDate('start_time', tzinfo=tz))
+            .order_by().values(*KEY_FIELDS).annotate(count=Count('id'))
+        )
+        closed = (
+            model.objects.filter(end_time__gte=start, end_time__lt=end)
+            .annotate(day=TruncDate('end_time', tzinfo=tz))
+            .order_by().values(*KEY_FIELDS)
+            .annotate(count=Count('id'), seconds=Sum(DurationSeconds(F('end_time'), F('start_time'))))
+        )
+        for row in opened:
+            totals[_row_key(row)][0] += row['count']
+        for row in closed:
+            values = totals[_row_key(row)]
+            values[1] += row['count']
+            values[2] += row['seconds'] or 0.0
+    return totals
+
+
+def _row_key(row):
+    return (row['day'], row['status_id'], row['brigade_id'] or ApplicationDailyRollup.NO_BRIGADE, row['location_id'])
+
+
+def _compute_in_thread(start, end):
+    try:
+        return compute_rollups(start, end)
+    finally:
+        connections.close_all()
+
+
+def rebuild_rollups(chunk_days=30, workers=4):
+    """Пересчитывает итоги с нуля.
+
+    История режется на отрезки по chunk_days дней, отрезки считаются параллельно
+    в workers потоках (у каждого своё соединение с БД), результат записывается
+    одной транзакцией. Запись заявок на время пересчёта лучше остановить.
+    """
+    bounds = [
+        model.objects.order_by().aggregate(first=Min('start_time'), last_start=Max('start_time'), last_end=Max('end_time'))
+        for model in APPLICATION_MODELS
+    ]
+    firsts = [row['first'] for row in bounds if row['first'] is not None]
+    chunks = []
+    if firsts:
+        last = max(
+            moment for row in bounds for moment in (row['last_start'], row['last_end']) if moment is not None
+        )
+        start = min(firsts)
+        while start <= last:
+            chunks.append((start, start + timedelta(days=chunk_days)))
+            start += timedelta(days=chunk_days)
+
+    if workers > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda chunk: _compute_in_thread(*chunk), chunks))
+    else:
+        results = [compute_rollups(*chunk) for chunk in chunks]
+
+    totals = defaultdict(lambda: [0, 0, 0.0])
+    for result in results:
+        for key, values in result.items():
+            for position, value in enumerate(values):
+                totals[key][position] += value
+    with transaction.atomic():
+        ApplicationDailyRollup.objects.all().delete()
+        ApplicationDailyRollup.objects.bulk_create([
+            ApplicationDailyRollup(**dict(zip(KEY_FIELDS, key)), **dict(zip(VALUE_FIELDS, values)))
+            for key, values in sorted(totals.items())
+        ], batch_size=1000)
+    return len(chunks), len(totals)
+
+
+def rollup_statistics(first_day, last_day):
+    """Сводка за дни [first_day, last_day] по суточным итогам, без обращения к заявкам."""
+    rows = ApplicationDailyRollup.objects.filter(day__gte=first_day, day__lte=last_day).order_by()
+    sums = {'opened': Sum('opened'), 'closed': Sum('closed'), 'close_seconds': Sum('close_seconds')}
+    totals = rows.aggregate(**sums)
+    closed = totals['closed'] or 0
+    data = {
+        'start': first_day.isoformat(),
+        'end': last_day.isoformat(),
+        'opened': totals['opened'] or 0,
+        'closed': closed,
+        'mean_close_seconds': totals['close_seconds'] / closed if closed else None,
+    }
+    for name in ROLLUP_GROUPINGS:
+        column, model, field = GROUPINGS[name]
+        names = {pk: getattr(instance, field) for pk, instance in reference_cache(model).instances().items()}
+        data[name] = [
+            {'id': row[column] or None, 'name': names.get(row[column]), 'opened': row['opened'], 'closed': row['closed']}
+            for row in rows.values(column).annotate(**sums).order_by('-opened', column)
+        ]
+    data['daily'] = [
+        {'date': row['day'].isoformat(), 'opened': row['opened'], 'closed': row['closed']}
+        for row in rows.values('day').annotate(**sums).order_by('day')
+    ]
+    return data
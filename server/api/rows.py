@@ -0,0 +1,133 @@
+from django.utils import timezone
+from rest_framework import serializers
+from .cache import reference_cache
+from .models import Brigade, Location, Object, Status
+
+# Поля ответа ApplicationSerializer в том же порядке
+APPLICATION_FIELDS = [
+    'id', 'brigade', 'brigade_number', 'location', 'location_name',
+    'identifier', 'correction', 'object_instance', 'object_name',
+    'status', 'status_name', 'start_time', 'end_time',
+]
+
+# Поле с названием справочника -> (столбец с ID, модель, поле модели)
+RELATED_NAME_FIELDS = {
+    'brigade_number': ('brigade', Brigade, 'brigade'),
+    'location_name': ('location', Location, 'location'),
+    'object_name': ('object_instance', Object, 'object'),
+    'status_name': ('status', Status, 'status'),
+}
+
+DATETIME_FIELDS = {'start_time', 'end_time'}
+
+
+def format_datetime(value):
+    """То же представление, что у DateTimeField в DRF."""
+    if value is None:
+        return None
+    value = value.astimezone(timezone.get_current_timezone()).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class ReferenceNames:
+    """Названия справочников по ID из кэша; при промахе кэш перечитывается один раз."""
+
+    def __init__(self, model, field, reload=True):
+        self.cache = reference_cache(model)
+        self.field = field
+        # Без reload берётся уже загруженный снимок, а промах даёт None:
+        # так async-код не обращается к БД из цикла событий
+        self.reloaded = not reload
+        self.names = self.load() if reload else self.names_of(self.cache.loaded_instances())
+
+    def names_of(self, instances):
+        return {pk: getattr(instance, self.field) for pk, instance in instances.items()}
+
+    def load(self):
+        return self.names_of(self.cache.instances())
+
+    def __getitem__(self, pk):
+        if pk is None:
+            return None
+        name = self.names.get(pk)
+        if name is None and not self.reloaded:
+            self.reloaded = True
+            self.cache.clear()
+            self.names = self.load()
+            name = self.names.get(pk)
+        return name
+
+
+def application_column(field):
+    """Столбец .values() для поля ответа."""
+    if field in RELATED_NAME_FIELDS:
+        field = RELATED_NAME_FIELDS[field][0]
+    return field if field in ('id', 'identifier', 'correction') or field in DATETIME_FIELDS else f'{field}_id'
+
+
+def application_columns(fields=None):
+    """Столбцы .values_list() для запрошенных полей ответа."""
+    columns = []
+    for field in fields or APPLICATION_FIELDS:
+        column = application_column(field)
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+
+def application_converters(fields, reload=True):
+    """Преобразование значения столбца в значение поля ответа (None — как есть)."""
+    converters = []
+    for field in fields:
+        if field in RELATED_NAME_FIELDS:
+            _, model, name_field = RELATED_NAME_FIELDS[field]
+            converters.append(ReferenceNames(model, name_field, reload).__getitem__)
+        elif field in DATETIME_FIELDS:
+            converters.append(format_datetime)
+        else:
+            converters.append(None)
+    return converters
+
+
+def application_tuples(queryset, fields=None, chunk_size=2000):
+    """Строки заявок кортежами в порядке fields, без создания моделей.
+
+    Названия справочников подставляются из кэша, поэтому в запросе нет JOIN.
+    """
+    fields = fields or APPLICATION_FIELDS
+    columns = application_columns(fields)
+    getters = [
+        (columns.index(application_column(field)), convert)
+        for field, convert in zip(fields, application_converters(fields))
+    ]
+    for row in queryset.values_list(*columns).iterator(chunk_size=chunk_size):
+        yield tuple(row[index] if convert is None else convert(row[index]) for index, convert in getters)
+
+
+def application_dicts(rows, fields=None, reload=True):
+    """Заявки в виде ответа ApplicationSerializer из словарей .values() с application_columns(fields).
+
+    reload=False — для async-кода, который заранее загрузил кэши справочников.
+    """
+    fields = fields or APPLICATION_FIELDS
+    getters = [
+        (field, application_column(field), convert)
+        for field, convert in zip(fields, application_converters(fields, reload))
+    ]
+    return [
+        {field: row[column] if convert is None else convert(row[column]) for field, column, convert in getters}
+        for row in rows
+    ]
+
+
+def parse_fields(value):
+    """?fields=id,identifier -> список полей ответа; None, если параметр не задан."""
+    if not value:
+        return None
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in APPLICATION_FIELDS]
+    if unknown:
+        raise serializers.ValidationError({'fields': f"Неизвестные поля: {', '.join(unknown)}."})
+    return fields or None
@@ -0,0 +1,212 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField, TrigramSimilarity
+from django.db import connection
+from django.db.models import Max, Q
+from django.db.models.expressions import RawSQL
+from .cache import reference_cache
+from .models import Application, ApplicationChange, Location, Object
+from .rows import APPLICATION_FIELDS, application_columns, application_dicts
+
+WORD_RE = re.compile(r'\w+')
+
+# Порог похожести как у pg_trgm.similarity_threshold по умолчанию
+TRIGRAM_THRESHOLD = 0.3
+
+
+def words(text):
+    return WORD_RE.findall(text.lower()) if text else []
+
+
+def trigrams(text):
+    """Триграммы слов так же, как их считает pg_trgm."""
+    result = set()
+    for word in words(text):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(left, right):
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def postgres_search(text, limit):
+    """Заявки по tsvector (русская конфигурация) и по похожести идентификатора,
+    местоположения или объекта. Все условия покрыты GIN-индексами из миграции 0007.
+    """
+    query = SearchQuery(text, config='russian', search_type='websearch')
+    vector = RawSQL('"Application"."search_vector"', [], output_field=SearchVectorField())
+    return (
+        Application.objects.annotate(
+            vector=vector,
+            rank=SearchRank(vector, query),
+            similarity=TrigramSimilarity('identifier', text),
+        )
+        .filter(
+            Q(vector=query)
+            | Q(identifier__trigram_similar=text)
+            | Q(location__in=Location.objects.filter(location__trigram_similar=text))
+            | Q(object_instance__in=Object.objects.filter(object__trigram_similar=text))
+        )
+        .order_by('-rank', '-similarity', '-start_time', '-id')[:limit]
+    )
+
+
+class MemorySearchIndex:
+    """Обратный индекс заявок в памяти процесса для БД без полнотекстового поиска.
+
+    Слова идентификатора и примечания ищутся по префиксу, идентификатор ещё и по
+    триграммам. Индекс догоняет журнал ApplicationChange одним запросом перед поиском
+    и перестраивается целиком раз в SEARCH_INDEX_REBUILD_SECONDS — так в него попадают
+    и записи мимо журнала (импорт, заполнение тестовыми данными).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.built_at = None
+        self.token = 0
+        self.documents = {}
+        self.postings = {}
+        self.trigram_postings = {}
+        self.vocabulary = None
+
+    def add(self, pk, identifier, correction):
+        self.remove(pk)
+        tokens = set(words(identifier)) | set(words(correction))
+        grams = trigrams(identifier)
+        self.documents[pk] = (tokens, grams)
+        for token in tokens:
+            self.postings.setdefault(token, set()).add(pk)
+        for gram in grams:
+            self.trigram_postings.setdefault(gram, set()).add(pk)
+        self.vocabulary = None
+
+    def remove(self, pk):
+        document = self.documents.pop(pk, None)
+        if document is None:
+            return
+        for index, keys in ((self.postings, document[0]), (self.trigram_postings, document[1])):
+            for key in keys:
+                ids = index[key]
+                ids.discard(pk)
+                if not ids:
+                    del index[key]
+        self.vocabulary = None
+
+    def build(self):
+        self.token = ApplicationChange.objects.aggregate(token=Max('id'))['token'] or 0
+        self.documents, self.postings, self.trigram_postings = {}, {}, {}
+        rows = Application.objects.values_list('id', 'identifier', 'correction').iterator(chunk_size=5000)
+        for pk, identifier, correction in rows:
+            self.add(pk, identifier, correction)
+        self.built_at = time.monotonic()
+
+    def apply_changes(self):
+        changes = list(
+            ApplicationChange.objects.filter(id__gt=self.token).order_by('id').values_list('id', 'application_id')
+        )
+        if not changes:
+            return
+        self.token = changes[-1][0]
+        ids = {application_id for _, application_id in changes}
+        rows = Application.objects.filter(pk__in=ids).values_list('id', 'identifier', 'correction')
+        for pk, identifier, correction in rows:
+            ids.discard(pk)
+            self.add(pk, identifier, correction)
+        # Оставшихся заявок больше нет в рабочей таблице
+        for pk in ids:
+            self.remove(pk)
+
+    def clear(self):
+        with self._lock:
+            self.built_at = None
+            self.documents, self.postings, self.trigram_postings = {}, {}, {}
+            self.vocabulary = None
+
+    def refresh(self):
+        if self.built_at is None or time.monotonic() - self.built_at >= settings.SEARCH_INDEX_REBUILD_SECONDS:
+            self.build()
+        else:
+            self.apply_changes()
+
+    def prefix_matches(self, word):
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.postings)
+        vocabulary = self.vocabulary
+        start = bisect_left(vocabulary, word)
+        ids = set()
+        for token in vocabulary[start:]:
+            if not token.startswith(word):
+                break
+            ids |= self.postings[token]
+        return ids
+
+    def search(self, text):
+        """{ID заявки: оценка}: 1 за совпадение всех слов запроса плюс похожесть идентификатора."""
+        with self._lock:
+            self.refresh()
+            scores = {}
+            query_words = words(text)
+            if query_words:
+                ids = None
+                for word in query_words:
+                    matches = self.prefix_matches(word)
+                    ids = matches if ids is None else ids & matches
+                    if not ids:
+                        break
+                scores = dict.fromkeys(ids or (), 1.0)
+            grams = trigrams(text)
+            candidates = set()
+            for gram in grams:
+                candidates |= self.trigram_postings.get(gram, set())
+            for pk in candidates:
+                score = similarity(grams, self.documents[pk][1])
+                if pk in scores:
+                    scores[pk] += score
+                elif score >= TRIGRAM_THRESHOLD:
+                    scores[pk] = score
+            return scores
+
+
+memory_index = MemorySearchIndex()
+
+
+def similar_reference_ids(model, field, text):
+    grams = trigrams(text)
+    return [
+        pk for pk, instance in reference_cache(model).instances().items()
+        if similarity(grams, trigrams(getattr(instance, field))) >= TRIGRAM_THRESHOLD
+    ]
+
+
+def memory_search(text, limit):
+    """Поиск по MemorySearchIndex; местоположения и объекты сравниваются по триграммам в кэше справочников."""
+    scores = memory_index.search(text)
+    ordered = sorted(scores, key=lambda pk: (scores[pk], pk), reverse=True)[:limit]
+    location_ids = similar_reference_ids(Location, 'location', text)
+    object_ids = similar_reference_ids(Object, 'object', text)
+    if len(ordered) < limit and (location_ids or object_ids):
+        # Заявки по похожему справочнику идут после прямых совпадений, новые первыми
+        ordered += list(
+            Application.objects.filter(Q(location_id__in=location_ids) | Q(object_instance_id__in=object_ids))
+            .exclude(pk__in=ordered)
+            .order_by('-start_time', '-id')
+            .values_list('id', flat=True)[:limit - len(ordered)]
+        )
+    return ordered
+
+
+def search_applications(text, limit=20, fields=None):
+    """Заявки по запросу text в виде строк списка (см. api.rows), самые релевантные первыми."""
+    columns = application_columns(fields or APPLICATION_FIELDS)
+    if connection.vendor == 'postgresql':
+        return application_dicts(postgres_search(text, limit).values(*columns), fields)
+    ids = memory_search(text, limit)
+    rows = {row['id']: row for row in Application.objects.filter(pk__in=ids).values('id', *columns)}
+    return application_dicts([rows[pk] for pk in ids if pk in rows], fields)
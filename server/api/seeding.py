@@ -0,0 +1,59 @@
+import random
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import Brigade, Location, Object, Status, Application
+from .cache import reference_cache
+from .rollups import rollup_entries, update_rollups
+
+STATUS_NAMES = ['Открыта', 'В работе', 'Выполнена', 'Отменена']
+
+
+def seed_reference_data(brigades=20, locations=50, objects=30):
+    Brigade.objects.bulk_create(
+        [Brigade(brigade=number) for number in range(1, brigades + 1)], ignore_conflicts=True
+    )
+    Location.objects.bulk_create(
+        [Location(location=f'Подстанция №{number}') for number in range(1, locations + 1)], ignore_conflicts=True
+    )
+    Object.objects.bulk_create(
+        [Object(object=f'Объект №{number}') for number in range(1, objects + 1)], ignore_conflicts=True
+    )
+    Status.objects.bulk_create([Status(status=name) for name in STATUS_NAMES], ignore_conflicts=True)
+    for model in (Brigade, Location, Object, Status):
+        reference_cache(model).invalidate()
+
+
+def seed_applications(count, days=365, open_share=0.1, batch_size=5000, prefix='seed', seed=None):
+    rng = random.Random(seed)
+    brigade_ids = list(Brigade.objects.values_list('id', flat=True))
+    location_ids = list(Location.objects.values_list('id', flat=True))
+    object_ids = list(Object.objects.values_list('id', flat=True))
+    status_ids = list(Status.objects.values_list('id', flat=True))
+    if not (location_ids and object_ids and status_ids):
+        raise ValueError("Справочники пусты: сначала вызовите seed_reference_data().")
+
+    now = timezone.now()
+    offset = Application.objects.filter(identifier__startswith=prefix).count()
+    created = 0
+    while created < count:
+        batch = []
+        for number in range(offset + created, offset + min(count, created + batch_size)):
+            start_time = now - timedelta(seconds=rng.randint(0, days * 86400))
+            end_time = None
+            if rng.random() >= open_share:
+                end_time = start_time + timedelta(minutes=rng.randint(5, 3 * 24 * 60))
+            batch.append(Application(
+                identifier=f'{prefix}{number}',
+                brigade_id=rng.choice(brigade_ids) if brigade_ids else None,
+                location_id=rng.choice(location_ids),
+                object_instance_id=rng.choice(object_ids),
+                status_id=rng.choice(status_ids),
+                start_time=start_time,
+                end_time=end_time,
+            ))
+        with transaction.atomic():
+            Application.objects.bulk_create(batch)
+            update_rollups(added=[entry for application in batch for entry in rollup_entries(application)])
+        created += len(batch)
+    return created
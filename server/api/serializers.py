@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Brigade, Location, Object, Status, Application
+from .models import Brigade, Location, Object, Status, Application, ArchivedApplication
+from .cache import reference_cache
 
 class BrigadeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -22,7 +23,76 @@ class StatusSerializer(serializers.ModelSerializer):
         model = Status
         fields = '__all__'
 
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Берёт связанный объект из кэша справочника или из заранее загруженных в контекст.
+
+    При промахе запись ищется в БД: её могли создать через другой воркер, кэш
+    которого ещё не перечитан. Запись, удалённую в другом воркере, кэш может ещё
+    отдать — тогда вставка нарушит внешний ключ, и custom_exception_handler ответит 409.
+    """
+
+    def get_prefetched(self):
+        cache = reference_cache(self.queryset.model)
+        if cache is not None:
+            return cache.instances()
+        return self.context.get('prefetched', {}).get(self.queryset.model)
+
+    def to_internal_value(self, data):
+        prefetched = self.get_prefetched()
+        if prefetched is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        instance = prefetched.get(pk)
+        if instance is None:
+            instance = self.queryset.filter(pk=pk).first()
+            if instance is None:
+                self.fail('does_not_exist', pk_value=data)
+            cache = reference_cache(self.queryset.model)
+            if cache is not None:
+                # Снимок устарел: следующий запрос перечитает справочник
+                cache.clear()
+        return instance
+
+
+class ApplicationListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.prefetch_related_objects(data)
+            identifiers = [item.get('identifier') for item in data if isinstance(item, dict)]
+            self._context['archived_identifiers'] = set(
+                ArchivedApplication.objects.filter(identifier__in=[i for i in identifiers if isinstance(i, str)])
+                .order_by().values_list('identifier', flat=True)
+            )
+        return super().to_internal_value(data)
+
+    def prefetch_related_objects(self, data):
+        # Справочники без кэша загружаются одним запросом на пакет, а не на каждую заявку
+        prefetched = self._context.setdefault('prefetched', {})
+        for name, field in self.child.fields.items():
+            if not isinstance(field, PrefetchedPrimaryKeyRelatedField) or field.read_only:
+                continue
+            if reference_cache(field.queryset.model) is not None:
+                continue
+            ids = set()
+            for item in data:
+                value = item.get(name) if isinstance(item, dict) else None
+                if isinstance(value, bool):
+                    continue
+                try:
+                    ids.add(int(value))
+                except (TypeError, ValueError):
+                    pass
+            prefetched[field.queryset.model] = field.queryset.in_bulk(ids)
+
+
 class ApplicationSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
     brigade_number = serializers.ReadOnlyField(source='brigade.brigade', read_only=True)
     location_name = serializers.ReadOnlyField(source='location.location', read_only=True)
     object_name = serializers.ReadOnlyField(source='object_instance.object', read_only=True)
@@ -30,32 +100,68 @@ class ApplicationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Application
+        list_serializer_class = ApplicationListSerializer
         fields = [
             'id', 'brigade', 'brigade_number', 'location', 'location_name',
             'identifier', 'correction', 'object_instance', 'object_name',
             'status', 'status_name', 'start_time', 'end_time'
         ]
+        # Существование связанных записей проверяет само поле при загрузке объекта,
+        # поэтому отдельные запросы .exists() в валидаторах не нужны.
+        extra_kwargs = {
+            'brigade': {'error_messages': {'does_not_exist': "Бригада с таким ID не существует."}},
+            'location': {'error_messages': {'does_not_exist': "Местоположение с таким ID не существует."}},
+            'object_instance': {'error_messages': {'does_not_exist': "Объект с таким ID не существует."}},
+            'status': {'error_messages': {'does_not_exist': "Статус с таким ID не существует."}},
+        }
 
-    def validate_brigade(self, value):
-        if value and not Brigade.objects.filter(id=value.id).exists():
-            raise serializers.ValidationError("Бригада с таким ID не существует.")
+    def validate_identifier(self, value):
+        # Идентификатор уникален и среди заявок, перенесённых в архив
+        if self.instance is not None and self.instance.identifier == value:
+            return value
+        # При пакетном создании архив проверяется одним запросом в ApplicationListSerializer
+        archived = self.context.get('archived_identifiers')
+        if archived is None:
+            archived = set(ArchivedApplication.objects.filter(identifier=value).values_list('identifier', flat=True))
+        if value in archived:
+            raise serializers.ValidationError("Заявка с таким идентификатором есть в архиве.")
         return value
 
-    def validate_location(self, value):
-        if not Location.objects.filter(id=value.id).exists():
-            raise serializers.ValidationError("Местоположение с таким ID не существует.")
-        return value
+class ArchivedApplicationSerializer(ApplicationSerializer):
+    class Meta:
+        model = ArchivedApplication
+        fields = ApplicationSerializer.Meta.fields + ['archived_at']
+        read_only_fields = fields
 
-    def validate_object_instance(self, value):
-        if not Object.objects.filter(id=value.id).exists():
-            raise serializers.ValidationError("Объект с таким ID не существует.")
-        return value
+class ApplicationBulkItemSerializer(ApplicationSerializer):
+    """Заявка в пакете: уникальность идентификаторов проверяется сразу для всего пакета."""
+
+    class Meta(ApplicationSerializer.Meta):
+        list_serializer_class = serializers.ListSerializer
+        extra_kwargs = {
+            **ApplicationSerializer.Meta.extra_kwargs,
+            'identifier': {'validators': []},
+        }
 
-    def validate_status(self, value):
-        if not Status.objects.filter(id=value.id).exists():
-            raise serializers.ValidationError("Статус с таким ID не существует.")
+    def validate_identifier(self, value):
         return value
 
+
+class ApplicationBulkSerializer(serializers.Serializer):
+    ATOMIC = 'atomic'
+    BEST_EFFORT = 'best_effort'
+
+    mode = serializers.ChoiceField(choices=[ATOMIC, BEST_EFFORT], default=ATOMIC)
+    items = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    delete = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+
+    def validate(self, data):
+        max_items = self.context.get('max_items')
+        if max_items and len(data['items']) + len(data['delete']) > max_items:
+            raise serializers.ValidationError(f"Не более {max_items} элементов в одном пакете.")
+        return data
+
+
 class UserRegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
     password2 = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
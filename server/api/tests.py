@@ -1 +1,1203 @@
-from django.test import TestCase
\ No newline at end of file
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+from unittest import mock
+from datetime import timedelta
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.contrib.auth.models import User
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .models import (
+    Brigade, Location, Object, Status, Application, ApplicationChange, ApplicationDailyRollup,
+    ArchivedApplication,
+)
+from .cache import clear_reference_caches
+from .events import InMemoryBroker
+from .dispatch import Dispatcher, jain_index
+from .profiling import registry
+from . import metrics
+from .log import BackgroundQueueHandler, JSONFormatter, log_fields
+from .authentication import revoked_tokens, user_states
+from .renderers import FastJSONRenderer
+from .serializers import ApplicationSerializer
+from .search import memory_index
+from .analytics import application_statistics
+from .rollups import compute_rollups
+
+
+class ApplicationTestMixin:
+    def setUp(self):
+        clear_reference_caches()
+        self.user = User.objects.create_user(username='dispatcher', password='secret-pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.brigade = Brigade.objects.create(brigade=1)
+        self.location = Location.objects.create(location='Подстанция №1')
+        self.object = Object.objects.create(object='Трансформатор')
+        self.status = Status.objects.create(status='Открыта')
+
+    def create_applications(self, count, start=0, **kwargs):
+        now = timezone.now()
+        data = dict(
+            brigade=self.brigade, location=self.location,
+            object_instance=self.object, status=self.status,
+        )
+        data.update(kwargs)
+        return Application.objects.bulk_create([
+            Application(identifier=f'app{start + i}', start_time=now - timedelta(minutes=start + i), **data)
+            for i in range(count)
+        ])
+
+
+class ApplicationQueryCountTests(ApplicationTestMixin, TestCase):
+    def test_list_query_count_does_not_grow_with_rows(self):
+        self.create_applications(1)
+        # Первый список загружает кэши справочников (названия подставляются из них)
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/applications/')
+        self.assertEqual(response.status_code, 200)
+
+        self.create_applications(20, start=1)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/applications/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve_loads_related_in_one_query(self):
+        app = self.create_applications(1)[0]
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/applications/{app.pk}/')
+        self.assertEqual(response.data['location_name'], 'Подстанция №1')
+        self.assertEqual(response.data['brigade_number'], 1)
+
+
+class ApplicationListFilterTests(ApplicationTestMixin, TestCase):
+    def test_cursor_pagination_walks_all_rows_in_start_time_order(self):
+        self.create_applications(7)
+        identifiers = []
+        url = '/api/applications/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 3)
+            identifiers += [row['identifier'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(identifiers, [f'app{i}' for i in range(7)])
+
+    def test_filter_by_status_and_time_range(self):
+        closed = Status.objects.create(status='Закрыта')
+        self.create_applications(3)
+        self.create_applications(2, start=10, status=closed)
+        response = self.client.get('/api/applications/', {'status': closed.pk})
+        self.assertEqual([row['identifier'] for row in response.data['results']], ['app10', 'app11'])
+
+        after = (timezone.now() - timedelta(minutes=1, seconds=30)).isoformat()
+        response = self.client.get('/api/applications/', {'start_time_after': after})
+        self.assertEqual([row['identifier'] for row in response.data['results']], ['app0', 'app1'])
+
+    def test_search_by_identifier(self):
+        self.create_applications(12)
+        response = self.client.get('/api/applications/', {'search': 'app1'})
+        self.assertEqual(
+            sorted(row['identifier'] for row in response.data['results']),
+            ['app1', 'app10', 'app11'],
+        )
+
+    def test_invalid_filter_value_is_rejected(self):
+        response = self.client.get('/api/applications/', {'brigade': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/applications/', {'end_time_before': 'вчера'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unicode_digits_are_rejected(self):
+        self.assertEqual(self.client.get('/api/applications/', {'status': '²'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/applications/changes/', {'since': '١'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/applications/search/', {'q': 'app', 'limit': '²'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/applications/²/').status_code, 404)
+        self.assertEqual(self.client.get('/api/analytics/', {'days': '²'}).status_code, 400)
+
+
+class ApplicationIndexTests(ApplicationTestMixin, TestCase):
+    @override_settings(DEBUG=True)
+    def test_explain_command_reports_composite_indexes(self):
+        out = io.StringIO()
+        call_command('explain_applications', seed=500, stdout=out)
+        output = out.getvalue()
+        for index in Application._meta.indexes:
+            self.assertIn(index.name, output)
+
+    def test_seed_requires_debug(self):
+        with self.assertRaises(CommandError):
+            call_command('explain_applications', seed=10, stdout=io.StringIO())
+        self.assertEqual(Application.objects.count(), 0)
+
+
+class ApplicationWriteQueryTests(ApplicationTestMixin, TestCase):
+    def payload(self, identifier, **kwargs):
+        data = {
+            'identifier': identifier,
+            'brigade': self.brigade.pk,
+            'location': self.location.pk,
+            'object_instance': self.object.pk,
+            'status': self.status.pk,
+            'start_time': timezone.now().isoformat(),
+        }
+        data.update(kwargs)
+        return data
+
+    def test_create_loads_each_foreign_key_once(self):
+        # 4 загрузки справочников, проверка уникальности идентификатора, INSERT заявки
+        # и записи в журнал изменений, проверка архива, 3 запроса к суточным итогам, SAVEPOINT/RELEASE
+        with self.assertNumQueries(13):
+            response = self.client.post('/api/applications/', self.payload('A-0'), format='json')
+        # Справочники уже в кэше: запросов к ним больше нет
+        with self.assertNumQueries(9):
+            response = self.client.post('/api/applications/', self.payload('A-1'), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status_name'], 'Открыта')
+
+    def test_batch_create_resolves_foreign_keys_per_batch(self):
+        items = [self.payload(f'B-{i}') for i in range(5)]
+        # 4 загрузки справочников на весь пакет, по проверке и INSERT на заявку,
+        # одна проверка архива и одна вставка в журнал изменений, 3 запроса к итогам на пакет
+        # и SAVEPOINT/RELEASE
+        with self.assertNumQueries(4 + 2 * len(items) + 7):
+            response = self.client.post('/api/applications/', items, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(Application.objects.count(), 5)
+
+    def test_unknown_foreign_key_is_reported(self):
+        response = self.client.post('/api/applications/', self.payload('C-1', status=999), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors']['status'], ["Статус с таким ID не существует."])
+
+        items = [self.payload('C-2'), self.payload('C-3', location=999)]
+        response = self.client.post('/api/applications/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][1]['location'], ["Местоположение с таким ID не существует."])
+        self.assertFalse(Application.objects.exists())
+
+    def test_reference_created_elsewhere_is_accepted(self):
+        self.client.get('/api/locations/')
+        # Запись из другого воркера: версия таблицы в этом процессе не меняется
+        location = Location.objects.create(location='РП-7')
+        response = self.client.post('/api/applications/', self.payload('C-4', location=location.pk), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['location_name'], 'РП-7')
+        self.assertEqual(len(self.client.get('/api/locations/').data), 2)
+
+
+class StaleReferenceTests(ApplicationTestMixin, TransactionTestCase):
+    def test_reference_deleted_elsewhere_is_a_conflict(self):
+        location = Location.objects.create(location='РП-8')
+        self.client.get('/api/locations/')
+        # Удаление в другом воркере: кэш этого процесса ещё помнит запись
+        Location.objects.filter(pk=location.pk).delete()
+        response = self.client.post('/api/applications/', {
+            'identifier': 'S-1', 'location': location.pk, 'object_instance': self.object.pk,
+            'status': self.status.pk, 'start_time': timezone.now().isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Application.objects.exists())
+        self.assertEqual(len(self.client.get('/api/locations/').data), 1)
+
+
+class ReferenceCacheTests(ApplicationTestMixin, TestCase):
+    def test_reference_reads_hit_database_once(self):
+        with self.assertNumQueries(1):
+            self.client.get('/api/statuses/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/statuses/')
+            self.client.get(f'/api/statuses/{self.status.pk}/')
+        self.assertEqual(response.data, [{'id': self.status.pk, 'status': 'Открыта'}])
+
+    def test_write_through_viewset_invalidates_cache(self):
+        self.client.get('/api/locations/')
+        response = self.client.post('/api/locations/', {'location': 'РП-2'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.get('/api/locations/')
+        self.assertEqual([row['location'] for row in response.data], ['Подстанция №1', 'РП-2'])
+
+        self.client.delete(f"/api/locations/{response.data[1]['id']}/")
+        response = self.client.get(f"/api/locations/{Location.objects.get().pk + 1}/")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(self.client.get('/api/locations/').data), 1)
+
+
+@override_settings(REFERENCE_CACHE_TIMEOUT=None, REFERENCE_CACHE_ALIAS='default')
+class ConditionalGetTests(ApplicationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_unchanged_collection_returns_304_without_queries(self):
+        self.create_applications(3)
+        response = self.client.get('/api/applications/')
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/applications/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get('/api/applications/?status=%d' % self.status.pk, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_write_changes_validator(self):
+        app = self.create_applications(1)[0]
+        etag = self.client.get(f'/api/applications/{app.pk}/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/applications/{app.pk}/', {'correction': 'Замена изолятора'}, format='json')
+        response = self.client.get(f'/api/applications/{app.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_reference_change_invalidates_applications(self):
+        statuses_etag = self.client.get('/api/statuses/')['ETag']
+        applications_etag = self.client.get('/api/applications/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/statuses/', {'status': 'Закрыта'}, format='json')
+        self.assertEqual(self.client.get('/api/statuses/', HTTP_IF_NONE_MATCH=statuses_etag).status_code, 200)
+        self.assertEqual(self.client.get('/api/applications/', HTTP_IF_NONE_MATCH=applications_etag).status_code, 200)
+        self.assertEqual(self.client.get('/api/brigades/', HTTP_IF_NONE_MATCH=statuses_etag).status_code, 200)
+
+    @override_settings(REFERENCE_CACHE_ALIAS=None)
+    def test_no_validators_without_shared_versions(self):
+        response = self.client.get('/api/applications/')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+
+
+@override_settings(REFERENCE_CACHE_ALIAS='default')
+class BootstrapTests(ApplicationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_returns_all_tables_and_user(self):
+        response = self.client.get('/api/bootstrap/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['brigades'], [{'id': self.brigade.pk, 'brigade': 1}])
+        self.assertEqual(response.data['statuses'], [{'id': self.status.pk, 'status': 'Открыта'}])
+        self.assertEqual(response.data['user']['username'], 'dispatcher')
+        self.assertEqual(set(response.data['versions']), {'brigades', 'locations', 'objects', 'statuses'})
+
+    def test_only_changed_tables_are_sent(self):
+        versions = self.client.get('/api/bootstrap/').data['versions']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/objects/', {'object': 'Выключатель'}, format='json')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/bootstrap/', versions)
+        self.assertNotIn('brigades', response.data)
+        self.assertNotIn('statuses', response.data)
+        self.assertEqual([row['object'] for row in response.data['objects']], ['Выключатель', 'Трансформатор'])
+
+    @override_settings(REFERENCE_CACHE_ALIAS=None)
+    def test_process_local_versions_are_not_sent(self):
+        stale = {name: 'f' * 16 for name in ('brigades', 'locations', 'objects', 'statuses')}
+        response = self.client.get('/api/bootstrap/', stale)
+        self.assertEqual(response.data['versions'], {})
+        self.assertEqual(response.data['statuses'], [{'id': self.status.pk, 'status': 'Открыта'}])
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/bootstrap/').status_code, 401)
+
+
+class ApplicationChangesTests(ApplicationTestMixin, TestCase):
+    def payload(self, identifier):
+        return {
+            'identifier': identifier,
+            'location': self.location.pk,
+            'object_instance': self.object.pk,
+            'status': self.status.pk,
+            'start_time': timezone.now().isoformat(),
+        }
+
+    def test_changes_since_token(self):
+        token = self.client.get('/api/applications/changes/').data['token']
+        first = self.client.post('/api/applications/', self.payload('D-1'), format='json').data
+        second = self.client.post('/api/applications/', self.payload('D-2'), format='json').data
+        self.client.patch(f"/api/applications/{first['id']}/", {'correction': 'Ложный вызов'}, format='json')
+        self.client.delete(f"/api/applications/{second['id']}/")
+
+        response = self.client.get('/api/applications/changes/', {'since': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['has_more'])
+        self.assertEqual([row['identifier'] for row in response.data['upserted']], ['D-1'])
+        self.assertEqual(response.data['upserted'][0]['correction'], 'Ложный вызов')
+        self.assertEqual(response.data['deleted'], [{'id': second['id'], 'identifier': 'D-2'}])
+
+        response = self.client.get('/api/applications/changes/', {'since': response.data['token']})
+        self.assertEqual((response.data['upserted'], response.data['deleted']), ([], []))
+
+    def test_changes_are_paged(self):
+        for i in range(5):
+            self.client.post('/api/applications/', self.payload(f'E-{i}'), format='json')
+        response = self.client.get('/api/applications/changes/', {'since': 0, 'page_size': 3})
+        self.assertTrue(response.data['has_more'])
+        self.assertEqual(len(response.data['upserted']), 3)
+        response = self.client.get('/api/applications/changes/', {'since': response.data['token'], 'page_size': 3})
+        self.assertFalse(response.data['has_more'])
+        self.assertEqual([row['identifier'] for row in response.data['upserted']], ['E-3', 'E-4'])
+
+    def test_invalid_token(self):
+        self.assertEqual(self.client.get('/api/applications/changes/', {'since': 'abc'}).status_code, 400)
+
+    def test_brigade_delete_records_updates(self):
+        application = self.create_applications(1)[0]
+        token = self.client.get('/api/applications/changes/').data['token']
+        self.assertEqual(self.client.delete(f'/api/brigades/{self.brigade.pk}/').status_code, 204)
+        response = self.client.get('/api/applications/changes/', {'since': token})
+        self.assertEqual([row['id'] for row in response.data['upserted']], [application.pk])
+        self.assertIsNone(response.data['upserted'][0]['brigade'])
+        self.assertGreater(Application.objects.get(pk=application.pk).updated_at, application.updated_at)
+
+    def test_location_delete_records_deletes(self):
+        application = self.create_applications(1)[0]
+        token = self.client.get('/api/applications/changes/').data['token']
+        self.assertEqual(self.client.delete(f'/api/locations/{self.location.pk}/').status_code, 204)
+        response = self.client.get('/api/applications/changes/', {'since': token})
+        self.assertEqual(response.data['upserted'], [])
+        self.assertEqual(response.data['deleted'], [{'id': application.pk, 'identifier': application.identifier}])
+
+    def test_pruned_journal_expires_old_tokens(self):
+        self.client.post('/api/applications/', self.payload('P-0'), format='json')
+        token = self.client.get('/api/applications/changes/').data['token']
+        for i in range(1, 3):
+            self.client.post('/api/applications/', self.payload(f'P-{i}'), format='json')
+        ApplicationChange.objects.exclude(identifier='P-2').update(
+            changed_at=timezone.now() - timedelta(days=40)
+        )
+        out = io.StringIO()
+        call_command('archive_applications', changes_days=30, stdout=out)
+        self.assertIn('Удалено записей журнала изменений: 2', out.getvalue())
+        self.assertEqual(self.client.get('/api/applications/changes/', {'since': token}).status_code, 410)
+        current = self.client.get('/api/applications/changes/').data['token']
+        self.assertEqual(self.client.get('/api/applications/changes/', {'since': current}).status_code, 200)
+
+
+@override_settings(EVENTS_ENABLED=True)
+class ApplicationEventsTests(ApplicationTestMixin, TestCase):
+    def test_in_memory_broker_delivers_events_published_from_threads(self):
+        broker = InMemoryBroker(queue_size=2)
+
+        async def scenario():
+            subscription = broker.subscribe()
+            thread = threading.Thread(target=lambda: [broker.publish({'n': n}) for n in range(3)])
+            thread.start()
+            thread.join()
+            received = [await subscription.get(timeout=1) for _ in range(2)]
+            subscription.close()
+            return received
+
+        # Очередь на 2 события: самое старое отброшено
+        self.assertEqual(asyncio.run(scenario()), [{'n': 1}, {'n': 2}])
+        self.assertEqual(broker.subscriber_count, 0)
+
+    async def test_stream_pushes_application_created(self):
+        ticket = (await sync_to_async(self.client.post)('/api/events/ticket/')).data['ticket']
+        response = await self.async_client.get('/api/events/applications/', {'ticket': ticket})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b': connected\n\n')
+
+        def create():
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.post('/api/applications/', {
+                    'identifier': 'SSE-1',
+                    'location': self.location.pk,
+                    'object_instance': self.object.pk,
+                    'status': self.status.pk,
+                    'start_time': timezone.now().isoformat(),
+                }, format='json')
+
+        await sync_to_async(create)()
+        chunk = (await asyncio.wait_for(anext(stream), 1)).decode()
+        await stream.aclose()
+        self.assertIn('event: application.created', chunk)
+        self.assertIn('"identifier": "SSE-1"', chunk)
+
+    async def test_stream_requires_token(self):
+        response = await self.async_client.get('/api/events/applications/')
+        self.assertEqual(response.status_code, 401)
+        # JWT в адресе больше не принимается
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        response = await self.async_client.get('/api/events/applications/', {'token': str(token)})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_ticket_is_single_use(self):
+        ticket = (await sync_to_async(self.client.post)('/api/events/ticket/')).data['ticket']
+        response = await self.async_client.get('/api/events/applications/', {'ticket': ticket})
+        self.assertEqual(response.status_code, 200)
+        await response.streaming_content.aclose()
+        response = await self.async_client.get('/api/events/applications/', {'ticket': ticket})
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get('/api/events/applications/', {'ticket': ticket + 'x'})
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(EVENTS_ENABLED=False)
+    def test_disabled_without_setting(self):
+        self.assertEqual(self.client.post('/api/events/ticket/').status_code, 404)
+
+
+class ApplicationBulkTests(ApplicationTestMixin, TestCase):
+    def item(self, identifier, **kwargs):
+        data = {
+            'identifier': identifier,
+            'location': self.location.pk,
+            'object_instance': self.object.pk,
+            'status': self.status.pk,
+            'start_time': timezone.now().isoformat(),
+        }
+        data.update(kwargs)
+        return data
+
+    def test_mixed_batch_runs_in_constant_queries(self):
+        existing = self.create_applications(2)
+        self.client.get('/api/bootstrap/')
+        items = [self.item(f'BULK-{i}') for i in range(50)]
+        items.append({'id': existing[0].pk, 'correction': 'Переоткрыта'})
+        # Загрузка изменяемых заявок, проверка идентификаторов и архива, DELETE, INSERT, UPDATE,
+        # три вставки в журнал, по 3 запроса к итогам на удаление и создание
+        # (правка примечания итоги не меняет) и SAVEPOINT/RELEASE — независимо от размера пакета
+        with self.assertNumQueries(17):
+            response = self.client.post('/api/applications/bulk/', {
+                'items': items, 'delete': [existing[1].pk],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['deleted']), (50, 1, 1))
+        self.assertEqual(response.data['results'][50], {'index': 50, 'status': 'updated', 'id': existing[0].pk})
+        self.assertEqual(Application.objects.count(), 51)
+        self.assertEqual(Application.objects.get(pk=existing[0].pk).correction, 'Переоткрыта')
+        self.assertEqual(ApplicationChange.objects.count(), 52)
+
+    def test_boolean_id_is_rejected(self):
+        app = self.create_applications(1)[0]
+        Application.objects.filter(pk=app.pk).update(id=1)
+        response = self.client.post('/api/applications/bulk/', {
+            'items': [{'id': True, 'correction': 'Не та заявка'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['results'][0]['errors'], {'id': ["Заявка не найдена."]})
+        self.assertIsNone(Application.objects.get(pk=1).correction)
+
+    def test_atomic_mode_writes_nothing_on_error(self):
+        self.create_applications(1)
+        response = self.client.post('/api/applications/bulk/', {
+            'items': [self.item('NEW-1'), self.item('app0'), self.item('NEW-2', status=999)],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['results'][0], {'index': 0, 'status': 'skipped'})
+        self.assertEqual(response.data['results'][1]['errors'], {'identifier': ["Заявка с таким идентификатором уже существует."]})
+        self.assertIn('status', response.data['results'][2]['errors'])
+        self.assertEqual(Application.objects.count(), 1)
+
+    def test_best_effort_writes_valid_items(self):
+        response = self.client.post('/api/applications/bulk/', {
+            'mode': 'best_effort',
+            'items': [self.item('DUP'), self.item('DUP'), self.item('OK-1')],
+            'delete': [12345],
+        }, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([row['status'] for row in response.data['results']], ['error', 'error', 'created'])
+        self.assertEqual(response.data['delete_results'][0]['status'], 'error')
+        self.assertEqual(list(Application.objects.values_list('identifier', flat=True)), ['OK-1'])
+
+
+class ApplicationExportTests(ApplicationTestMixin, TestCase):
+    def test_csv_export_matches_serializer(self):
+        apps = self.create_applications(3, end_time=timezone.now())
+        response = self.client.get('/api/applications/export/', {'format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 3)
+        expected = self.client.get(f'/api/applications/{apps[0].pk}/').data
+        self.assertEqual(rows[0], {key: '' if value is None else str(value) for key, value in expected.items()})
+
+    def test_ndjson_export_applies_list_filters_without_joins(self):
+        other = Status.objects.create(status='Закрыта')
+        self.create_applications(2)
+        self.create_applications(4, start=10, status=other)
+        self.client.get('/api/bootstrap/')
+        response = self.client.get('/api/applications/export/', {'format': 'ndjson', 'status': other.pk})
+        with self.assertNumQueries(1):
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['identifier'] for row in rows], ['app10', 'app11', 'app12', 'app13'])
+        self.assertEqual({row['status_name'] for row in rows}, {'Закрыта'})
+
+    async def test_asgi_export_streams_asynchronously(self):
+        await sync_to_async(self.create_applications)(3)
+        headers = {'Authorization': f'Bearer {await sync_to_async(AccessToken.for_user)(self.user)}'}
+        response = await self.async_client.get('/api/applications/export/', {'format': 'ndjson'}, headers=headers)
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual([json.loads(line)['identifier'] for line in lines], ['app0', 'app1', 'app2'])
+
+    def test_export_negotiates_by_accept_header(self):
+        response = self.client.get('/api/applications/export/', HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+
+
+class ImportApplicationsTests(ApplicationTestMixin, TestCase):
+    def write_file(self, content, suffix):
+        handle = tempfile.NamedTemporaryFile('w', suffix=suffix, encoding='utf-8', delete=False)
+        handle.write(content)
+        handle.close()
+        self.addCleanup(os.unlink, handle.name)
+        return handle.name
+
+    def test_export_round_trip(self):
+        self.create_applications(5, end_time=timezone.now())
+        response = self.client.get('/api/applications/export/', {'format': 'csv'})
+        path = self.write_file(b''.join(response.streaming_content).decode('utf-8'), '.csv')
+        Application.objects.all().delete()
+
+        out = io.StringIO()
+        call_command('import_applications', path, batch_size=2, stdout=out)
+        self.assertIn('строк/с', out.getvalue())
+        self.assertEqual(Application.objects.count(), 5)
+        self.assertEqual(Application.objects.filter(location=self.location, brigade=self.brigade).count(), 5)
+
+    def test_ndjson_creates_missing_references(self):
+        lines = [
+            {'identifier': 'IMP-1', 'brigade': 7, 'location': 'ТП-15', 'object': 'Кабель',
+             'status': 'Открыта', 'start_time': '2024-01-05T10:00:00'},
+            {'identifier': 'IMP-2', 'location': 'ТП-15', 'object': 'Кабель',
+             'status': 'Новая', 'start_time': '2024-01-06T10:00:00+00:00', 'end_time': '2024-01-06T12:00:00+00:00'},
+        ]
+        path = self.write_file('\n'.join(json.dumps(line, ensure_ascii=False) for line in lines), '.ndjson')
+        call_command('import_applications', path, stdout=io.StringIO())
+        self.assertEqual(Location.objects.filter(location='ТП-15').count(), 1)
+        self.assertTrue(Brigade.objects.filter(brigade=7).exists())
+        self.assertEqual(Application.objects.get(identifier='IMP-2').status.status, 'Новая')
+        self.assertEqual([row['status'] for row in self.client.get('/api/statuses/').data], ['Новая', 'Открыта'])
+
+    def test_invalid_record_stops_import(self):
+        path = self.write_file('identifier,location,object,status,start_time\nX-1,ТП-1,Кабель,Открыта,вчера\n', '.csv')
+        with self.assertRaises(CommandError):
+            call_command('import_applications', path, stdout=io.StringIO())
+        call_command('import_applications', path, skip_invalid=True, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse(Application.objects.exists())
+
+    def test_malformed_ndjson_lines_are_skipped(self):
+        ArchivedApplication.objects.create(
+            id=1000, identifier='OLD-1', location=self.location, object_instance=self.object, status=self.status,
+            start_time=timezone.now(), end_time=timezone.now(), updated_at=timezone.now(), archived_at=timezone.now(),
+        )
+        lines = [
+            '{"identifier": "IMP-1", "location": "ТП-1", "object": "Кабель", "status": "Открыта"',
+            '[]',
+            json.dumps({'identifier': 'X' * 17, 'location': 'ТП-1', 'object': 'Кабель', 'status': 'Открыта',
+                        'start_time': '2024-01-05T10:00:00'}),
+            json.dumps({'identifier': 'OLD-1', 'location': 'ТП-1', 'object': 'Кабель', 'status': 'Открыта',
+                        'start_time': '2024-01-05T10:00:00'}),
+            json.dumps({'identifier': 'IMP-2', 'location': 'ТП-1', 'object': 'Кабель', 'status': 'Открыта',
+                        'start_time': '2024-01-05T10:00:00'}),
+        ]
+        path = self.write_file('\n'.join(lines), '.ndjson')
+        with self.assertRaises(CommandError):
+            call_command('import_applications', path, stdout=io.StringIO())
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_applications', path, skip_invalid=True, stdout=out, stderr=err)
+        self.assertIn('пропущено строк: 4', out.getvalue())
+        self.assertIn('Запись 2 пропущена: ожидается JSON-объект.', err.getvalue())
+        self.assertEqual(list(Application.objects.values_list('identifier', flat=True)), ['IMP-2'])
+
+    def test_import_records_changes(self):
+        self.create_applications(1)
+        lines = [
+            {'identifier': 'app0', 'location': 'ТП-1', 'object': 'Кабель', 'status': 'Открыта',
+             'start_time': '2024-01-05T10:00:00'},
+            {'identifier': 'IMP-1', 'location': 'ТП-1', 'object': 'Кабель', 'status': 'Открыта',
+             'start_time': '2024-01-05T10:00:00'},
+        ]
+        path = self.write_file('\n'.join(json.dumps(line, ensure_ascii=False) for line in lines), '.ndjson')
+        with mock.patch('api.views.publish_application_event') as publish:
+            call_command('import_applications', path, skip_existing=True, stdout=io.StringIO())
+        self.assertEqual(
+            list(ApplicationChange.objects.values_list('identifier', 'action')), [('IMP-1', ApplicationChange.CREATED)]
+        )
+        self.assertEqual(ApplicationDailyRollup.objects.get(day='2024-01-05').opened, 1)
+        # Одно событие на пакет, без сериализации строк
+        publish.assert_called_once_with(
+            ApplicationChange.CREATED, {'count': 1}, token=ApplicationChange.objects.get().pk
+        )
+
+    def test_duplicate_identifiers_are_rejected(self):
+        self.create_applications(1)
+        path = self.write_file(
+            'identifier,location,object,status,start_time\n'
+            'app0,ТП-1,Кабель,Открыта,2024-01-05T10:00:00\n'
+            'IMP-1,ТП-1,Кабель,Открыта,2024-01-05T10:00:00\n'
+            'IMP-1,ТП-1,Кабель,Открыта,2024-01-06T10:00:00\n',
+            '.csv',
+        )
+        with self.assertRaisesMessage(CommandError, 'Запись 1: заявка app0 уже существует.'):
+            call_command('import_applications', path, stdout=io.StringIO())
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_applications', path, skip_invalid=True, stdout=out, stderr=err)
+        self.assertIn('Импортировано заявок: 1, пропущено строк: 2', out.getvalue())
+        self.assertIn('Запись 3 пропущена: заявка IMP-1 уже существует.', err.getvalue())
+        self.assertEqual(Application.objects.get(identifier='IMP-1').start_time.day, 5)
+
+
+@override_settings(REFERENCE_CACHE_TIMEOUT=None)
+class AnalyticsTests(ApplicationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        closed = Status.objects.create(status='Закрыта')
+        now = timezone.now()
+        for minutes in range(1, 11):
+            start = now - timedelta(days=1, minutes=minutes)
+            Application.objects.create(
+                identifier=f'AN-{minutes}', location=self.location, object_instance=self.object,
+                status=closed, start_time=start, end_time=start + timedelta(minutes=minutes),
+            )
+        self.create_applications(2)
+
+    def test_aggregates(self):
+        data = self.client.get('/api/analytics/').data
+        self.assertEqual((data['total'], data['open'], data['closed']), (12, 2, 10))
+        self.assertEqual([(row['name'], row['count']) for row in data['by_status']], [('Закрыта', 10), ('Открыта', 2)])
+        self.assertEqual(data['by_brigade'], [{'id': None, 'name': None, 'count': 10}, {'id': self.brigade.pk, 'name': 1, 'count': 2}])
+        ttc = data['time_to_close']
+        self.assertEqual(ttc['count'], 10)
+        self.assertAlmostEqual(ttc['mean_seconds'], 330, delta=0.01)
+        self.assertAlmostEqual(ttc['p50_seconds'], 300, delta=0.01)
+        self.assertAlmostEqual(ttc['p90_seconds'], 540, delta=0.01)
+        self.assertAlmostEqual(ttc['p99_seconds'], 600, delta=0.01)
+        self.assertEqual(sum(day['opened'] for day in data['daily']), 12)
+        self.assertEqual(sum(day['closed'] for day in data['daily']), 10)
+
+    def test_repeated_requests_are_cached_until_write(self):
+        first = self.client.get('/api/analytics/').data
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/analytics/').data, first)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/applications/{Application.objects.filter(end_time__isnull=True)[0].pk}/")
+        self.assertEqual(self.client.get('/api/analytics/').data['open'], 1)
+
+    def test_invalid_range(self):
+        response = self.client.get('/api/analytics/', {'start': '2024-02-01T00:00:00', 'end': '2024-01-01T00:00:00'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ApplicationRollupTests(ApplicationTestMixin, TestCase):
+    def rollups(self):
+        return sorted(
+            ApplicationDailyRollup.objects.exclude(opened=0, closed=0)
+            .values_list('day', 'status_id', 'brigade_id', 'location_id', 'opened', 'closed', 'close_seconds')
+        )
+
+    def payload(self, identifier, start_time):
+        return {
+            'identifier': identifier,
+            'brigade': self.brigade.pk,
+            'location': self.location.pk,
+            'object_instance': self.object.pk,
+            'status': self.status.pk,
+            'start_time': start_time.isoformat(),
+        }
+
+    def test_hooks_match_rebuild(self):
+        closed = Status.objects.create(status='Закрыта')
+        start = timezone.now() - timedelta(days=3)
+        ids = [
+            self.client.post('/api/applications/', self.payload(f'R-{day}', start + timedelta(days=day)), format='json').data['id']
+            for day in range(3)
+        ]
+        self.client.patch(
+            f'/api/applications/{ids[0]}/',
+            {'status': closed.pk, 'end_time': (start + timedelta(days=1, hours=2)).isoformat()}, format='json'
+        )
+        self.client.delete(f'/api/applications/{ids[2]}/')
+        self.client.post('/api/applications/bulk/', {'items': [
+            {'id': ids[1], 'end_time': (start + timedelta(days=2)).isoformat()},
+            self.payload('R-9', start),
+        ]}, format='json')
+
+        incremental = self.rollups()
+        self.assertEqual(sum(row[4] for row in incremental), 3)
+        self.assertEqual(sum(row[5] for row in incremental), 2)
+        call_command('rebuild_rollups', workers=1, chunk_days=1, stdout=io.StringIO())
+        rebuilt = self.rollups()
+        self.assertEqual([row[:6] for row in incremental], [row[:6] for row in rebuilt])
+        for before, after in zip(incremental, rebuilt):
+            self.assertAlmostEqual(before[6], after[6], delta=0.01)
+
+    def test_reference_delete_matches_rebuild(self):
+        start = timezone.now() - timedelta(days=2)
+        other = Location.objects.create(location='Подстанция №2')
+        ids = [
+            self.client.post('/api/applications/', self.payload(f'F-{day}', start + timedelta(days=day)), format='json').data['id']
+            for day in range(2)
+        ]
+        self.client.post('/api/applications/', dict(self.payload('F-9', start), location=other.pk), format='json')
+        ArchivedApplication.objects.create(
+            id=1000, identifier='F-old', brigade=self.brigade, location=other, object_instance=self.object,
+            status=self.status, start_time=start, end_time=start + timedelta(hours=1), updated_at=start,
+        )
+        call_command('rebuild_rollups', workers=1, stdout=io.StringIO())
+
+        self.client.delete(f'/api/brigades/{self.brigade.pk}/')
+        self.client.patch(f'/api/applications/{ids[0]}/', {'end_time': (start + timedelta(hours=3)).isoformat()}, format='json')
+        self.client.delete(f'/api/locations/{other.pk}/')
+
+        expected = compute_rollups(start - timedelta(days=1), timezone.now() + timedelta(days=1))
+        expected = sorted((*key, *values) for key, values in expected.items())
+        incremental = self.rollups()
+        self.assertEqual([row[:6] for row in incremental], [row[:6] for row in expected])
+        self.assertFalse(ApplicationDailyRollup.objects.filter(brigade_id=self.brigade.pk).exclude(opened=0, closed=0).exists())
+        for before, after in zip(incremental, expected):
+            self.assertAlmostEqual(before[6], after[6], delta=0.01)
+
+    def test_daily_endpoint_reads_rollups(self):
+        now = timezone.now()
+        self.client.post('/api/applications/', self.payload('D-1', now), format='json')
+        self.client.post('/api/applications/', dict(self.payload('D-2', now), brigade=None), format='json')
+        # Итоги за период, три группировки и гистограмма — таблица заявок не читается
+        with self.assertNumQueries(5):
+            data = self.client.get('/api/analytics/daily/', {'days': 7}).data
+        self.assertEqual((data['opened'], data['closed'], data['mean_close_seconds']), (2, 0, None))
+        self.assertEqual(data['daily'], [{'date': timezone.localdate(now).isoformat(), 'opened': 2, 'closed': 0}])
+        self.assertEqual(
+            sorted((row['id'] or 0, row['opened']) for row in data['by_brigade']), [(0, 1), (self.brigade.pk, 1)]
+        )
+        response = self.client.get('/api/analytics/daily/', {'start': '2024-02-01', 'end': '2024-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ArchiveTests(ApplicationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.old = self.create_applications(3, end_time=timezone.now() - timedelta(days=399))
+        Application.objects.filter(pk__in=[app.pk for app in self.old]).update(
+            start_time=timezone.now() - timedelta(days=400)
+        )
+        self.recent = self.create_applications(2, start=3, end_time=timezone.now())
+        self.open = self.create_applications(1, start=5)
+
+    def test_moves_only_old_closed_applications(self):
+        call_command('archive_applications', days=365, batch_size=2, stdout=io.StringIO())
+        self.assertEqual(ArchivedApplication.objects.count(), 3)
+        self.assertEqual(Application.objects.count(), 3)
+        self.assertEqual(len(self.client.get('/api/applications/').data['results']), 3)
+        self.assertEqual(
+            set(ApplicationChange.objects.values_list('application_id', 'action')),
+            {(app.pk, ApplicationChange.DELETED) for app in self.old},
+        )
+
+    def test_lookup_checks_both_tables(self):
+        call_command('archive_applications', days=365, stdout=io.StringIO())
+        archived, hot = self.old[0], self.recent[0]
+        with self.assertNumQueries(2):
+            data = self.client.get(f'/api/applications/by-identifier/{archived.identifier}/').data
+        self.assertEqual((data['id'], data['status_name']), (archived.pk, 'Открыта'))
+        self.assertIn('archived_at', data)
+        with self.assertNumQueries(1):
+            data = self.client.get(f'/api/applications/by-identifier/{hot.identifier}/').data
+        self.assertNotIn('archived_at', data)
+        self.assertEqual(self.client.get(f'/api/applications/{archived.pk}/').data['identifier'], archived.identifier)
+        self.assertEqual(self.client.get('/api/applications/by-identifier/nope/').status_code, 404)
+        self.assertEqual(self.client.get('/api/applications/999/').status_code, 404)
+
+    def test_archived_identifier_stays_unique(self):
+        call_command('archive_applications', days=365, stdout=io.StringIO())
+        payload = {
+            'identifier': self.old[0].identifier, 'location': self.location.pk,
+            'object_instance': self.object.pk, 'status': self.status.pk, 'start_time': timezone.now().isoformat(),
+        }
+        response = self.client.post('/api/applications/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('identifier', response.data['errors'])
+        response = self.client.post('/api/applications/bulk/', {'items': [payload]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_and_statistics_include_archive(self):
+        def totals():
+            return sorted(ApplicationDailyRollup.objects.exclude(opened=0, closed=0).values_list(
+                'day', 'status_id', 'brigade_id', 'location_id', 'opened', 'closed'
+            ))
+
+        start, end = timezone.now() - timedelta(days=500), timezone.now() + timedelta(days=1)
+        call_command('rebuild_rollups', workers=1, stdout=io.StringIO())
+        before = totals()
+        statistics = application_statistics(start, end)
+        call_command('archive_applications', days=365, stdout=io.StringIO())
+        call_command('rebuild_rollups', workers=1, stdout=io.StringIO())
+        self.assertEqual(totals(), before)
+        self.assertEqual(sum(row[4] for row in before), 6)
+        self.assertEqual(application_statistics(start, end), statistics)
+
+
+class DispatchTests(ApplicationTestMixin, TestCase):
+    def test_balances_workload_and_prefers_affinity(self):
+        dispatcher = Dispatcher([1, 2, 3], workload={1: 2}, affinity={(3, 10): 5, (2, 10): 1})
+        self.assertEqual(dispatcher.choose(10)[0], 3)
+        self.assertEqual([dispatcher.assign(20)[0] for _ in range(3)], [2, 3, 2])
+        self.assertEqual(dispatcher.workload, {1: 2, 2: 2, 3: 1})
+        dispatcher.release(1)
+        self.assertEqual(dispatcher.choose(20), (1, 1))
+        self.assertAlmostEqual(jain_index([1, 1, 1]), 1.0)
+        self.assertEqual(Dispatcher([]).choose(10), (None, None))
+
+    def test_api_proposes_and_assigns(self):
+        other = Brigade.objects.create(brigade=2)
+        self.create_applications(2, brigade=self.brigade)
+        unassigned = self.create_applications(2, start=2, brigade=None)
+        response = self.client.get('/api/applications/dispatch/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([proposal['brigade'] for proposal in response.data['proposals']], [other.pk, other.pk])
+        self.assertFalse(Application.objects.filter(brigade=other).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/applications/dispatch/?limit=1')
+        self.assertEqual(response.data['proposals'], [{'id': unassigned[1].pk, 'brigade': other.pk, 'cost': 0}])
+        self.assertEqual(Application.objects.get(pk=unassigned[1].pk).brigade_id, other.pk)
+        self.assertTrue(ApplicationChange.objects.filter(application_id=unassigned[1].pk).exists())
+        self.assertEqual(self.client.get('/api/applications/dispatch/?limit=0').status_code, 400)
+
+    def test_simulation(self):
+        Brigade.objects.create(brigade=2)
+        self.create_applications(10, end_time=timezone.now())
+        out = io.StringIO()
+        call_command('simulate_dispatch', stdout=out)
+        self.assertIn("Решений: 10, бригад: 2", out.getvalue())
+
+
+@override_settings(PROFILING_ENABLED=True)
+class ProfilingTests(ApplicationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_applications(3)
+        # Кэши справочников загружены заранее: дальше список — один запрос
+        self.client.get('/api/applications/')
+        registry.reset()
+
+    def test_records_per_endpoint_stats(self):
+        for _ in range(2):
+            response = self.client.get('/api/applications/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertEqual(self.client.get('/api/stats/profile/').status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        stats = self.client.get('/api/stats/profile/').data['endpoints']['GET application-list']
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['queries']['max'], 1)
+        self.assertIn('python_ms', stats)
+        self.assertIn('python;dur=', response['Server-Timing'])
+        self.assertEqual(sum(stats['wall_ms_histogram'].values()), 2)
+        self.assertEqual(self.client.delete('/api/stats/profile/').status_code, 204)
+        self.assertNotIn('GET application-list', registry.report())
+
+    def test_disabled_middleware_is_not_used(self):
+        with override_settings(PROFILING_ENABLED=False):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            self.assertFalse(client.get('/api/applications/').has_header('Server-Timing'))
+
+    def test_command(self):
+        self.user.is_superuser = True
+        self.user.save()
+        out = io.StringIO()
+        call_command('profile_endpoints', '/api/applications/', repeat=3, stdout=out)
+        self.assertIn('GET application-list', out.getvalue())
+
+
+class MetricsTests(ApplicationTestMixin, TestCase):
+    def sample(self, line_start):
+        text = self.client.get('/metrics').content.decode()
+        for line in text.splitlines():
+            if line.startswith(line_start + ' '):
+                return float(line.rsplit(' ', 1)[1])
+        return 0
+
+    def test_counters(self):
+        list_line = 'api_requests_total{route="application-list",method="GET",status="200"}'
+        before = self.sample(list_line)
+        self.client.get('/api/applications/')
+        self.assertEqual(self.sample(list_line), before + 1)
+
+        failures = self.sample('api_logins_total{result="failure"}')
+        APIClient().post('/api/login/', {'username': 'dispatcher', 'password': 'wrong'}, format='json')
+        self.assertEqual(self.sample('api_logins_total{result="failure"}'), failures + 1)
+
+        created, closed = self.sample('api_applications_created_total'), self.sample('api_applications_closed_total')
+        app = self.client.post('/api/applications/', {
+            'identifier': 'M-1', 'location': self.location.pk, 'object_instance': self.object.pk,
+            'status': self.status.pk, 'start_time': timezone.now().isoformat(),
+        }, format='json').data
+        self.client.patch(f"/api/applications/{app['id']}/", {'end_time': timezone.now().isoformat()}, format='json')
+        self.client.patch(f"/api/applications/{app['id']}/", {'correction': 'Повторно'}, format='json')
+        self.assertEqual(self.sample('api_applications_created_total'), created + 1)
+        self.assertEqual(self.sample('api_applications_closed_total'), closed + 1)
+
+        # Закрытие одной заявки и переоткрытие другой в одном пакете — одно закрытие
+        opened = self.create_applications(1, start=10)[0]
+        reopened = self.create_applications(1, start=11, end_time=timezone.now())[0]
+        self.client.post('/api/applications/bulk/', {'items': [
+            {'id': opened.pk, 'end_time': timezone.now().isoformat()},
+            {'id': reopened.pk, 'end_time': None},
+        ]}, format='json')
+        self.assertEqual(self.sample('api_applications_closed_total'), closed + 2)
+
+        not_found = 'api_exceptions_total{exception="Http404",status="404"}'
+        errors = self.sample(not_found)
+        self.client.get('/api/applications/999999/')
+        self.assertEqual(self.sample(not_found), errors + 1)
+
+    @override_settings(METRICS_TOKEN='scrape')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE api_requests_total counter', response.content.decode())
+
+    def test_aggregates_worker_files(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROC_DIR=directory):
+            own = self.sample('api_applications_created_total')
+            with open(os.path.join(directory, '1.json'), 'w') as file:
+                json.dump([['api_applications_created_total', [], 5]], file)
+            self.assertEqual(self.sample('api_applications_created_total'), own + 5)
+            metrics.registry.flush()
+            self.assertTrue(os.path.exists(os.path.join(directory, f'{os.getpid()}.json')))
+
+
+class LoggingTests(ApplicationTestMixin, TestCase):
+    def test_background_json_records(self):
+        stream = io.StringIO()
+        target = logging.StreamHandler(stream)
+        target.setFormatter(JSONFormatter())
+        target.set_name('tests-json')
+        handler = BackgroundQueueHandler(['tests-json'])
+        logger = logging.getLogger('api.tests')
+        logger.addHandler(handler)
+        try:
+            with self.assertNumQueries(0):
+                logger.warning("Заявка %s", 'A-1', extra={'data': log_fields({'status': self.status, 'items': [self.location]})})
+                logger.warning("Статус %s", self.status)
+        finally:
+            logger.removeHandler(handler)
+            handler.stop()
+        first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual((first['message'], first['level']), ("Заявка A-1", 'WARNING'))
+        self.assertEqual(first['data'], {'status': self.status.pk, 'items': [self.location.pk]})
+        self.assertEqual(second['message'], "Статус Открыта")
+
+
+class DatabaseStatsTests(ApplicationTestMixin, TestCase):
+    def test_admin_only(self):
+        self.assertEqual(self.client.get('/api/stats/db/').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        data = self.client.get('/api/stats/db/').data['default']
+        self.assertEqual(data['conn_max_age'], settings.DATABASES['default']['CONN_MAX_AGE'])
+        self.assertEqual(data['health_checks'], settings.DATABASES['default']['CONN_HEALTH_CHECKS'])
+        self.assertIsNone(data['pool'])
+
+
+class JWTAuthenticationTests(ApplicationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        user_states.clear()
+        revoked_tokens.clear()
+        self.anonymous = APIClient()
+
+    def login(self):
+        response = self.anonymous.post('/api/login/', {'username': 'dispatcher', 'password': 'secret-pass'}, format='json')
+        return {'HTTP_AUTHORIZATION': f"Bearer {response.data['access_token']}"}
+
+    def test_warm_request_skips_user_query(self):
+        headers = self.login()
+        self.client.get('/api/statuses/')
+        with self.assertNumQueries(2):
+            # Множество отозванных токенов и пользователь
+            self.assertEqual(self.anonymous.get('/api/statuses/', **headers).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.anonymous.get('/api/statuses/', **headers).status_code, 200)
+
+    def test_inactive_user_rejected(self):
+        headers = self.login()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.anonymous.get('/api/statuses/', **headers).status_code, 401)
+
+    def test_logout_revokes_tokens(self):
+        headers = self.login()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.anonymous.post('/api/logout/', **headers).status_code, 200)
+        self.assertEqual(self.anonymous.get('/api/statuses/', **headers).status_code, 401)
+
+    def test_rotated_refresh_token_rejected(self):
+        self.login()
+        old_refresh = self.anonymous.cookies['refresh_token'].value
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.anonymous.post('/api/token/refresh/').status_code, 200)
+        self.assertNotEqual(self.anonymous.cookies['refresh_token'].value, old_refresh)
+        self.anonymous.cookies['refresh_token'] = old_refresh
+        self.assertEqual(self.anonymous.post('/api/token/refresh/').status_code, 401)
+
+
+class BenchmarkTests(ApplicationTestMixin, TestCase):
+    def test_results_and_comparison(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command('benchmark_api', 'list', 'create', 'refresh', requests=3, clients=1, output=output,
+                         stdout=io.StringIO())
+            with open(output, encoding='utf-8') as file:
+                results = json.load(file)
+            self.assertEqual(set(results['scenarios']), {'list', 'create', 'refresh'})
+            for data in results['scenarios'].values():
+                self.assertEqual((data['requests'], data['errors']), (3, 0))
+                self.assertLessEqual(data['latency_p50_ms'], data['latency_p99_ms'])
+            self.assertGreater(results['scenarios']['create']['queries_per_request'], 0)
+
+            results['scenarios']['list']['throughput_rps'] *= 100
+            baseline = os.path.join(directory, 'baseline.json')
+            with open(baseline, 'w', encoding='utf-8') as file:
+                json.dump(results, file)
+            with self.assertRaises(CommandError):
+                call_command('benchmark_api', 'list', requests=3, clients=1, compare=baseline, stdout=io.StringIO())
+
+
+class FastSerializationTests(ApplicationTestMixin, TestCase):
+    def test_list_rows_match_serializer(self):
+        self.create_applications(2)
+        self.create_applications(1, start=2, brigade=None, correction='Примечание\u2028')
+        rows = self.client.get('/api/applications/').data['results']
+        expected = ApplicationSerializer(
+            Application.objects.order_by('-start_time', '-id'), many=True
+        ).data
+        # Сериализатор пропускает brigade_number у заявки без бригады, в строках он null
+        expected = [{'brigade_number': None, **row} for row in expected]
+        self.assertEqual(json.loads(json.dumps(rows)), json.loads(json.dumps(expected)))
+
+    def test_sparse_fieldsets(self):
+        self.create_applications(25)
+        response = self.client.get('/api/applications/?fields=identifier,status_name')
+        self.assertEqual(response.data['results'][0], {'identifier': 'app0', 'status_name': 'Открыта'})
+        following = self.client.get(response.data['next'])
+        self.assertEqual(len(following.data['results']), 5)
+        self.assertEqual(self.client.get('/api/applications/?fields=identifier,password').status_code, 400)
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            'time': timezone.now(), 'amount': Decimal('1.50'), 'text': 'Строка\u2028', 1: [None, True, 2.5],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    @override_settings(RESPONSE_COMPRESSION=True)
+    def test_compression(self):
+        self.create_applications(20)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/applications/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 20)
+
+
+class AsyncViewsTests(ApplicationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_applications(25)
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    async def test_list_matches_sync_list(self):
+        expected = (await sync_to_async(self.client.get)('/api/applications/?status=%d' % self.status.pk)).data
+        response = await self.async_client.get('/api/async/applications/', {'status': self.status.pk}, headers=self.headers)
+        data = json.loads(response.content)
+        self.assertEqual(data['results'], json.loads(json.dumps(expected['results'])))
+
+        following = json.loads((await self.async_client.get(data['next'], headers=self.headers)).content)
+        self.assertEqual([row['identifier'] for row in following['results']], [f'app{i}' for i in range(20, 25)])
+        self.assertIsNone(following['next'])
+
+        expected = (await sync_to_async(self.client.get)('/api/applications/', {'search': 'app1'})).data
+        response = await self.async_client.get('/api/async/applications/', {'search': 'app1'}, headers=self.headers)
+        self.assertEqual(json.loads(response.content)['results'], json.loads(json.dumps(expected['results'])))
+
+        response = await self.async_client.get('/api/async/applications/', {'fields': 'nope'}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((await self.async_client.get('/api/async/applications/')).status_code, 401)
+
+    async def test_detail_reference_and_bootstrap(self):
+        app = await Application.objects.afirst()
+        data = json.loads((await self.async_client.get(
+            f'/api/async/applications/{app.pk}/', {'fields': 'identifier,location_name'}, headers=self.headers,
+        )).content)
+        self.assertEqual(data, {'identifier': app.identifier, 'location_name': 'Подстанция №1'})
+        response = await self.async_client.get('/api/async/applications/999999/', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+        statuses = json.loads((await self.async_client.get('/api/async/statuses/', headers=self.headers)).content)
+        self.assertEqual(statuses, [{'id': self.status.pk, 'status': 'Открыта'}])
+        response = await self.async_client.get('/api/async/unknown/', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+        expected = (await sync_to_async(self.client.get)('/api/bootstrap/')).data
+        data = json.loads((await self.async_client.get('/api/async/bootstrap/', headers=self.headers)).content)
+        self.assertEqual(data['versions'], expected['versions'])
+        self.assertEqual(data['locations'], expected['locations'])
+        self.assertEqual(data['user']['username'], 'dispatcher')
+
+
+class SearchTests(ApplicationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        memory_index.clear()
+        self.create_applications(30)
+        Application.objects.filter(identifier='app7').update(correction='Замена масла в трансформаторе')
+
+    def search(self, q, **params):
+        return self.client.get('/api/applications/search/', {'q': q, **params})
+
+    def identifiers(self, q, **params):
+        return [row['identifier'] for row in self.search(q, **params).data['results']]
+
+    def test_words_and_fuzzy_identifier(self):
+        self.assertEqual(self.identifiers('замена масл'), ['app7'])
+        # Похожее название объекта находит и остальные заявки, но после прямого совпадения
+        self.assertEqual(self.identifiers('масла трансформатор')[:2], ['app7', 'app0'])
+        self.assertEqual(self.identifiers('app12')[0], 'app12')
+        # Опечатка в идентификаторе
+        self.assertIn('app12', self.identifiers('apo12'))
+        self.assertEqual(self.search('масла', fields='id,identifier').data['results'][0].keys(), {'id', 'identifier'})
+        self.assertEqual(self.search('a').status_code, 400)
+
+    def test_fuzzy_location(self):
+        other = Location.objects.create(location='Распределительный пункт')
+        Application.objects.filter(identifier='app3').update(location=other)
+        self.assertEqual(self.identifiers('распределительный пунк'), ['app3'])
+        self.assertEqual(len(self.identifiers('подстанция', limit=5)), 5)
+
+    def test_index_follows_journal(self):
+        self.assertEqual(self.identifiers('насос'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            created = self.client.post('/api/applications/', {
+                'identifier': 'S-1', 'correction': 'Проверка насоса', 'location': self.location.pk,
+                'object_instance': self.object.pk, 'status': self.status.pk, 'start_time': timezone.now().isoformat(),
+            }, format='json').data
+        self.assertEqual(self.identifiers('насоса'), ['S-1'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/applications/{created['id']}/")
+        self.assertEqual(self.identifiers('насоса'), [])
@@ -1,9 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     BrigadeViewSet, LocationViewSet, ObjectViewSet,
     StatusViewSet, ApplicationViewSet,
-    register_user, login_user, logout_user, refresh_token
+    register_user, login_user, logout_user, refresh_token, bootstrap, analytics,
+    analytics_daily, profile_stats, db_stats, events_ticket,
 )
 
 router = DefaultRouter()
@@ -15,6 +17,19 @@ router.register(r'applications', ApplicationViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('bootstrap/', bootstrap, name='bootstrap'),
+    path('analytics/', analytics, name='analytics'),
+    path('analytics/daily/', analytics_daily, name='analytics_daily'),
+    path('stats/profile/', profile_stats, name='profile_stats'),
+    path('stats/db/', db_stats, name='db_stats'),
+    path('events/ticket/', events_ticket, name='events_ticket'),
+    path('events/applications/', async_views.application_events, name='application_events'),
+    # Те же чтения в виде async-views для ASGI
+    path('async/applications/', async_views.application_list, name='async_application_list'),
+    path('async/applications/<int:pk>/', async_views.application_detail, name='async_application_detail'),
+    path('async/bootstrap/', async_views.bootstrap, name='async_bootstrap'),
+    path('async/<str:table>/', async_views.reference_list, name='async_reference_list'),
+    path('async/<str:table>/<int:pk>/', async_views.reference_detail, name='async_reference_detail'),
     path('register/', register_user, name='register'),
     path('login/', login_user, name='login'),
     path('logout/', logout_user, name='logout'),
@@ -2,22 +2,37 @@ import logging
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
+from django.db import IntegrityError
+from . import metrics
+from .cache import clear_reference_caches
 
 logger = logging.getLogger('api')
 
 def custom_exception_handler(exc, context):
+    if isinstance(exc, IntegrityError):
+        # Данные изменились в другом воркере после проверки: например, связанная запись
+        # удалена, а кэш справочника этого процесса её ещё помнит
+        clear_reference_caches()
+        metrics.exceptions_total.inc(exception=type(exc).__name__, status=status.HTTP_409_CONFLICT)
+        logger.warning("Конфликт при записи: %s", str(exc))
+        return Response(
+            {"detail": "Данные изменились во время запроса (связанная запись удалена или идентификатор занят). "
+                       "Обновите данные и повторите запрос."},
+            status=status.HTTP_409_CONFLICT
+        )
     response = exception_handler(exc, context)
+    metrics.exceptions_total.inc(exception=type(exc).__name__, status=response.status_code if response else 500)
     if response is None:
-        logger.error(f"Непредвиденная ошибка сервера: {exc}", exc_info=True)
+        logger.error("Непредвиденная ошибка сервера: %s", str(exc), exc_info=True)
         return Response(
             {"detail": "Внутренняя ошибка сервера. Пожалуйста, попробуйте позже."},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
     elif response.status_code >= 500:
-        logger.error(f"Ошибка сервера ({response.status_code}): {response.data}", exc_info=True)
+        logger.error("Ошибка сервера (%d)", response.status_code, extra={'errors': response.data}, exc_info=True)
         response.data['detail'] = "Внутренняя ошибка сервера. Пожалуйста, попробуйте позже."
     elif response.status_code >= 400:
-        logger.warning(f"Ошибка клиента ({response.status_code}): {response.data}")
+        logger.warning("Ошибка клиента (%d)", response.status_code, extra={'errors': response.data})
         if isinstance(response.data, dict) and 'detail' not in response.data:
             error_messages = []
             for field, errors in response.data.items():
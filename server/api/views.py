@@ -1,100 +1,560 @@
 import logging
+from datetime import timedelta
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.authtoken.models import Token
+from rest_framework.filters import SearchFilter
+from rest_framework.exceptions import NotFound, ValidationError
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from django.conf import settings
-from .models import Brigade, Location, Object, Status, Application
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.db import connections, transaction
+from django.db.models import SET_NULL
+from .models import Brigade, Location, Object, Status, Application, ApplicationChange, ArchivedApplication
+from .cache import reference_cache, bump_table_version, has_shared_versions
+from .conditional import ConditionalGetMixin
+from .events import issue_stream_ticket, publish_application_event
+from .bulk import ApplicationBulkWriter
+from .archive import find_application
+from .changes import changes_since, is_change_token_expired
+from .authentication import RotatingTokenRefreshSerializer, is_token_revoked, revoke_token
+from .dispatch import Dispatcher, unassigned_applications
+from . import metrics, profiling
+from .analytics import cached_application_statistics
+from .rollups import rollup_entries, update_rollups, rollup_statistics
+from .export import EXPORT_FORMATS, achunks
+from .rows import APPLICATION_FIELDS, application_columns, application_dicts, parse_fields
+from .search import search_applications
+from .renderers import CSVRenderer, NDJSONRenderer
+from .filters import ApplicationFilterBackend, is_digits
+from .log import log_fields
+from .pagination import ApplicationCursorPagination
 from .serializers import (
     BrigadeSerializer, LocationSerializer, ObjectSerializer,
-    StatusSerializer, ApplicationSerializer, UserRegisterSerializer
+    StatusSerializer, ApplicationSerializer, UserRegisterSerializer,
+    ApplicationBulkSerializer, ArchivedApplicationSerializer
 )
 
 logger = logging.getLogger('api')
 
-class BrigadeViewSet(viewsets.ModelViewSet):
+class ReferenceCacheMixin:
+    """Чтение справочника из процессного кэша, сброс кэша при любой записи."""
+
+    def get_reference_cache(self):
+        return reference_cache(self.queryset.model)
+
+    def list(self, request, *args, **kwargs):
+        return Response(self.get_reference_cache().rows())
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        instance = self.get_reference_cache().get(int(pk)) if is_digits(str(pk)) else None
+        if instance is None:
+            raise NotFound()
+        return Response(self.get_serializer(instance).data)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.get_reference_cache().invalidate()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.get_reference_cache().invalidate()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # Заявки удаляются каскадом или теряют ссылку (SET_NULL) мимо applications_changed:
+        # журнал, события, итоги и версию таблицы для них нужно записать здесь
+        field = next(
+            field for field in Application._meta.concrete_fields if field.related_model is type(instance)
+        )
+        nullified = field.remote_field.on_delete is SET_NULL
+        applications = list(
+            Application.objects.select_related('brigade', 'location', 'object_instance', 'status')
+            .select_for_update(of=('self',)).filter(**{field.name: instance})
+        )
+        previous = {application.pk: rollup_entries(application) for application in applications}
+        # Архивные заявки тоже входят в суточные итоги
+        archived = list(ArchivedApplication.objects.filter(**{field.name: instance}))
+        super().perform_destroy(instance)
+        self.get_reference_cache().invalidate()
+        if archived:
+            removed = [entry for row in archived for entry in rollup_entries(row)]
+            for row in archived:
+                setattr(row, field.name, None)
+            update_rollups(removed, [entry for row in archived for entry in rollup_entries(row)] if nullified else ())
+        if not applications:
+            return
+        if nullified:
+            # SET_NULL — UPDATE без auto_now, время изменения проставляется отдельно
+            now = timezone.now()
+            Application.objects.filter(pk__in=previous).update(updated_at=now)
+            for application in applications:
+                setattr(application, field.name, None)
+                application.updated_at = now
+            ApplicationViewSet().applications_changed(ApplicationChange.UPDATED, applications, previous)
+        else:
+            ApplicationViewSet().applications_changed(ApplicationChange.DELETED, applications)
+
+class BrigadeViewSet(ConditionalGetMixin, ReferenceCacheMixin, viewsets.ModelViewSet):
     queryset = Brigade.objects.all()
     serializer_class = BrigadeSerializer
 
     def perform_create(self, serializer):
-        logger.info(f"Создание бригады: {serializer.validated_data}")
+        logger.info("Создание бригады", extra={'data': log_fields(serializer.validated_data)})
         return super().perform_create(serializer)
 
     def perform_update(self, serializer):
-        logger.info(f"Обновление бригады (ID: {self.kwargs.get('pk')}): {serializer.validated_data}")
+        logger.info("Обновление бригады (ID: %s)", self.kwargs.get('pk'), extra={'data': log_fields(serializer.validated_data)})
         return super().perform_update(serializer)
 
     def perform_destroy(self, instance):
-        logger.info(f"Удаление бригады (ID: {instance.pk})")
+        logger.info("Удаление бригады (ID: %s)", instance.pk)
         return super().perform_destroy(instance)
 
-class LocationViewSet(viewsets.ModelViewSet):
+class LocationViewSet(ConditionalGetMixin, ReferenceCacheMixin, viewsets.ModelViewSet):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
 
     def perform_create(self, serializer):
-        logger.info(f"Создание местоположения: {serializer.validated_data}")
+        logger.info("Создание местоположения", extra={'data': log_fields(serializer.validated_data)})
         return super().perform_create(serializer)
 
     def perform_update(self, serializer):
-        logger.info(f"Обновление местоположения (ID: {self.kwargs.get('pk')}): {serializer.validated_data}")
+        logger.info("Обновление местоположения (ID: %s)", self.kwargs.get('pk'), extra={'data': log_fields(serializer.validated_data)})
         return super().perform_update(serializer)
 
     def perform_destroy(self, instance):
-        logger.info(f"Удаление местоположения (ID: {instance.pk})")
+        logger.info("Удаление местоположения (ID: %s)", instance.pk)
         return super().perform_destroy(instance)
 
-class ObjectViewSet(viewsets.ModelViewSet):
+class ObjectViewSet(ConditionalGetMixin, ReferenceCacheMixin, viewsets.ModelViewSet):
     queryset = Object.objects.all()
     serializer_class = ObjectSerializer
 
     def perform_create(self, serializer):
-        logger.info(f"Создание объекта: {serializer.validated_data}")
+        logger.info("Создание объекта", extra={'data': log_fields(serializer.validated_data)})
         return super().perform_create(serializer)
 
     def perform_update(self, serializer):
-        logger.info(f"Обновление объекта (ID: {self.kwargs.get('pk')}): {serializer.validated_data}")
+        logger.info("Обновление объекта (ID: %s)", self.kwargs.get('pk'), extra={'data': log_fields(serializer.validated_data)})
         return super().perform_update(serializer)
 
     def perform_destroy(self, instance):
-        logger.info(f"Удаление объекта (ID: {instance.pk})")
+        logger.info("Удаление объекта (ID: %s)", instance.pk)
         return super().perform_destroy(instance)
 
-class StatusViewSet(viewsets.ModelViewSet):
+class StatusViewSet(ConditionalGetMixin, ReferenceCacheMixin, viewsets.ModelViewSet):
     queryset = Status.objects.all()
     serializer_class = StatusSerializer
 
     def perform_create(self, serializer):
-        logger.info(f"Создание статуса: {serializer.validated_data}")
+        logger.info("Создание статуса", extra={'data': log_fields(serializer.validated_data)})
         return super().perform_create(serializer)
 
     def perform_update(self, serializer):
-        logger.info(f"Обновление статуса (ID: {self.kwargs.get('pk')}): {serializer.validated_data}")
+        logger.info("Обновление статуса (ID: %s)", self.kwargs.get('pk'), extra={'data': log_fields(serializer.validated_data)})
         return super().perform_update(serializer)
 
     def perform_destroy(self, instance):
-        logger.info(f"Удаление статуса (ID: {instance.pk})")
+        logger.info("Удаление статуса (ID: %s)", instance.pk)
         return super().perform_destroy(instance)
 
-class ApplicationViewSet(viewsets.ModelViewSet):
-    queryset = Application.objects.all()
+class ApplicationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Application.objects.select_related('brigade', 'location', 'object_instance', 'status')
     serializer_class = ApplicationSerializer
+    version_models = (Application, Brigade, Location, Object, Status)
+    pagination_class = ApplicationCursorPagination
+    filter_backends = [ApplicationFilterBackend, SearchFilter]
+    search_fields = ['identifier', 'location__location', 'object_instance__object']
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(self.list_rows, request, *args, **kwargs)
+
+    def list_rows(self, request, *args, **kwargs):
+        """Страница списка из .values() без моделей и полей сериализатора.
 
+        ?fields=id,identifier,... — только нужные поля; столбцы остальных не читаются из БД.
+        """
+        fields = parse_fields(request.query_params.get('fields'))
+        # Столбцы сортировки нужны пагинатору для курсора
+        ordering = [field.lstrip('-') for field in self.paginator.ordering]
+        columns = application_columns((fields or APPLICATION_FIELDS) + ordering)
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(application_dicts(page, fields))
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'create' and isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Давно закрытая заявка могла быть перенесена в архив
+            pk = str(kwargs.get('pk'))
+            instance = None
+            if is_digits(pk):
+                instance = ArchivedApplication.objects.select_related(
+                    'brigade', 'location', 'object_instance', 'status'
+                ).filter(pk=pk).first()
+            if instance is None:
+                raise
+            return Response(ArchivedApplicationSerializer(instance).data)
+
+    @action(detail=False, methods=['get'], url_path=r'by-identifier/(?P<identifier>[^/]+)')
+    def by_identifier(self, request, identifier=None):
+        """Заявка по идентификатору: из рабочей таблицы или, если её там нет, из архива."""
+        instance, archived = find_application(identifier)
+        if instance is None:
+            raise NotFound("Заявка с таким идентификатором не найдена.")
+        serializer_class = ArchivedApplicationSerializer if archived else ApplicationSerializer
+        return Response(serializer_class(instance).data)
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        logger.info(f"Создание заявки: {serializer.validated_data}")
-        return super().perform_create(serializer)
+        logger.info("Создание заявки", extra={'data': log_fields(serializer.validated_data)})
+        super().perform_create(serializer)
+        instances = serializer.instance if isinstance(serializer.instance, list) else [serializer.instance]
+        self.applications_changed(ApplicationChange.CREATED, instances)
 
+    @transaction.atomic
     def perform_update(self, serializer):
-        logger.info(f"Обновление заявки (ID: {self.kwargs.get('pk')}): {serializer.validated_data}")
-        return super().perform_update(serializer)
+        logger.info("Обновление заявки (ID: %s)", self.kwargs.get('pk'), extra={'data': log_fields(serializer.validated_data)})
+        previous = {serializer.instance.pk: rollup_entries(serializer.instance)}
+        super().perform_update(serializer)
+        self.applications_changed(ApplicationChange.UPDATED, [serializer.instance], previous)
 
+    @transaction.atomic
     def perform_destroy(self, instance):
-        logger.info(f"Удаление заявки (ID: {instance.pk})")
-        return super().perform_destroy(instance)
+        logger.info("Удаление заявки (ID: %s)", instance.pk)
+        pk = instance.pk
+        super().perform_destroy(instance)
+        instance.pk = pk
+        self.applications_changed(ApplicationChange.DELETED, [instance])
+
+    def applications_changed(self, action, instances, previous=None, batch_event=False):
+        """Журнал изменений, события для подписчиков, суточные итоги и версия таблицы для ETag.
+
+        previous — {ID заявки: её вклад в итоги до записи} (см. rollup_entries).
+        batch_event — одно событие {'count': N} на весь пакет вместо сериализации каждой заявки.
+        """
+        previous = previous or {}
+        changes = ApplicationChange.record(action, instances)
+        if action == ApplicationChange.DELETED:
+            update_rollups(removed=[entry for instance in instances for entry in rollup_entries(instance)])
+        else:
+            update_rollups(
+                [entry for entries in previous.values() for entry in entries],
+                [entry for instance in instances for entry in rollup_entries(instance)],
+            )
+            if action == ApplicationChange.CREATED:
+                metrics.applications_created_total.inc(len(instances))
+            # Закрытием считается переход конкретной заявки из открытой в закрытую:
+            # закрытие одной и переоткрытие другой в одном пакете не взаимоуничтожаются
+            closed = sum(
+                instance.end_time is not None
+                and not any(values[1] for _, values in previous.get(instance.pk, ()))
+                for instance in instances
+            )
+            if closed:
+                metrics.applications_closed_total.inc(closed)
+        if batch_event:
+            if changes:
+                publish_application_event(action, {'count': len(changes)}, token=changes[-1].pk)
+            bump_table_version(Application._meta.db_table)
+            return
+        for instance, change in zip(instances, changes):
+            if action == ApplicationChange.DELETED:
+                data = {'id': instance.pk, 'identifier': instance.identifier}
+            else:
+                data = ApplicationSerializer(instance).data
+            publish_application_event(action, data, token=change.pk)
+        bump_table_version(Application._meta.db_table)
+
+    bulk_max_items = 1000
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Пакет заявок: items без id создаются, с id изменяются, delete — ID для удаления.
+
+        mode=atomic: при любой ошибке ничего не записывается;
+        mode=best_effort: записываются все корректные элементы.
+        """
+        payload = ApplicationBulkSerializer(data=request.data, context={'max_items': self.bulk_max_items})
+        payload.is_valid(raise_exception=True)
+        writer = ApplicationBulkWriter(**payload.validated_data)
+        with transaction.atomic():
+            written = writer.run()
+            if written:
+                for change_action, instances, previous in (
+                    (ApplicationChange.DELETED, writer.deleted, None),
+                    (ApplicationChange.CREATED, writer.created, None),
+                    (ApplicationChange.UPDATED, writer.updated, writer.previous_entries),
+                ):
+                    if instances:
+                        self.applications_changed(change_action, instances, previous)
+        logger.info(
+            "Пакетная обработка заявок (%s): создано %d, обновлено %d, удалено %d, ошибок %d",
+            payload.validated_data['mode'], len(writer.created), len(writer.updated), len(writer.deleted),
+            writer.error_count,
+        )
+        if not written:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif writer.error_count:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_200_OK
+        return Response({
+            'mode': payload.validated_data['mode'],
+            'created': len(writer.created),
+            'updated': len(writer.updated),
+            'deleted': len(writer.deleted),
+            'errors': writer.error_count,
+            'results': writer.results,
+            'delete_results': writer.delete_results,
+        }, status=response_status)
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """Потоковая выгрузка заявок в CSV или NDJSON с теми же фильтрами, что и у списка.
+
+        Строки читаются курсором на сервере БД пачками и сразу отправляются клиенту,
+        поэтому память не растёт с числом строк. Под ASGI строки отдаются асинхронным
+        итератором (см. achunks): синхронный Django собрал бы в список всю выгрузку.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).order_by('-start_time', '-id')
+        export_format = request.accepted_renderer.format
+        generate, content_type = EXPORT_FORMATS[export_format]
+        logger.info("Выгрузка заявок (%s): %s", export_format, request.query_params.urlencode())
+        rows = generate(queryset)
+        if isinstance(request._request, ASGIRequest):
+            rows = achunks(rows)
+        response = StreamingHttpResponse(rows, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="applications.{export_format}"'
+        return response
+
+    search_max_limit = 100
+
+    @action(detail=False, methods=['get'], url_path='search', url_name='search')
+    def full_text_search(self, request):
+        """Поиск заявок по ?q=: слова идентификатора и примечания, похожие идентификатор,
+        местоположение и объект (с опечатками). ?limit= — число результатов, ?fields= как у списка.
+        """
+        text = request.query_params.get('q', '').strip()
+        if len(text) < 2:
+            raise ValidationError({'q': "Запрос должен содержать не меньше 2 символов."})
+        limit = request.query_params.get('limit', '20')
+        if not is_digits(limit) or not 1 <= int(limit) <= self.search_max_limit:
+            raise ValidationError({'limit': f"Ожидается число от 1 до {self.search_max_limit}."})
+        fields = parse_fields(request.query_params.get('fields'))
+        return Response({'results': search_applications(text, int(limit), fields)})
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Изменения заявок после токена ?since=<token>.
+
+        Без since возвращается только текущий токен: клиент запоминает его,
+        загружает список целиком и дальше опрашивает только изменения.
+        Журнал хранится CHANGES_RETENTION_DAYS дней; для более старого токена
+        ответ 410, и клиент загружает список заново.
+        """
+        limit = self.paginator.get_page_size(request)
+        since = request.query_params.get('since')
+        if since is None:
+            return Response({'token': ApplicationChange.visible_horizon(), 'has_more': False, 'upserted': [], 'deleted': []})
+        if not is_digits(since):
+            raise ValidationError({'since': "Ожидается числовой токен."})
+        since = int(since)
+        if since and is_change_token_expired(since):
+            return Response(
+                {'detail': "Токен устарел: загрузите список заново."}, status=status.HTTP_410_GONE
+            )
+
+        changes, token, has_more = changes_since(since, limit)
+        latest = {}
+        for application_id, identifier, change_action in changes:
+            latest[application_id] = (identifier, change_action)
+
+        upserted_ids = [pk for pk, (_, change_action) in latest.items() if change_action != ApplicationChange.DELETED]
+        upserted = self.get_queryset().filter(pk__in=upserted_ids).order_by('id') if upserted_ids else []
+        deleted = [
+            {'id': pk, 'identifier': identifier}
+            for pk, (identifier, change_action) in latest.items()
+            if change_action == ApplicationChange.DELETED
+        ]
+        return Response({
+            'token': token,
+            'has_more': has_more,
+            'upserted': self.get_serializer(upserted, many=True).data,
+            'deleted': deleted,
+        })
+
+    dispatch_max_items = 500
+
+    @action(detail=False, methods=['get', 'post'], url_path='dispatch')
+    def assign_brigades(self, request):
+        """Назначение бригад открытым заявкам без бригады, начиная с самых старых.
+
+        GET возвращает предложения, POST их записывает. ?limit= — сколько заявок рассмотреть.
+        """
+        limit = request.query_params.get('limit', '100')
+        if not is_digits(limit) or not 1 <= int(limit) <= self.dispatch_max_items:
+            raise ValidationError({'limit': f"Ожидается число от 1 до {self.dispatch_max_items}."})
+        limit = int(limit)
+        if request.method == 'GET':
+            proposals = Dispatcher.from_database().plan(unassigned_applications(limit))
+            return Response({'assigned': False, 'proposals': proposals})
+
+        with transaction.atomic():
+            # Заявки, которые уже распределяет параллельный запрос, пропускаются
+            instances = list(
+                self.get_queryset().select_for_update(skip_locked=True, of=('self',))
+                .filter(brigade__isnull=True, end_time__isnull=True)
+                .order_by('start_time', 'id')[:limit]
+            )
+            proposals = Dispatcher.from_database().plan(
+                (instance.pk, instance.location_id, instance.start_time) for instance in instances
+            )
+            brigades = {proposal['id']: proposal['brigade'] for proposal in proposals}
+            assigned = [instance for instance in instances if instance.pk in brigades]
+            previous = {instance.pk: rollup_entries(instance) for instance in assigned}
+            now = timezone.now()
+            for instance in assigned:
+                instance.brigade = reference_cache(Brigade).get(brigades[instance.pk])
+                instance.updated_at = now
+            if assigned:
+                Application.objects.bulk_update(assigned, ['brigade', 'updated_at'])
+                self.applications_changed(ApplicationChange.UPDATED, assigned, previous)
+        logger.info("Автоматически назначены бригады заявкам: %d", len(assigned))
+        return Response({'assigned': True, 'proposals': proposals})
+
+BOOTSTRAP_TABLES = {
+    'brigades': Brigade,
+    'locations': Location,
+    'objects': Object,
+    'statuses': Status,
+}
+
+@api_view(['GET'])
+def bootstrap(request):
+    """Все справочники и текущий пользователь одним ответом.
+
+    Клиент передаёт известные ему версии таблиц (?statuses=<версия>&...),
+    в ответ попадают только таблицы, версия которых изменилась. Версии отдаются
+    только общие для воркеров (см. has_shared_versions), иначе таблицы приходят всегда.
+    """
+    shared = has_shared_versions()
+    data = {'versions': {}}
+    for name, model in BOOTSTRAP_TABLES.items():
+        version, rows = reference_cache(model).versioned_rows()
+        if not shared:
+            data[name] = rows
+            continue
+        data['versions'][name] = version
+        if request.query_params.get(name) != version:
+            data[name] = rows
+    user = request.user
+    data['user'] = {
+        'id': user.pk,
+        'username': user.username,
+        'email': getattr(user, 'email', ''),
+        'is_staff': user.is_staff,
+    }
+    return Response(data)
+
+@api_view(['POST'])
+def events_ticket(request):
+    """Одноразовый билет для подключения EventSource к /api/events/applications/?ticket=."""
+    if not settings.EVENTS_ENABLED:
+        raise NotFound("Поток событий выключен (EVENTS_ENABLED).")
+    return Response({'ticket': issue_stream_ticket(request.user.pk), 'expires_in': settings.EVENTS_TICKET_SECONDS})
+
+@api_view(['GET'])
+def analytics(request):
+    """Статистика по заявкам за период ?start=&end= (по умолчанию последние ?days=30 дней)."""
+    bounds = {}
+    for name in ('start', 'end'):
+        value = request.query_params.get(name)
+        if value:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                raise ValidationError({name: "Неверный формат даты и времени."})
+            bounds[name] = timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+    days = request.query_params.get('days', '30')
+    if not is_digits(days) or not 1 <= int(days) <= 3660:
+        raise ValidationError({'days': "Ожидается число дней от 1 до 3660."})
+    if 'start' in bounds and 'end' in bounds and bounds['start'] >= bounds['end']:
+        raise ValidationError({'start': "Начало периода должно быть раньше конца."})
+    return Response(cached_application_statistics(days=int(days), **bounds))
+
+@api_view(['GET'])
+def analytics_daily(request):
+    """Сводка по суточным итогам за дни ?start=&end= (ГГГГ-ММ-ДД), по умолчанию последние ?days=30."""
+    bounds = {}
+    for name in ('start', 'end'):
+        value = request.query_params.get(name)
+        if value:
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValidationError({name: "Неверный формат даты."})
+            bounds[name] = parsed
+    days = request.query_params.get('days', '30')
+    if not is_digits(days) or not 1 <= int(days) <= 3660:
+        raise ValidationError({'days': "Ожидается число дней от 1 до 3660."})
+    last_day = bounds.get('end') or timezone.localdate()
+    first_day = bounds.get('start') or last_day - timedelta(days=int(days) - 1)
+    if first_day > last_day:
+        raise ValidationError({'start': "Начало периода должно быть не позже конца."})
+    return Response(rollup_statistics(first_day, last_day))
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def db_stats(request):
+    """Настройки соединений с БД и статистика пула этого процесса."""
+    totals = metrics.registry.values()
+    data = {}
+    for connection in connections.all():
+        pool = getattr(connection, 'pool', None)
+        data[connection.alias] = {
+            'vendor': connection.vendor,
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+            'server_side_cursors': not connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS', False),
+            'connected_in_this_thread': connection.connection is not None,
+            'connections_opened': totals.get((metrics.db_connections_total.name, (connection.alias,)), 0),
+            'queries': totals.get((metrics.db_queries_total.name, (connection.alias,)), 0),
+            'pool': pool.get_stats() if pool is not None else None,
+        }
+    return Response(data)
+
+def metrics_view(request):
+    """Счётчики в текстовом формате Prometheus. Если задан METRICS_TOKEN, нужен заголовок Authorization: Bearer."""
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([permissions.IsAdminUser])
+def profile_stats(request):
+    """Статистика профилирования по эндпоинтам этого процесса; DELETE сбрасывает её."""
+    if request.method == 'DELETE':
+        profiling.registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response({'enabled': settings.PROFILING_ENABLED, 'endpoints': profiling.registry.report()})
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
@@ -104,7 +564,7 @@ def register_user(request):
         user = serializer.save()
         refresh = TokenObtainPairSerializer().get_token(user)
         access = refresh.access_token
-        logger.info(f"Зарегистрирован новый пользователь: {user.username}")
+        logger.info("Зарегистрирован новый пользователь: %s", user.username)
         response = Response(
             {"message": "Пользователь успешно зарегистрирован", "access_token": str(access)},
             status=status.HTTP_201_CREATED
@@ -119,7 +579,7 @@ def register_user(request):
             domain=settings.SESSION_COOKIE_DOMAIN
         )
         return response
-    logger.warning(f"Ошибка регистрации пользователя: {serializer.errors}")
+    logger.warning("Ошибка регистрации пользователя", extra={'errors': serializer.errors})
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
@@ -130,6 +590,7 @@ def login_user(request):
 
     if not username or not password:
         logger.warning("Попытка входа без логина или пароля.")
+        metrics.logins_total.inc(result='invalid')
         return Response(
             {"detail": "Необходимо указать логин и пароль."},
             status=status.HTTP_400_BAD_REQUEST
@@ -140,11 +601,13 @@ def login_user(request):
         try:
             serializer.is_valid(raise_exception=True)
         except Exception as e:
-            logger.warning(f"Ошибка валидации токена для пользователя {username}: {e}")
+            logger.warning("Ошибка валидации токена для пользователя %s: %s", username, str(e))
+            metrics.logins_total.inc(result='failure')
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         access_token = serializer.validated_data["access"]
         refresh_token = serializer.validated_data["refresh"]
-        logger.info(f"Пользователь {user.username} успешно вошел.")
+        logger.info("Пользователь %s успешно вошел.", user.username)
+        metrics.logins_total.inc(result='success')
         response = Response({"access_token": access_token}, status=status.HTTP_200_OK)
         response.set_cookie(
             key='refresh_token',
@@ -157,7 +620,8 @@ def login_user(request):
         )
         return response
     else:
-        logger.warning(f"Неудачная попытка входа для пользователя: {username}")
+        logger.warning("Неудачная попытка входа для пользователя: %s", username)
+        metrics.logins_total.inc(result='failure')
         return Response(
             {"detail": "Неверные учетные данные."},
             status=status.HTTP_400_BAD_REQUEST
@@ -169,15 +633,21 @@ def refresh_token(request):
     refresh_token_cookie = request.COOKIES.get('refresh_token')
     if not refresh_token_cookie:
         logger.warning("Попытка обновления токена без refresh token cookie.")
+        metrics.token_refreshes_total.inc(result='missing')
         return Response(
             {"detail": "Refresh token отсутствует."},
             status=status.HTTP_401_UNAUTHORIZED
         )
-    serializer = TokenRefreshSerializer(data={'refresh': refresh_token_cookie})
+    serializer = RotatingTokenRefreshSerializer(data={'refresh': refresh_token_cookie})
     try:
+        old_refresh = RefreshToken(refresh_token_cookie)
+        # Refresh token после ротации или выхода повторно не принимается
+        if is_token_revoked(old_refresh):
+            raise TokenError("Refresh token отозван.")
         serializer.is_valid(raise_exception=True)
     except Exception as e:
-        logger.warning(f"Недействительный refresh token: {e}")
+        logger.warning("Недействительный refresh token: %s", str(e))
+        metrics.token_refreshes_total.inc(result='failure')
         response = Response(
             {"detail": "Недействительный или истекший refresh token. Требуется повторный вход."},
             status=status.HTTP_401_UNAUTHORIZED
@@ -186,7 +656,12 @@ def refresh_token(request):
         return response
     access_token = serializer.validated_data['access']
     new_refresh_token = serializer.validated_data['refresh']
-    logger.info(f"Access token успешно обновлен для пользователя: {request.user if request.user.is_authenticated else 'Неизвестный'}")
+    revoke_token(old_refresh)
+    metrics.token_refreshes_total.inc(result='success')
+    logger.info(
+        "Access token успешно обновлен для пользователя: %s",
+        request.user.username if request.user.is_authenticated else 'Неизвестный',
+    )
     response = Response({"access_token": access_token}, status=status.HTTP_200_OK)
     response.set_cookie(
         key='refresh_token',
@@ -201,7 +676,16 @@ def refresh_token(request):
 
 @api_view(['POST'])
 def logout_user(request):
-    logger.info(f"Пользователь {request.user.username if request.user.is_authenticated else 'Неизвестный'} вышел.")
+    logger.info("Пользователь %s вышел.", request.user.username if request.user.is_authenticated else 'Неизвестный')
+    # Отзываем и access token запроса, и refresh token из cookie: оба больше не принимаются
+    if isinstance(request.auth, AccessToken):
+        revoke_token(request.auth)
+    refresh_token_cookie = request.COOKIES.get('refresh_token')
+    if refresh_token_cookie:
+        try:
+            revoke_token(RefreshToken(refresh_token_cookie))
+        except TokenError:
+            pass
     response = Response({"detail": "Успешный выход."}, status=status.HTTP_200_OK)
     response.delete_cookie('refresh_token', domain=settings.SESSION_COOKIE_DOMAIN)
     return response
\ No newline at end of file
@@ -1,6 +1,8 @@
+import importlib.util
 import os
 from datetime import timedelta
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 env = environ.Env(
     DEBUG=(bool, True),
@@ -9,6 +11,9 @@ env = environ.Env(
     ALLOWED_HOSTS=(list, ['localhost', '127.0.0.1']),
     CORS_ALLOWED_ORIGINS=(list, []),
     SESSION_COOKIE_DOMAIN=(str, None),
+    CACHE_URL=(str, 'locmemcache://'),
+    REFERENCE_CACHE_ALIAS=(str, None),
+    REFERENCE_CACHE_TIMEOUT=(int, 300),
 )
 
 environ.Env.read_env(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
@@ -28,6 +33,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'rest_framework',
     'rest_framework.authtoken',
@@ -37,6 +43,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.profiling.ProfilingMiddleware',
+    'api.metrics.MetricsMiddleware',
+    'api.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -72,6 +81,88 @@ DATABASES = {
     'default': env.db('DATABASE_URL')
 }
 
+# Соединения с БД. Под WSGI соединение по умолчанию живёт DB_CONN_MAX_AGE секунд и
+# проверяется перед повторным использованием, а не открывается на каждый запрос.
+# Под ASGI (lab4.asgi задаёт DJANGO_SERVER_INTERFACE=asgi) по умолчанию 0: async-код
+# ходит в БД из разных потоков, и постоянные соединения копились бы в каждом из них;
+# повторно использовать соединения там лучше через DB_POOL.
+# DB_POOL=True включает пул psycopg 3 (нужны пакеты psycopg и psycopg-pool) —
+# с ним CONN_MAX_AGE должен быть 0. DB_PGBOUNCER=True — режим работы через
+# pgbouncer в transaction pooling: серверные курсоры отключаются.
+SERVER_INTERFACE = env('DJANGO_SERVER_INTERFACE', default='wsgi')
+DATABASES['default']['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=0 if SERVER_INTERFACE == 'asgi' else 60)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = env.bool('DB_CONN_HEALTH_CHECKS', default=True)
+if env.bool('DB_POOL', default=False):
+    if DATABASES['default']['ENGINE'] != 'django.db.backends.postgresql' or not importlib.util.find_spec('psycopg_pool'):
+        raise ImproperlyConfigured("DB_POOL требует PostgreSQL и установленных пакетов psycopg и psycopg-pool.")
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+        'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+        'timeout': env.float('DB_POOL_TIMEOUT', default=10.0),
+        'max_idle': env.float('DB_POOL_MAX_IDLE', default=600.0),
+    }
+if env.bool('DB_PGBOUNCER', default=False):
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+CACHES = {
+    'default': env.cache('CACHE_URL')
+}
+
+# Справочники кэшируются в памяти процесса. Если задан алиас общего кэша
+# (например, Redis в CACHE_URL), через него между воркерами синхронизируются
+# версии таблиц, и запись в одном воркере сбрасывает кэш во всех остальных.
+# Только с общим кэшем ответы получают ETag/Last-Modified (304 Not Modified).
+REFERENCE_CACHE_ALIAS = env('REFERENCE_CACHE_ALIAS')
+REFERENCE_CACHE_TIMEOUT = env('REFERENCE_CACHE_TIMEOUT')
+
+# Сводка /api/analytics/ кэшируется по интервалам времени
+ANALYTICS_BUCKET_SECONDS = env.int('ANALYTICS_BUCKET_SECONDS', default=60)
+ANALYTICS_CACHE_TIMEOUT = env.int('ANALYTICS_CACHE_TIMEOUT', default=300)
+
+# Профилирование запросов (см. api/profiling.py): при выключенном middleware
+# исключается из цепочки целиком. Статистика — /api/stats/profile/
+PROFILING_ENABLED = env.bool('PROFILING_ENABLED', default=False)
+PROFILING_WINDOW = env.int('PROFILING_WINDOW', default=1000)
+PROFILING_SLOW_MS = env.int('PROFILING_SLOW_MS', default=500)
+
+# Счётчики для Prometheus на /metrics. При нескольких воркерах gunicorn задайте общий
+# каталог METRICS_MULTIPROC_DIR (и очищайте его при перезапуске): каждый воркер раз
+# в METRICS_FLUSH_INTERVAL секунд сохраняет туда свои значения, /metrics их суммирует
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
+METRICS_MULTIPROC_DIR = env('METRICS_MULTIPROC_DIR', default=None)
+METRICS_FLUSH_INTERVAL = env.float('METRICS_FLUSH_INTERVAL', default=5.0)
+METRICS_TOKEN = env('METRICS_TOKEN', default=None)
+
+# Поиск /api/applications/search/: в PostgreSQL — tsvector и pg_trgm, на других БД —
+# индекс в памяти процесса, который перестраивается целиком раз в столько секунд
+SEARCH_INDEX_REBUILD_SECONDS = env.int('SEARCH_INDEX_REBUILD_SECONDS', default=300)
+
+# Сжатие ответов gzip/brotli (brotli — пакет Brotli из requirements.txt, без него
+# только gzip). По умолчанию выключено: обычно сжимает обратный прокси, а ответы
+# с токенами уязвимы к BREACH
+RESPONSE_COMPRESSION = env.bool('RESPONSE_COMPRESSION', default=False)
+
+# Заявки, закрытые больше ARCHIVE_AFTER_DAYS дней назад, переносятся в архив
+# командой archive_applications, чтобы рабочая таблица и её индексы оставались небольшими
+ARCHIVE_AFTER_DAYS = env.int('ARCHIVE_AFTER_DAYS', default=365)
+
+# Журнал изменений для /api/applications/changes/ хранится CHANGES_RETENTION_DAYS дней
+# (чистит та же команда archive_applications); более старые токены получают 410
+CHANGES_RETENTION_DAYS = env.int('CHANGES_RETENTION_DAYS', default=30)
+
+# Поток событий /api/events/applications/ держит соединение открытым: под WSGI это
+# занятый поток воркера на каждую вкладку, поэтому включайте только под ASGI-сервером.
+# Браузер подключается по одноразовому билету, действующему EVENTS_TICKET_SECONDS секунд
+EVENTS_ENABLED = env.bool('EVENTS_ENABLED', default=False)
+EVENTS_TICKET_SECONDS = env.int('EVENTS_TICKET_SECONDS', default=30)
+
+# Брокер событий о заявках для потока /api/events/applications/ (нужен ASGI-сервер)
+EVENTS_BROKER = {
+    'BACKEND': 'api.events.InMemoryBroker',
+    'OPTIONS': {'queue_size': 100},
+}
+
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
@@ -95,14 +186,16 @@ CORS_ALLOW_CREDENTIALS = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # orjson из requirements.txt; без него FastJSONRenderer работает как обычный
+        # JSONRenderer, и выдача списка заметно медленнее (замер ~20 тыс. строк/с шёл с orjson)
+        'api.renderers.FastJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
@@ -111,11 +204,17 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'api.utils.custom_exception_handler',
 }
 
+# Пользователь для JWT берётся из кэша процесса, отозванные токены — из множества
+# в памяти, которое сверяется с таблицей RevokedToken (см. api/authentication.py)
+AUTH_USER_CACHE_TIMEOUT = env.int('AUTH_USER_CACHE_TIMEOUT', default=60)
+REVOKED_TOKENS_SYNC_SECONDS = env.int('REVOKED_TOKENS_SYNC_SECONDS', default=30)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=5),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
-    'BLACKLIST_AFTER_ROTATION': True,
+    # Старый refresh token отзывает refresh_token() через api.authentication.revoke_token
+    'BLACKLIST_AFTER_ROTATION': False,
     'UPDATE_LAST_LOGIN': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
@@ -147,6 +246,8 @@ USE_L10N = True
 USE_TZ = True
 STATIC_URL = '/static/'
 
+# Запросы не пишут в файл и консоль сами: записи уходят в очередь, а пишет их
+# фоновый поток (api.log.BackgroundQueueHandler). В файл — JSON, по строке на запись.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -159,6 +260,9 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'api.log.JSONFormatter',
+        },
     },
     'handlers': {
         'console': {
@@ -170,17 +274,21 @@ LOGGING = {
             'filename': os.path.join(BASE_DIR, 'django_errors.log'),
             'maxBytes': 1024 * 1024 * 5,
             'backupCount': 5,
-            'formatter': 'verbose',
+            'formatter': 'json',
+        },
+        'queue': {
+            '()': 'api.log.BackgroundQueueHandler',
+            'handlers': ['console', 'file'],
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': True,
         },
         'api': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },